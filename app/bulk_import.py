@@ -0,0 +1,378 @@
+"""Bulk import of the CSV seed files in data/ into MySQL.
+
+Each file is streamed row by row, validated against the Pydantic model for
+its table and written either with batched multi-row INSERTs or, for the
+largest files, spooled to a cleaned temporary file that is loaded with
+LOAD DATA LOCAL INFILE. Tables are loaded parents first, so foreign keys
+hold at every commit.
+"""
+
+import csv
+import functools
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Annotated
+
+from pydantic import AfterValidator, EmailStr, ValidationError, create_model
+from pydantic.networks import validate_email
+
+from models import models
+
+# Bulk import configuration
+BULK_IMPORT_CONFIG = {
+    "batch_size": 5000,  # Rows per multi-row INSERT and commit
+    "max_reported_errors": 10,  # Rejected rows listed per table in the report
+}
+
+# Tables in load order, parents before children. Each entry is
+# (table, model, [(column, model field), ...]).
+TABLES = [
+    ("jogger", models.Jogger, [("Email", "email"), ("Name", "name")]),
+    ("appadmin", models.AppAdmin, [("AdminEmail", "admin_email")]),
+    ("eventorganizer", models.EventOrganizer, [("Email", "email"), ("Name", "name")]),
+    (
+        "joggingroute",
+        models.JoggingRoute,
+        [
+            ("RouteID", "route_id"),
+            ("RouteName", "route_name"),
+            ("Distance", "distance"),
+            ("AvgPace", "avg_pace"),
+        ],
+    ),
+    (
+        "route_admin",
+        models.RouteAdmin,
+        [("AdminEmail", "admin_email"), ("RouteID", "route_id")],
+    ),
+    (
+        "joggingevent",
+        models.JoggingEvent,
+        [
+            ("EventID", "event_id"),
+            ("EventName", "event_name"),
+            ("EventDate", "event_date"),
+            ("MaxParticipants", "max_participants"),
+        ],
+    ),
+    (
+        "event_em",
+        models.EventEM,
+        [("OrganizerEmail", "organizer_email"), ("EventID", "event_id")],
+    ),
+    (
+        "jogging",
+        models.Jogging,
+        [
+            ("SessionID", "session_id"),
+            ("StartDT", "start_dt"),
+            ("EndDT", "end_dt"),
+            ("Distance", "distance"),
+            ("JoggerEmail", "jogger_email"),
+            ("RouteID", "route_id"),
+        ],
+    ),
+    (
+        "eventregistration",
+        models.EventRegistration,
+        [
+            ("EventID", "event_id"),
+            ("JoggerEmail", "jogger_email"),
+            ("TimeStamp", "timestamp"),
+        ],
+    ),
+    (
+        "eventsession",
+        models.EventSession,
+        [("EventID", "event_id"), ("SessionID", "session_id")],
+    ),
+    (
+        "routereview",
+        models.RouteReview,
+        [
+            ("ReviewID", "review_id"),
+            ("Rating", "rating"),
+            ("Comment", "comment"),
+            ("RouteID", "route_id"),
+            ("JoggerEmail", "jogger_email"),
+        ],
+    ),
+    (
+        "eventreview",
+        models.EventReview,
+        [
+            ("ReviewID", "review_id"),
+            ("Rating", "rating"),
+            ("Comment", "comment"),
+            ("EventID", "event_id"),
+            ("JoggerEmail", "jogger_email"),
+        ],
+    ),
+]
+
+
+@functools.lru_cache(maxsize=100000)
+def _validated_email(value):
+    """Validate an address the way EmailStr does, once per distinct address."""
+    return validate_email(value)[1]
+
+
+@functools.lru_cache(maxsize=None)
+def _import_model(model):
+    """Return ``model`` with its EmailStr fields validated through a cache.
+
+    Emails repeat on most rows of the child tables, and checking one is far
+    slower than the rest of the row, so each address is only checked once.
+    """
+    overrides = {
+        name: (Annotated[str, AfterValidator(_validated_email)], field)
+        for name, field in model.model_fields.items()
+        if field.annotation is EmailStr
+    }
+    return create_model(model.__name__, __base__=model, **overrides)
+
+
+# Misspelt headers found in partner files, mapped to the real column
+HEADER_ALIASES = {"royteid": "RouteID"}
+
+
+def _header_columns(header, table, model, fields, path):
+    """Map each CSV header position to a table column, or None to skip it.
+
+    Headers are matched case-insensitively after stripping whitespace and
+    applying HEADER_ALIASES. Raises ValueError when a column the model
+    requires is missing.
+    """
+    known = {column.lower(): column for column, _ in fields}
+    mapped = []
+    for name in header:
+        key = name.strip().lower()
+        mapped.append(known.get(HEADER_ALIASES.get(key, key).lower()))
+    missing = [
+        column
+        for column, field in fields
+        if column not in mapped and model.model_fields[field].is_required()
+    ]
+    if missing:
+        raise ValueError(f"{path}: missing column(s) for {table}: {', '.join(missing)}")
+    return mapped
+
+
+def csv_fields(path, table, model, fields):
+    """Return the (column, field) pairs of ``fields`` present in a CSV header.
+
+    Columns missing from the file are left to their database defaults.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    mapped = _header_columns(header, table, model, fields, path)
+    return [(column, field) for column, field in fields if column in mapped]
+
+
+def read_rows(path, table, model, fields):
+    """Stream validated rows of a CSV file.
+
+    Yields:
+        tuple: (line number, column values in ``fields`` order, None) for a
+            valid row, or (line number, None, error message) for a rejected one
+    """
+    field_of = dict(fields)
+    model = _import_model(model)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        mapped = _header_columns(header, table, model, fields, path)
+        for row in reader:
+            if not any(value.strip() for value in row):
+                continue
+            values = {
+                field_of[column]: value.strip() or None
+                for column, value in zip(mapped, row)
+                if column is not None
+            }
+            try:
+                record = model.model_validate(values)
+            except ValidationError as e:
+                problems = "; ".join(
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                    for error in e.errors()
+                )
+                yield reader.line_num, None, problems
+                continue
+            values = tuple(getattr(record, field) for _, field in fields)
+            yield reader.line_num, values, None
+
+
+def _infile_value(value):
+    """Format one value for LOAD DATA ... ENCLOSED BY '"' ESCAPED BY ''."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=" ")
+    elif isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class _TableImport:
+    """Counters and rejected rows for one table's import."""
+
+    def __init__(self, table, path):
+        self.table = table
+        self.path = path
+        self.loaded = 0
+        self.rejected = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < BULK_IMPORT_CONFIG["max_reported_errors"]:
+            self.errors.append(f"line {line}: {message}")
+
+    def report(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            "table": self.table,
+            "path": self.path,
+            "loaded": self.loaded,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.loaded / seconds) if seconds else 0,
+        }
+
+
+def _insert_table(connection, table, fields, rows, progress, batch_size):
+    columns = ", ".join(column for column, _ in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+    cursor = connection.cursor()
+    try:
+        batch = []
+        for line, values, error in rows:
+            if error:
+                progress.reject(line, error)
+                continue
+            batch.append(values)
+            if len(batch) >= batch_size:
+                cursor.executemany(query, batch)
+                connection.commit()
+                progress.loaded += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(query, batch)
+            connection.commit()
+            progress.loaded += len(batch)
+    finally:
+        cursor.close()
+
+
+def _infile_table(connection, table, fields, rows, progress):
+    columns = ", ".join(column for column, _ in fields)
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".csv", encoding="utf-8", newline="", delete=False
+    ) as spool:
+        spooled = 0
+        for line, values, error in rows:
+            if error:
+                progress.reject(line, error)
+                continue
+            spool.write(",".join(map(_infile_value, values)) + "\n")
+            spooled += 1
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE {table}
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+                LINES TERMINATED BY '\\n'
+                ({columns})
+                """,
+                (spool.name,),
+            )
+            connection.commit()
+        finally:
+            cursor.close()
+        progress.loaded += spooled
+    finally:
+        os.unlink(spool.name)
+
+
+def import_table(connection, table, path, method="insert", batch_size=None):
+    """Validate and load one CSV file into its table.
+
+    Args:
+        connection: An open MySQL connection; LOAD DATA needs it opened with
+            allow_local_infile=True
+        table (str): A table name from TABLES
+        path (str): The CSV file
+        method (str): "insert" for batched INSERTs or "infile" for LOAD DATA
+        batch_size (int): Rows per INSERT batch, BULK_IMPORT_CONFIG by default
+
+    Returns:
+        dict: Rows loaded and rejected, the first rejection messages, elapsed
+            seconds and rows per second
+    """
+    _, model, fields = next(entry for entry in TABLES if entry[0] == table)
+    fields = csv_fields(path, table, model, fields)
+    progress = _TableImport(table, path)
+    rows = read_rows(path, table, model, fields)
+    _load(connection, table, fields, rows, progress, method, batch_size)
+    return progress.report()
+
+
+def load_rows(connection, table, fields, rows, method="insert", batch_size=None):
+    """Load rows that are already valid, such as generated ones, into a table.
+
+    Args:
+        connection: An open MySQL connection
+        table (str): A table name from TABLES
+        fields (list): The (column, field) pairs the values are ordered by
+        rows (iterable): Tuples of column values
+        method (str): "insert" for batched INSERTs or "infile" for LOAD DATA
+        batch_size (int): Rows per INSERT batch, BULK_IMPORT_CONFIG by default
+
+    Returns:
+        dict: The same report as import_table(), with no path
+    """
+    progress = _TableImport(table, None)
+    numbered = ((line, values, None) for line, values in enumerate(rows, 1))
+    _load(connection, table, fields, numbered, progress, method, batch_size)
+    return progress.report()
+
+
+def _load(connection, table, fields, rows, progress, method, batch_size):
+    if method == "infile":
+        _infile_table(connection, table, fields, rows, progress)
+    elif method == "insert":
+        batch_size = batch_size or BULK_IMPORT_CONFIG["batch_size"]
+        _insert_table(connection, table, fields, rows, progress, batch_size)
+    else:
+        raise ValueError(f"Unknown import method: {method}")
+
+
+def import_directory(connection, directory, tables=None, **options):
+    """Load every ``<table>.csv`` found in ``directory``, parents first.
+
+    Args:
+        connection: An open MySQL connection
+        directory (str): Folder holding the CSV files
+        tables (list): Only load these tables, or None for every file found
+        **options: Passed on to import_table()
+
+    Yields:
+        dict: The report of each table as soon as it is loaded
+    """
+    for table, _, _ in TABLES:
+        if tables and table not in tables:
+            continue
+        path = os.path.join(directory, f"{table}.csv")
+        if os.path.exists(path):
+            yield import_table(connection, table, path, **options)
@@ -0,0 +1,490 @@
+import math
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
+# Read-through cache configuration
+CACHE_CONFIG = {
+    "enabled": True,  # Serve cached reads; when off every read hits the database
+    "backend": os.environ.get("CACHE_BACKEND", "local"),  # local or shared
+    "shared_url": os.environ.get("CACHE_SHARED_URL", "redis://localhost:6379/0"),
+    "prefix": os.environ.get("CACHE_PREFIX", "jogging"),  # Namespace on the server
+    "ttl": 60,  # Seconds a cached value is trusted
+    "maxsize": 10000,  # Entries kept per cache before the least recently used go
+}
+
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl`` seconds after being set.
+
+    None is a cacheable value, so lookups that found nothing are remembered
+    too; use MISSING to tell a miss apart. A delete cancels the loads of
+    that key still in flight, so a value read before an invalidation is
+    never stored after it.
+    """
+
+    def __init__(self, name, maxsize=None, ttl=None, clock=time.monotonic):
+        self.name = name
+        self.maxsize = CACHE_CONFIG["maxsize"] if maxsize is None else maxsize
+        self.ttl = CACHE_CONFIG["ttl"] if ttl is None else ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key, default=MISSING):
+        """Return the cached value for ``key`` or ``default``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return default
+
+    def set(self, key, value):
+        """Cache ``value`` under ``key``, evicting the least recently used entry."""
+        with self._lock:
+            self._put(key, value)
+
+    def _put(self, key, value):
+        self._entries[key] = (value, self._clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def delete(self, *keys):
+        """Forget the given keys."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._loading.pop(key, None)
+
+    def clear(self):
+        """Forget every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._loading.clear()
+
+    def get_or_load(self, key, load):
+        """Return the cached value for ``key``, calling ``load()`` on a miss."""
+        if not CACHE_CONFIG["enabled"]:
+            return load()
+        value = self.get(key)
+        if value is MISSING:
+            token = object()
+            with self._lock:
+                self._loading[key] = token
+            try:
+                value = load()
+            except BaseException:
+                with self._lock:
+                    if self._loading.get(key) is token:
+                        del self._loading[key]
+                raise
+            with self._lock:
+                # A delete while loading means the value may predate the write
+                if self._loading.get(key) is token:
+                    del self._loading[key]
+                    self._put(key, value)
+        return value
+
+    def stats(self):
+        """Return a snapshot of the cache's size and hit counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+class SharedCache:
+    """Cache kept on a Redis-compatible server and shared by every worker.
+
+    Each value is pickled together with the cache's generation number and
+    its key's version. clear() bumps the generation on the server and
+    delete() bumps the versions of its keys, so every worker treats older
+    values as misses without a broadcast channel, and a value loaded before
+    an invalidation can never be stored as current. A lookup is one MGET
+    round trip. Server errors count as misses, leaving the database as the
+    fallback.
+    """
+
+    def __init__(self, name, client, ttl=None, prefix=None):
+        self.name = name
+        self.ttl = CACHE_CONFIG["ttl"] if ttl is None else ttl
+        self._client = client
+        self._prefix = f"{CACHE_CONFIG['prefix'] if prefix is None else prefix}:{name}"
+        self._generation_key = f"{self._prefix}:generation"
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    def _key(self, key):
+        return f"{self._prefix}:{key!r}"
+
+    def _version_key(self, key):
+        return f"{self._prefix}:version:{key!r}"
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _versions(self, key):
+        """Return the current (generation, key version) and the stored value."""
+        generation, version, raw = self._client.mget(
+            [self._generation_key, self._version_key(key), self._key(key)]
+        )
+        return (int(generation or 0), int(version or 0)), raw
+
+    def _lookup(self, key):
+        """Return (value or MISSING, current versions or None on error)."""
+        try:
+            versions, raw = self._versions(key)
+        except Exception:
+            self._count("_errors")
+            self._count("_misses")
+            return MISSING, None
+        if raw is not None:
+            stored_versions, value = pickle.loads(raw)
+            if stored_versions == versions:
+                self._count("_hits")
+                return value, versions
+        self._count("_misses")
+        return MISSING, versions
+
+    def _store(self, key, value, versions):
+        try:
+            self._client.set(
+                self._key(key),
+                pickle.dumps((versions, value)),
+                ex=max(1, math.ceil(self.ttl)),
+            )
+        except Exception:
+            self._count("_errors")
+
+    def get(self, key, default=MISSING):
+        """Return the cached value for ``key`` or ``default``."""
+        value, _ = self._lookup(key)
+        return default if value is MISSING else value
+
+    def set(self, key, value):
+        """Cache ``value`` under ``key`` for the current versions."""
+        try:
+            versions, _ = self._versions(key)
+        except Exception:
+            self._count("_errors")
+            return
+        self._store(key, value, versions)
+
+    def delete(self, *keys):
+        """Forget the given keys on every worker."""
+        # A version outlives every value stored against the one before it,
+        # unless a load takes longer than the TTL
+        expiry = 2 * max(1, math.ceil(self.ttl))
+        try:
+            for key in keys:
+                self._client.incr(self._version_key(key))
+                self._client.expire(self._version_key(key), expiry)
+        except Exception:
+            self._count("_errors")
+
+    def clear(self):
+        """Forget every entry on every worker by moving to a new generation."""
+        try:
+            self._client.incr(self._generation_key)
+        except Exception:
+            self._count("_errors")
+
+    def get_or_load(self, key, load):
+        """Return the cached value for ``key``, calling ``load()`` on a miss."""
+        if not CACHE_CONFIG["enabled"]:
+            return load()
+        value, versions = self._lookup(key)
+        if value is MISSING:
+            value = load()
+            if versions is not None:
+                self._store(key, value, versions)
+        return value
+
+    def stats(self):
+        """Return this worker's hit counters for the shared cache."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0,
+                "errors": self._errors,
+            }
+
+
+class VersionedSnapshot:
+    """In-memory copy of a small, rarely written table with a version number.
+
+    Reads are served from memory until bump() moves to a new version; the
+    rows are then loaded again on next use. A load that races a bump is
+    tagged with the version it started from, so it is never served as the
+    newer version. With the shared cache backend the version is kept on the
+    server, so every worker sees a bump on its next read and rows are kept
+    until one; otherwise, or while the server cannot be reached, other
+    workers pick it up after at most ``max_age`` seconds.
+
+    Rows are served as read-only mappings, so callers can share them without
+    copying. Given a ``key`` column, rows can also be looked up by it.
+    """
+
+    def __init__(self, name, load, max_age=None, key=None, clock=time.monotonic):
+        self.name = name
+        self.max_age = CACHE_CONFIG["ttl"] if max_age is None else max_age
+        self.key = key
+        self._load = load
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version_key = f"{CACHE_CONFIG['prefix']}:{name}:version"
+        self._version = 0
+        self._rows = None
+        self._by_key = None
+        self._rows_version = -1
+        self._loaded_at = None
+        self._hits = 0
+        self._loads = 0
+
+    @property
+    def version(self):
+        """The current version, bumped by every write to the table."""
+        return self._version
+
+    def _fresh(self, shared):
+        return self._rows_version == self._version and (
+            shared or self._clock() - self._loaded_at < self.max_age
+        )
+
+    def _sync_version(self):
+        """Adopt the shared version; return False without a reachable server."""
+        client = _get_shared_client()
+        if client is None:
+            return False
+        try:
+            version = int(client.get(self._version_key) or 0)
+        except Exception:
+            return False
+        with self._lock:
+            self._version = version
+        return True
+
+    def _current(self):
+        """Return the current version's rows and rows by key, loading if needed."""
+        if CACHE_CONFIG["enabled"]:
+            shared = self._sync_version()
+            with self._lock:
+                if self._fresh(shared):
+                    self._hits += 1
+                    return self._rows, self._by_key
+                version = self._version
+        else:
+            version = None
+        rows = tuple(MappingProxyType(row) for row in self._load())
+        by_key = {row[self.key]: row for row in rows} if self.key else {}
+        with self._lock:
+            self._loads += 1
+            if version is not None and version == self._version:
+                self._rows = rows
+                self._by_key = by_key
+                self._rows_version = version
+                self._loaded_at = self._clock()
+        return rows, by_key
+
+    def rows(self):
+        """Return the rows of the current version, loading them if needed."""
+        return self._current()[0]
+
+    def get(self, key, default=None):
+        """Return the row whose ``key`` column equals ``key``, or ``default``."""
+        return self._current()[1].get(key, default)
+
+    def bump(self):
+        """Move to a new version; the next read loads the table again."""
+        version = None
+        client = _get_shared_client()
+        if client is not None:
+            try:
+                version = int(client.incr(self._version_key))
+            except Exception:
+                pass
+        with self._lock:
+            self._version = self._version + 1 if version is None else version
+            self._rows = None
+            self._by_key = None
+            self._rows_version = -1
+            return self._version
+
+    def refresh(self):
+        """Bump the version and load the table now, returning the new version."""
+        version = self.bump()
+        self.rows()
+        return version
+
+    def clear(self):
+        """Drop the loaded rows by moving to a new version."""
+        self.bump()
+
+    def stats(self):
+        """Return the snapshot's version, size and load counters."""
+        with self._lock:
+            age = None
+            if self._loaded_at is not None and self._rows is not None:
+                age = round(self._clock() - self._loaded_at, 3)
+            return {
+                "version": self._version,
+                "size": None if self._rows is None else len(self._rows),
+                "age": age,
+                "max_age": self.max_age,
+                "hits": self._hits,
+                "loads": self._loads,
+            }
+
+
+def _connect_shared(url):
+    """Open a client for the shared cache server."""
+    try:
+        import redis
+    except ImportError as e:
+        raise RuntimeError(
+            "CACHE_BACKEND=shared needs the redis package: pip install redis"
+        ) from e
+    return redis.Redis.from_url(url)
+
+
+class Cache:
+    """Named cache used by the repositories, backed by the configured store.
+
+    Repositories keep references to these objects, so configure_caches()
+    can swap every store between the in-process and shared backends.
+    """
+
+    def __init__(self, name, **options):
+        self.name = name
+        self._options = options
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = _make_backend(self.name, **self._options)
+        return self._backend
+
+    def get(self, key, default=MISSING):
+        return self.backend.get(key, default)
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_or_load(self, key, load):
+        return self.backend.get_or_load(key, load)
+
+    def stats(self):
+        return {"backend": CACHE_CONFIG["backend"], **self.backend.stats()}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+_shared_client = None
+
+
+def _get_shared_client():
+    """Return the shared cache server's client, or None with the local backend."""
+    global _shared_client
+    if CACHE_CONFIG["backend"] != "shared":
+        return None
+    with _caches_lock:
+        if _shared_client is None:
+            _shared_client = _connect_shared(CACHE_CONFIG["shared_url"])
+        return _shared_client
+
+
+def _make_backend(name, maxsize=None, ttl=None):
+    if CACHE_CONFIG["backend"] == "local":
+        return TTLCache(name, maxsize=maxsize, ttl=ttl)
+    if CACHE_CONFIG["backend"] == "shared":
+        return SharedCache(name, _get_shared_client(), ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {CACHE_CONFIG['backend']}")
+
+
+def configure_caches(backend=None, client=None):
+    """Switch every cache to the local or shared backend.
+
+    Args:
+        backend (str): "local" or "shared"; None keeps the configured backend
+        client: A Redis-compatible client for the shared backend, or None to
+            connect to CACHE_CONFIG["shared_url"] on first use
+    """
+    global _shared_client
+    with _caches_lock:
+        if backend is not None:
+            CACHE_CONFIG["backend"] = backend
+        _shared_client = client
+        for cache in _caches.values():
+            if isinstance(cache, Cache):
+                cache._backend = None
+
+
+def get_cache(name, **options):
+    """Return the process-wide cache called ``name``, creating it on first use."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = Cache(name, **options)
+        return _caches[name]
+
+
+def get_snapshot(name, load, max_age=None, key=None):
+    """Return the process-wide snapshot called ``name``, creating it on first use."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = VersionedSnapshot(name, load, max_age=max_age, key=key)
+        return _caches[name]
+
+
+def get_cache_stats():
+    """Return hit counters for every process-wide cache and snapshot."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
+
+
+def clear_caches():
+    """Empty every process-wide cache and snapshot."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,262 @@
+"""Maintenance commands for the jogging database.
+
+Run from the app directory, e.g. ``python cli.py migrate``.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import mysql.connector
+
+from bulk_import import TABLES, import_directory
+from database import DB_CONFIG
+from export import EXPORTS, FORMATS, check_export, export_rows
+from migrations import apply_migrations
+from synthetic_data import SyntheticDataset, load_mysql, write_csv
+from models.repositories import (
+    LeaderboardRepository,
+    RegistrationRepository,
+    ReviewRepository,
+)
+
+
+def migrate(args):
+    """Apply pending schema migrations."""
+    applied = apply_migrations()
+    if applied:
+        for name in applied:
+            print(f"Applied {name}")
+    else:
+        print("Schema is up to date")
+
+
+def reconcile_participants(args):
+    """Compare event participant counters with the registrations table."""
+    drift = RegistrationRepository.reconcile_participant_counts(repair=args.repair)
+    for row in drift:
+        print(
+            f"Event {row['EventID']}: counter {row['CurrentParticipants']}, "
+            f"registrations {row['ActualParticipants']}"
+        )
+    action = "Repaired" if args.repair else "Found"
+    print(f"{action} {len(drift)} drifted event counter(s)")
+
+
+def rebuild_leaderboard(args):
+    """Recompute materialized leaderboard entries from session data."""
+    entries = LeaderboardRepository.rebuild(event_id=args.event)
+    print(f"Rebuilt {entries} leaderboard entr{'y' if entries == 1 else 'ies'}")
+
+
+def check_leaderboard(args):
+    """Compare the materialized leaderboard with the leaderboard view."""
+    differences = LeaderboardRepository.check_consistency(event_id=args.event)
+    for event_id, name, finish_time, rank, count in differences:
+        source = "view" if count > 0 else "materialized table"
+        print(
+            f"Event {event_id}: rank {rank} {name} ({finish_time} s) "
+            f"only in {source}"
+        )
+    print(f"Found {len(differences)} leaderboard difference(s)")
+    return 1 if differences else 0
+
+
+def rebuild_ratings(args):
+    """Recompute route and event rating summaries from the reviews."""
+    summaries = ReviewRepository.rebuild_rating_summaries(subject=args.only)
+    print(f"Rebuilt {summaries} rating summar{'y' if summaries == 1 else 'ies'}")
+
+
+def import_csv(args):
+    """Validate and bulk-load the CSV files of a directory, parents first."""
+    connection = mysql.connector.connect(
+        **DB_CONFIG, allow_local_infile=args.method == "infile"
+    )
+    connection.autocommit = False
+    started = time.perf_counter()
+    loaded = rejected = 0
+    try:
+        for report in import_directory(
+            connection,
+            args.directory,
+            tables=args.tables,
+            method=args.method,
+            batch_size=args.batch_size,
+        ):
+            loaded += report["loaded"]
+            rejected += report["rejected"]
+            print(
+                f"{report['table']}: {report['loaded']} loaded, "
+                f"{report['rejected']} rejected in {report['seconds']} s "
+                f"({report['rows_per_second']} rows/s)"
+            )
+            for error in report["errors"]:
+                print(f"  {error}")
+    finally:
+        connection.close()
+    elapsed = time.perf_counter() - started
+    print(
+        f"Loaded {loaded} row(s), rejected {rejected}, in {elapsed:.1f} s "
+        f"({loaded / elapsed if elapsed else 0:.0f} rows/s)"
+    )
+
+    _rebuild_derived()
+    return 1 if rejected else 0
+
+
+def _rebuild_derived():
+    # Counters and materialized tables are derived from the loaded rows
+    RegistrationRepository.reconcile_participant_counts(repair=True)
+    LeaderboardRepository.rebuild()
+    ReviewRepository.rebuild_rating_summaries()
+    print("Rebuilt participant counters, leaderboards and rating summaries")
+
+
+def generate_data(args):
+    """Generate seeded synthetic data as CSV files or straight into MySQL."""
+    dataset = SyntheticDataset(sessions=args.sessions, seed=args.seed)
+    started = time.perf_counter()
+    if args.output:
+        for report in write_csv(dataset, args.output):
+            print(
+                f"{report['table']}: {report['rows']} row(s) written to "
+                f"{report['path']} in {report['seconds']} s"
+            )
+    else:
+        connection = mysql.connector.connect(
+            **DB_CONFIG, allow_local_infile=args.method == "infile"
+        )
+        connection.autocommit = False
+        try:
+            for report in load_mysql(
+                dataset, connection, method=args.method, batch_size=args.batch_size
+            ):
+                print(
+                    f"{report['table']}: {report['loaded']} loaded in "
+                    f"{report['seconds']} s ({report['rows_per_second']} rows/s)"
+                )
+        finally:
+            connection.close()
+    print(
+        f"Generated {args.sessions} session(s) in {time.perf_counter() - started:.1f} s"
+    )
+    if not args.output:
+        _rebuild_derived()
+
+
+def export(args):
+    """Stream a jogger's or an event's history to a file or stdout."""
+    owner_id = args.owner_id if args.owner == "jogger" else int(args.owner_id)
+    try:
+        check_export(args.owner, args.dataset, args.format)
+    except (ValueError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        for data in export_rows(args.owner, owner_id, args.dataset, args.format):
+            output.write(data)
+            written += len(data)
+    finally:
+        if args.output:
+            output.close()
+    if args.output:
+        print(f"Wrote {written} bytes to {args.output}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Jogging database maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("migrate", help=migrate.__doc__)
+    command.set_defaults(handler=migrate)
+
+    command = commands.add_parser(
+        "reconcile-participants", help=reconcile_participants.__doc__
+    )
+    command.add_argument(
+        "--repair", action="store_true", help="Rewrite drifted counters"
+    )
+    command.set_defaults(handler=reconcile_participants)
+
+    command = commands.add_parser(
+        "rebuild-leaderboard", help=rebuild_leaderboard.__doc__
+    )
+    command.add_argument("--event", type=int, help="Only rebuild this event")
+    command.set_defaults(handler=rebuild_leaderboard)
+
+    command = commands.add_parser("check-leaderboard", help=check_leaderboard.__doc__)
+    command.add_argument("--event", type=int, help="Only check this event")
+    command.set_defaults(handler=check_leaderboard)
+
+    command = commands.add_parser("rebuild-ratings", help=rebuild_ratings.__doc__)
+    command.add_argument(
+        "--only", choices=["route", "event"], help="Only rebuild this kind"
+    )
+    command.set_defaults(handler=rebuild_ratings)
+
+    command = commands.add_parser("import-csv", help=import_csv.__doc__)
+    command.add_argument(
+        "directory",
+        nargs="?",
+        default=os.path.join(os.path.dirname(__file__), "..", "data"),
+        help="Folder with <table>.csv files (default: the repository's data/)",
+    )
+    command.add_argument(
+        "--tables",
+        type=lambda value: value.split(","),
+        help=f"Comma-separated subset of: {', '.join(t for t, _, _ in TABLES)}",
+    )
+    command.add_argument(
+        "--method",
+        choices=["insert", "infile"],
+        default="insert",
+        help="Batched INSERTs, or LOAD DATA LOCAL INFILE of the validated rows",
+    )
+    command.add_argument("--batch-size", type=int, help="Rows per INSERT batch")
+    command.set_defaults(handler=import_csv)
+
+    command = commands.add_parser("generate-data", help=generate_data.__doc__)
+    command.add_argument(
+        "--sessions",
+        type=int,
+        default=10000,
+        help="Sessions to generate; the other tables scale with it",
+    )
+    command.add_argument(
+        "--seed", default="1", help="The same seed gives the same data"
+    )
+    command.add_argument(
+        "--output",
+        help="Write <table>.csv files to this folder instead of loading MySQL",
+    )
+    command.add_argument(
+        "--method",
+        choices=["insert", "infile"],
+        default="insert",
+        help="How rows are loaded into MySQL",
+    )
+    command.add_argument("--batch-size", type=int, help="Rows per INSERT batch")
+    command.set_defaults(handler=generate_data)
+
+    command = commands.add_parser("export", help=export.__doc__)
+    command.add_argument("owner", choices=["jogger", "event"])
+    command.add_argument("owner_id", help="The jogger's email or the event's ID")
+    command.add_argument("dataset", choices=sorted({dataset for _, dataset in EXPORTS}))
+    command.add_argument("--format", choices=list(FORMATS), default="csv")
+    command.add_argument("--output", help="File to write (default: stdout)")
+    command.set_defaults(handler=export)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
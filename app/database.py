@@ -1,6 +1,16 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import anyio
+from anyio.lowlevel import RunVar
 import mysql.connector
 from mysql.connector import Error
-from contextlib import contextmanager
+from mysql.connector.errors import PoolError
+
+import query_log
 
 # Database configuration
 DB_CONFIG = {
@@ -10,34 +20,609 @@ DB_CONFIG = {
     "password": "",  # Change as needed
 }
 
+# Connection pool configuration
+DB_POOL_CONFIG = {
+    "pool_size": 5,  # Connections kept open while idle
+    "max_overflow": 10,  # Extra connections opened under load, closed on return
+    "max_lifetime": 1800,  # Seconds before a connection is recycled
+    "idle_timeout": 300,  # Seconds an idle connection may sit in the pool
+    "checkout_timeout": 30,  # Seconds to wait for a free connection
+    "pre_ping": True,  # Check the connection is alive on checkout
+}
+
+# Async handler configuration
+ASYNC_DB_CONFIG = {
+    "enabled": True,  # Run queries from async handlers in worker threads
+    "max_workers": None,  # Concurrent queries; None matches pool_size + max_overflow
+}
+
+
+class _PoolEntry:
+    """Bookkeeping for a single pooled connection."""
+
+    __slots__ = ("connection", "created_at", "last_used")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections.
+
+    Keeps up to ``pool_size`` idle connections around and opens up to
+    ``max_overflow`` additional ones when all of them are checked out.
+    Connections older than ``max_lifetime`` or idle for longer than
+    ``idle_timeout`` are closed instead of being handed out again.
+    """
+
+    RATE_WINDOW = 60
+
+    def __init__(
+        self,
+        connect_args,
+        pool_size=5,
+        max_overflow=10,
+        max_lifetime=1800,
+        idle_timeout=300,
+        checkout_timeout=30,
+        pre_ping=True,
+        connect=None,
+    ):
+        self.connect_args = dict(connect_args)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.pre_ping = pre_ping
+        self._connect = connect or mysql.connector.connect
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._checked_out = {}
+        self._open = 0
+        self._closed = False
+
+        self._started_at = time.monotonic()
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._recent = deque()
+
+    def _expired(self, entry, now):
+        if self.max_lifetime and now - entry.created_at > self.max_lifetime:
+            return True
+        if self.idle_timeout and now - entry.last_used > self.idle_timeout:
+            return True
+        return False
+
+    def _close(self, entry):
+        try:
+            entry.connection.close()
+        except Error:
+            pass
+
+    def _discard(self, entry):
+        """Close a connection and free its slot."""
+        self._close(entry)
+        with self._cond:
+            self._open -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def _new_entry(self):
+        try:
+            entry = _PoolEntry(self._connect(**self.connect_args))
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created += 1
+        return entry
+
+    def acquire(self):
+        """Borrow a connection from the pool, opening one if allowed."""
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        entry = None
+        stale = []
+
+        with self._cond:
+            while entry is None:
+                now = time.monotonic()
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if self._expired(candidate, now):
+                        stale.append(candidate)
+                        self._open -= 1
+                        self._discarded += 1
+                    else:
+                        entry = candidate
+                        break
+                if entry is not None:
+                    break
+                if self._open < self.pool_size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolError("Timed out waiting for a database connection")
+                self._cond.wait(remaining)
+
+        for candidate in stale:
+            self._close(candidate)
+
+        if entry is None:
+            entry = self._new_entry()
+        elif self.pre_ping and not self._is_alive(entry.connection):
+            # Keep the slot reserved while the dead connection is replaced
+            self._close(entry)
+            with self._cond:
+                self._discarded += 1
+            entry = self._new_entry()
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._checked_out[id(entry.connection)] = entry
+            self._record_checkout(waited)
+        query_log.log_checkout(waited)
+        return entry.connection
+
+    def release(self, connection, discard=False):
+        """Return a borrowed connection to the pool.
+
+        The connection is not pinged here; one that died is caught by the
+        rollback below or by the pre-ping on its next checkout.
+
+        Args:
+            connection (Connection): The borrowed connection
+            discard (bool): Close the connection instead of keeping it idle
+        """
+        with self._cond:
+            entry = self._checked_out.pop(id(connection), None)
+        if entry is None:
+            return
+
+        now = time.monotonic()
+        reusable = not discard and not self._expired(entry, now)
+        if reusable:
+            try:
+                if connection.in_transaction:
+                    connection.rollback()
+            except Error:
+                reusable = False
+
+        with self._cond:
+            if reusable and not self._closed and len(self._idle) < self.pool_size:
+                entry.last_used = now
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+        self._discard(entry)
+
+    def close(self):
+        """Close every idle connection; borrowed ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for entry in idle:
+            self._close(entry)
+
+    @staticmethod
+    def _is_alive(connection):
+        try:
+            return connection.is_connected()
+        except Error:
+            return False
+
+    def _record_checkout(self, waited):
+        now = time.monotonic()
+        self._checkouts += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        self._recent.append(now)
+        while self._recent and now - self._recent[0] > self.RATE_WINDOW:
+            self._recent.popleft()
+
+    def stats(self):
+        """Return a snapshot of pool usage counters."""
+        with self._cond:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > self.RATE_WINDOW:
+                self._recent.popleft()
+            window = min(self.RATE_WINDOW, now - self._started_at) or 1
+            return {
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "in_use": len(self._checked_out),
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "checkouts_per_sec": round(len(self._recent) / window, 2),
+                "avg_wait_ms": round(
+                    self._wait_total / self._checkouts * 1000 if self._checkouts else 0,
+                    3,
+                ),
+                "max_wait_ms": round(self._wait_max * 1000, 3),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "discarded": self._discarded,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+    return _pool
+
+
+def configure_pool(**overrides):
+    """Replace the process-wide pool using DB_POOL_CONFIG plus overrides."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(DB_CONFIG, **{**DB_POOL_CONFIG, **overrides})
+    return _pool
+
+
+def get_pool_stats():
+    """Return usage counters for the process-wide connection pool."""
+    return get_pool().stats()
+
+
+class UnitOfWork:
+    """A single connection and transaction shared by every query in a scope.
+
+    The connection is borrowed lazily on first use, so scopes that never
+    touch the database never check one out. Writes issued through
+    get_db_cursor(commit=True) are not committed individually; the owner
+    of the unit commits once at the end.
+    """
+
+    def __init__(self, pool=None, connection=None):
+        self._pool = pool
+        self._connection = connection
+        self._owns_connection = connection is None
+        self._after_commit = []
+        self._after_rollback = []
+        self._dirty = False
+
+    @property
+    def connection(self):
+        """The unit's connection, borrowed from the pool on first access."""
+        if self._connection is None:
+            self._pool = self._pool or get_pool()
+            self._connection = self._pool.acquire()
+        return self._connection
+
+    @property
+    def active(self):
+        """Whether a connection has been borrowed for this unit."""
+        return self._connection is not None
+
+    @property
+    def dirty(self):
+        """Whether the unit has written anything it has not yet committed."""
+        return self._dirty
+
+    @property
+    def pending(self):
+        """Whether commit() has work to do."""
+        return self._connection is not None or bool(self._after_commit)
+
+    def after_commit(self, callback):
+        """Run ``callback`` once the unit's writes have been committed.
+
+        With a caller-owned connection the callbacks run when the unit ends,
+        since the transaction is then the caller's to finish.
+        """
+        self._after_commit.append(callback)
+
+    def after_rollback(self, callback):
+        """Run ``callback`` once the unit's writes have been rolled back."""
+        self._after_rollback.append(callback)
+
+    def commit(self):
+        """Commit everything written so far."""
+        if self._connection is not None and self._owns_connection:
+            self._connection.commit()
+        self._dirty = False
+        self._after_rollback = []
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        """Discard everything written so far."""
+        self._after_commit = []
+        self._dirty = False
+        if self._connection is not None and self._owns_connection:
+            self._connection.rollback()
+        callbacks, self._after_rollback = self._after_rollback, []
+        for callback in callbacks:
+            callback()
+
+    def close(self):
+        """Return the connection to the pool."""
+        if self._connection is not None and self._owns_connection:
+            self._pool.release(self._connection)
+            self._connection = None
+
+
+_current_unit = ContextVar("current_unit_of_work", default=None)
+
+
+def current_unit_of_work():
+    """Return the unit of work active in this context, if any."""
+    return _current_unit.get()
+
+
+def writes_pending():
+    """Whether the current unit of work has uncommitted writes."""
+    unit = _current_unit.get()
+    return unit is not None and unit.dirty
+
+
+def on_commit(callback):
+    """Run ``callback`` after the current unit of work commits, or now if none."""
+    unit = _current_unit.get()
+    if unit is None:
+        callback()
+    else:
+        unit.after_commit(callback)
+
+
+def on_rollback(callback):
+    """Run ``callback`` if the current unit of work rolls back; never without one."""
+    unit = _current_unit.get()
+    if unit is not None:
+        unit.after_rollback(callback)
+
+
+@contextmanager
+def unit_of_work(connection=None):
+    """Run the enclosed queries on one connection and commit them together.
+
+    Nested calls join the outermost unit, which alone commits or rolls back.
+
+    Args:
+        connection (Connection): An existing connection to bind instead of borrowing
+            one from the pool. The caller keeps ownership: it is never committed,
+            rolled back or closed by the unit.
+    """
+    unit = _current_unit.get()
+    if unit is not None:
+        yield unit
+        return
+
+    unit = UnitOfWork(connection=connection)
+    token = _current_unit.set(unit)
+    try:
+        yield unit
+        unit.commit()
+    except BaseException:
+        unit.rollback()
+        raise
+    finally:
+        _current_unit.reset(token)
+        unit.close()
+
+
+_db_limiter = RunVar("db_limiter")
+_checkout_limiter = RunVar("checkout_limiter")
+
+
+def _get_limiter(run_var):
+    """Return this event loop's limiter stored in ``run_var``."""
+    try:
+        return run_var.get()
+    except LookupError:
+        workers = ASYNC_DB_CONFIG["max_workers"] or (
+            DB_POOL_CONFIG["pool_size"] + DB_POOL_CONFIG["max_overflow"]
+        )
+        limiter = anyio.CapacityLimiter(workers)
+        run_var.set(limiter)
+        return limiter
+
+
+def _get_db_limiter():
+    """Return this event loop's limiter on concurrent database calls."""
+    return _get_limiter(_db_limiter)
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """Await a blocking database call without stalling the event loop.
+
+    The call runs in a worker thread that sees the caller's context, so it
+    joins the request's unit of work. Waiting callers queue on the event
+    loop once every pooled connection is busy. With ASYNC_DB_CONFIG disabled
+    the call runs inline.
+
+    A unit of work borrows its connection before the call takes a query
+    slot, under a limiter of its own. Otherwise requests waiting for the
+    pool could hold every slot while the requests that hold the connections
+    wait for a slot to run their next query and give them back.
+    """
+    if not ASYNC_DB_CONFIG["enabled"]:
+        return func(*args, **kwargs)
+    unit = _current_unit.get()
+    # Calls on the unit itself (commit, rollback, close) need no connection
+    if (
+        unit is not None
+        and not unit.active
+        and getattr(func, "__self__", None) is not unit
+    ):
+        await anyio.to_thread.run_sync(
+            lambda: unit.connection, limiter=_get_limiter(_checkout_limiter)
+        )
+    return await anyio.to_thread.run_sync(
+        lambda: func(*args, **kwargs), limiter=_get_db_limiter()
+    )
+
+
+class UnitOfWorkMiddleware:
+    """ASGI middleware sharing one connection and transaction per request.
+
+    Every repository call made while handling the request reuses the same
+    connection. The writes are committed just before the response starts,
+    so a redirect never reaches the client ahead of the data it points at,
+    and a failed commit is answered with a 500 instead of a success. A
+    request handled inside an existing unit of work joins it and leaves the
+    commit to its owner.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _current_unit.get() is not None:
+            await self.app(scope, receive, send)
+            return
+
+        unit = UnitOfWork()
+        token = _current_unit.set(unit)
+        failed = False
+
+        async def send_after_commit(message):
+            nonlocal failed
+            if failed:
+                return
+            if message["type"] == "http.response.start" and unit.pending:
+                try:
+                    await run_in_db_thread(unit.commit)
+                except Error as e:
+                    print(f"Database error: {e}")
+                    failed = True
+                    await _send_commit_failed(send)
+                    return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_after_commit)
+            if unit.pending and not failed:
+                await run_in_db_thread(unit.commit)
+        except BaseException:
+            if unit.pending:
+                await run_in_db_thread(unit.rollback)
+            raise
+        finally:
+            _current_unit.reset(token)
+            if unit.active:
+                await run_in_db_thread(unit.close)
+
+
+async def _send_commit_failed(send):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 500,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+        }
+    )
+    await send({"type": "http.response.body", "body": b"Internal Server Error"})
+
+
+async def get_unit_of_work():
+    """FastAPI dependency returning the request's unit of work.
+
+    The unit is opened and committed by UnitOfWorkMiddleware. Handlers that
+    need to abandon their writes can depend on this and call rollback().
+    """
+    unit = _current_unit.get()
+    if unit is None:
+        raise RuntimeError("UnitOfWorkMiddleware is not installed")
+    return unit
+
+
+@contextmanager
+def detached_connection():
+    """Borrow a connection outside the current unit of work, for cache loads.
+
+    Reads on it see every committed write rather than the unit's snapshot
+    and its uncommitted changes, so what they load is safe to share with
+    other requests. A unit that has not started its transaction yet lends
+    its own connection, since a first read there sees the same, and the
+    request then needs only one. A unit bound to a caller's connection
+    (maintenance commands, tests) reads on that connection too, since the
+    caller decides what is committed.
+    """
+    unit = _current_unit.get()
+    if unit is not None and (
+        not unit._owns_connection or not unit.connection.in_transaction
+    ):
+        yield unit.connection
+        return
+
+    pool = get_pool()
+    connection = pool.acquire()
+    try:
+        yield connection
+    finally:
+        pool.release(connection)
+
 
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections."""
+    """Context manager for database connections borrowed from the pool."""
+    unit = _current_unit.get()
+    if unit is not None:
+        yield unit.connection
+        return
+
+    pool = get_pool()
     connection = None
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
+        connection = pool.acquire()
         yield connection
     except Error as e:
         print(f"Database error: {e}")
         raise
     finally:
-        if connection and connection.is_connected():
-            connection.close()
+        if connection is not None:
+            pool.release(connection)
 
 
 @contextmanager
 def get_db_cursor(commit=False, connection=None):
     """Context manager for database cursor.
 
+    Inside a unit of work the unit's connection is used and commits are
+    left to the unit.
+
     Args:
         commit (bool): Whether to commit changes at the end
-        connection (Connection): An existing connection to use, or None to create a new one
+        connection (Connection): An existing connection to use, or None to borrow one from the pool
     """
-    close_connection = False
+    pool = None
+    unit = None
     if connection is None:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        close_connection = True
+        unit = _current_unit.get()
+        if unit is not None:
+            connection = unit.connection
+            unit._dirty = unit._dirty or commit
+            commit = False
+        else:
+            pool = get_pool()
+            connection = pool.acquire()
 
     cursor = connection.cursor(dictionary=True)
     try:
@@ -45,10 +630,51 @@ def get_db_cursor(commit=False, connection=None):
         if commit:
             connection.commit()
     except Error as e:
-        connection.rollback()
+        # A failed statement inside a unit of work is rolled back by its owner
+        if unit is None:
+            connection.rollback()
         print(f"Database error: {e}")
         raise
     finally:
         cursor.close()
-        if close_connection and connection and connection.is_connected():
-            connection.close()
+        if pool is not None:
+            pool.release(connection)
+
+
+def stream_query(query, params=None, chunk_size=1000):
+    """Yield the rows of a query in chunks, read from the server as needed.
+
+    The rows come from an unbuffered cursor on a connection borrowed for the
+    stream alone, so memory stays at one chunk however many rows match, and
+    the caller's unit of work is not touched. The connection is held until
+    the generator is exhausted or closed; one closed early is dropped rather
+    than drained. A request returning the stream should commit and close
+    its unit of work first, or it holds a second connection until the
+    stream ends.
+
+    Args:
+        query (str): A SELECT statement
+        params (tuple): Query parameters
+        chunk_size (int): Rows fetched per round trip and yielded together
+    """
+    pool = get_pool()
+    connection = pool.acquire()
+    cursor = None
+    exhausted = False
+    try:
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        cursor.execute(query, params or ())
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                exhausted = True
+                break
+            yield rows
+    finally:
+        try:
+            if exhausted:
+                cursor.close()
+        except Error:
+            exhausted = False
+        # Unread rows would have to be fetched to reuse the connection
+        pool.release(connection, discard=not exhausted)
@@ -0,0 +1,293 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from database import stream_query
+
+# Bulk export configuration
+EXPORT_CONFIG = {
+    "chunk_size": 1000,  # Rows fetched from the server per round trip
+    "row_group_size": 50000,  # Rows per Parquet row group, the most held in memory
+}
+
+# Exportable history per owner: (query with one %s per owner ID, [(column, type)])
+EXPORTS = {
+    ("jogger", "sessions"): (
+        """
+        SELECT j.SessionID, j.StartDT, j.EndDT, j.Distance, j.RouteID, jr.RouteName
+        FROM jogging j
+        LEFT JOIN joggingroute jr ON j.RouteID = jr.RouteID
+        WHERE j.JoggerEmail = %s
+        ORDER BY j.SessionID
+        """,
+        [
+            ("SessionID", "int"),
+            ("StartDT", "datetime"),
+            ("EndDT", "datetime"),
+            ("Distance", "float"),
+            ("RouteID", "int"),
+            ("RouteName", "str"),
+        ],
+    ),
+    ("jogger", "registrations"): (
+        """
+        SELECT er.EventID, je.EventName, je.EventDate, er.TimeStamp
+        FROM eventregistration er
+        JOIN joggingevent je ON er.EventID = je.EventID
+        WHERE er.JoggerEmail = %s
+        ORDER BY er.EventID
+        """,
+        [
+            ("EventID", "int"),
+            ("EventName", "str"),
+            ("EventDate", "datetime"),
+            ("TimeStamp", "datetime"),
+        ],
+    ),
+    ("jogger", "reviews"): (
+        """
+        SELECT 'route' AS Subject, RouteID AS SubjectID, ReviewID, Rating, Comment
+        FROM routereview
+        WHERE JoggerEmail = %s
+        UNION ALL
+        SELECT 'event', EventID, ReviewID, Rating, Comment
+        FROM eventreview
+        WHERE JoggerEmail = %s
+        ORDER BY Subject, ReviewID
+        """,
+        [
+            ("Subject", "str"),
+            ("SubjectID", "int"),
+            ("ReviewID", "int"),
+            ("Rating", "int"),
+            ("Comment", "str"),
+        ],
+    ),
+    ("event", "registrations"): (
+        """
+        SELECT er.JoggerEmail, j.Name AS JoggerName, er.TimeStamp
+        FROM eventregistration er
+        JOIN jogger j ON er.JoggerEmail = j.Email
+        WHERE er.EventID = %s
+        ORDER BY er.TimeStamp, er.JoggerEmail
+        """,
+        [("JoggerEmail", "str"), ("JoggerName", "str"), ("TimeStamp", "datetime")],
+    ),
+    ("event", "sessions"): (
+        """
+        SELECT es.SessionID, jog.JoggerEmail, j.Name AS JoggerName,
+               jog.StartDT, jog.EndDT, jog.Distance
+        FROM eventsession es
+        JOIN jogging jog ON es.SessionID = jog.SessionID
+        JOIN jogger j ON jog.JoggerEmail = j.Email
+        WHERE es.EventID = %s
+        ORDER BY es.SessionID
+        """,
+        [
+            ("SessionID", "int"),
+            ("JoggerEmail", "str"),
+            ("JoggerName", "str"),
+            ("StartDT", "datetime"),
+            ("EndDT", "datetime"),
+            ("Distance", "float"),
+        ],
+    ),
+    ("event", "reviews"): (
+        """
+        SELECT ReviewID, Rating, Comment, JoggerEmail
+        FROM eventreview
+        WHERE EventID = %s
+        ORDER BY ReviewID
+        """,
+        [
+            ("ReviewID", "int"),
+            ("Rating", "int"),
+            ("Comment", "str"),
+            ("JoggerEmail", "str"),
+        ],
+    ),
+}
+
+# Output formats: (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError(
+            "Parquet and Arrow exports need the pyarrow package: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+def datasets(owner):
+    """Return the names of the datasets that can be exported for ``owner``."""
+    return [dataset for kind, dataset in EXPORTS if kind == owner]
+
+
+def check_export(owner, dataset, fmt):
+    """Raise ValueError for an unknown export and RuntimeError for a missing library."""
+    if (owner, dataset) not in EXPORTS:
+        raise ValueError(f"Unknown {owner} export: {dataset}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt in ("parquet", "arrow"):
+        _pyarrow()
+
+
+def export_filename(owner, owner_id, dataset, fmt):
+    """Return a download file name such as ``event-2-sessions.csv``."""
+    safe_id = "".join(c if c.isalnum() or c in "._-" else "_" for c in str(owner_id))
+    return f"{owner}-{safe_id}-{dataset}.{FORMATS[fmt][1]}"
+
+
+def _text(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _csv_bytes(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for rows in chunks:
+        for row in rows:
+            writer.writerow(
+                ["" if row[name] is None else _text(row[name]) for name, _ in columns]
+            )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _jsonl_bytes(columns, chunks):
+    for rows in chunks:
+        yield "".join(
+            json.dumps({name: _text(row[name]) for name, _ in columns}) + "\n"
+            for row in rows
+        ).encode()
+
+
+class _Spool(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_schema(pa, columns):
+    types = {
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "str": pa.string(),
+        "datetime": pa.timestamp("s"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _record_batch(pa, schema, columns, rows):
+    arrays = {}
+    for name, kind in columns:
+        values = [row[name] for row in rows]
+        if kind == "float":
+            values = [None if v is None else float(v) for v in values]
+        arrays[name] = values
+    return pa.RecordBatch.from_pydict(arrays, schema=schema)
+
+
+def _arrow_bytes(columns, chunks):
+    pa = _pyarrow()
+    schema = _arrow_schema(pa, columns)
+    sink = _Spool()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in chunks:
+            writer.write_batch(_record_batch(pa, schema, columns, rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _parquet_bytes(columns, chunks):
+    pa = _pyarrow()
+    schema = _arrow_schema(pa, columns)
+    sink = _Spool()
+    pending = []
+    with pa.parquet.ParquetWriter(sink, schema) as writer:
+        for rows in chunks:
+            pending.extend(rows)
+            if len(pending) >= EXPORT_CONFIG["row_group_size"]:
+                writer.write_batch(_record_batch(pa, schema, columns, pending))
+                pending = []
+                yield sink.drain()
+        if pending:
+            writer.write_batch(_record_batch(pa, schema, columns, pending))
+    yield sink.drain()
+
+
+_WRITERS = {
+    "csv": _csv_bytes,
+    "jsonl": _jsonl_bytes,
+    "parquet": _parquet_bytes,
+    "arrow": _arrow_bytes,
+}
+
+
+def export_rows(owner, owner_id, dataset, fmt="csv", chunk_size=None):
+    """Stream one owner's dataset as encoded bytes, one chunk at a time.
+
+    Rows are read with stream_query() and written as they arrive, so memory
+    use does not grow with the number of rows; Parquet holds at most one
+    row group of EXPORT_CONFIG["row_group_size"] rows.
+
+    Args:
+        owner (str): "jogger" or "event"
+        owner_id: The jogger's email or the event's ID
+        dataset (str): One of datasets(owner)
+        fmt (str): One of FORMATS
+        chunk_size (int): Rows per fetch, EXPORT_CONFIG by default
+
+    Yields:
+        bytes: The next piece of the file
+    """
+    check_export(owner, dataset, fmt)
+    query, columns = EXPORTS[(owner, dataset)]
+    params = (owner_id,) * query.count("%s")
+    chunks = stream_query(query, params, chunk_size or EXPORT_CONFIG["chunk_size"])
+    try:
+        for data in _WRITERS[fmt](columns, chunks):
+            if data:
+                yield data
+    finally:
+        chunks.close()
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from fastapi.templating import Jinja2Templates
+from starlette.datastructures import MutableHeaders
+
+import query_log
+
+logger = logging.getLogger("jogging.access")
+
+# Request instrumentation configuration
+INSTRUMENTATION_CONFIG = {
+    "enabled": os.environ.get("REQUEST_METRICS", "on") == "on",
+    # Send the totals to the browser in a Server-Timing header
+    "server_timing": os.environ.get("SERVER_TIMING", "on") == "on",
+    # Log one JSON line per request to jogging.access
+    "access_log": os.environ.get("ACCESS_LOG", "off") == "on",
+    # Times one statement may run in a request before it is flagged as N+1
+    "n_plus_one_threshold": int(os.environ.get("N_PLUS_ONE_THRESHOLD", "5")),
+}
+
+
+class RequestMetrics:
+    """Queries, pool checkouts and template renders of one request."""
+
+    def __init__(self, capture):
+        self.capture = capture
+        self.started = time.perf_counter()
+        self.templates = 0
+        self.template_time = 0.0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def n_plus_one(self, threshold=None):
+        """Return {fingerprint: count} for statements repeated more than ``threshold`` times."""
+        if threshold is None:
+            threshold = INSTRUMENTATION_CONFIG["n_plus_one_threshold"]
+        return self.capture.repeated(threshold + 1)
+
+    def server_timing(self):
+        """Format the metrics so far as a Server-Timing header value."""
+        capture = self.capture
+        entries = [
+            f'db;dur={capture.duration * 1000:.1f};desc="{capture.count} queries"',
+            f'pool;dur={capture.checkout_wait * 1000:.1f};desc="{capture.checkouts} checkouts"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="{self.templates} templates"',
+        ]
+        repeated = self.n_plus_one()
+        if repeated:
+            entries.append(f'n1;desc="{len(repeated)} repeated statements"')
+        entries.append(f"total;dur={self.elapsed * 1000:.1f}")
+        return ", ".join(entries)
+
+    def as_dict(self):
+        capture = self.capture
+        return {
+            "duration_ms": round(self.elapsed * 1000, 3),
+            "queries": capture.count,
+            "db_ms": round(capture.duration * 1000, 3),
+            "rows": capture.rows,
+            "checkouts": capture.checkouts,
+            "checkout_wait_ms": round(capture.checkout_wait * 1000, 3),
+            "templates": self.templates,
+            "template_ms": round(self.template_time * 1000, 3),
+            "n_plus_one": self.n_plus_one(),
+        }
+
+
+_current = ContextVar("request_metrics", default=None)
+
+
+def current_request_metrics():
+    """Return the metrics of the request being handled, if any."""
+    return _current.get()
+
+
+def _log_request(scope, status, metrics):
+    record = {
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        **metrics.as_dict(),
+    }
+    if record["n_plus_one"]:
+        logger.warning(
+            "Possible N+1 in %s %s: %s",
+            scope["method"],
+            scope["path"],
+            json.dumps(record["n_plus_one"]),
+            extra={"request": record},
+        )
+    if INSTRUMENTATION_CONFIG["access_log"]:
+        logger.info("%s", json.dumps(record), extra={"request": record})
+
+
+def configure_access_log(enabled=None):
+    """Turn the one-line-per-request access log on or off."""
+    if enabled is None:
+        enabled = INSTRUMENTATION_CONFIG["access_log"]
+    INSTRUMENTATION_CONFIG["access_log"] = enabled
+    if enabled:
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+            logger.addHandler(handler)
+
+
+class RequestInstrumentationMiddleware:
+    """ASGI middleware that measures each request's database and template work.
+
+    The totals are sent in a Server-Timing header with the response and,
+    once the response is complete, written to the access log. Statements
+    repeated more than the N+1 threshold are always logged as warnings.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not INSTRUMENTATION_CONFIG["enabled"]:
+            await self.app(scope, receive, send)
+            return
+
+        status = None
+        with query_log.capture_queries() as capture:
+            metrics = RequestMetrics(capture)
+            token = _current.set(metrics)
+
+            async def send_with_timing(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if INSTRUMENTATION_CONFIG["server_timing"]:
+                        headers = MutableHeaders(scope=message)
+                        headers.append("Server-Timing", metrics.server_timing())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                _current.reset(token)
+                _log_request(scope, status or 500, metrics)
+
+
+def instrument_templates():
+    """Time every Jinja2Templates.TemplateResponse against the current request."""
+    render = Jinja2Templates.TemplateResponse
+    if getattr(render, "instrumented", False):
+        return
+
+    @wraps(render)
+    def TemplateResponse(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return render(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics.templates += 1
+            metrics.template_time += time.perf_counter() - started
+
+    TemplateResponse.instrumented = True
+    Jinja2Templates.TemplateResponse = TemplateResponse
+
+
+configure_access_log()
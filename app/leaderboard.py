@@ -0,0 +1,390 @@
+import os
+import random
+import threading
+import time
+
+# In-memory leaderboard configuration
+LEADERBOARD_CONFIG = {
+    # Answer rank queries from memory instead of SQL. Each worker keeps its own
+    # boards, which miss other workers' writes until max_age, so this is only
+    # safe with a single worker process.
+    "enabled": os.environ.get("LEADERBOARD_ENGINE", "off") == "on",
+    "max_age": 300,  # Seconds before an event is reloaded, bounding drift
+}
+
+
+class _Node:
+    __slots__ = ("key", "value", "next", "width")
+
+    def __init__(self, key, value, level):
+        self.key = key
+        self.value = value
+        self.next = [None] * level
+        self.width = [1] * level
+
+
+class IndexableSkipList:
+    """Sorted collection with O(log n) insert, remove, rank and positional access.
+
+    Every link records how many bottom-level steps it skips, so the position
+    of a key is the sum of the widths walked while searching for it. Keys
+    must be unique and mutually comparable.
+    """
+
+    MAX_LEVEL = 32
+
+    def __init__(self, seed=None):
+        self._head = _Node(None, None, self.MAX_LEVEL)
+        self._size = 0
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_sorted(cls, items, seed=None):
+        """Build a list from (key, value) pairs already in ascending key order."""
+        skiplist = cls(seed)
+        last = [skiplist._head] * cls.MAX_LEVEL
+        last_position = [0] * cls.MAX_LEVEL
+        position = 0
+        for key, value in items:
+            position += 1
+            node = _Node(key, value, skiplist._random_level())
+            for i in range(len(node.next)):
+                last[i].next[i] = node
+                last[i].width[i] = position - last_position[i]
+                last[i] = node
+                last_position[i] = position
+        for i in range(cls.MAX_LEVEL):
+            last[i].width[i] = position + 1 - last_position[i]
+        skiplist._size = position
+        return skiplist
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        node = self._head.next[0]
+        while node is not None:
+            yield node.key, node.value
+            node = node.next[0]
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and self._random.random() < 0.5:
+            level += 1
+        return level
+
+    def _predecessors(self, key):
+        """Return the last node before ``key`` on every level and its position."""
+        update = [None] * self.MAX_LEVEL
+        steps = [0] * self.MAX_LEVEL
+        node = self._head
+        position = 0
+        for i in reversed(range(self.MAX_LEVEL)):
+            following = node.next[i]
+            while following is not None and following.key < key:
+                position += node.width[i]
+                node = following
+                following = node.next[i]
+            update[i] = node
+            steps[i] = position
+        return update, steps
+
+    def insert(self, key, value=None):
+        """Add ``key`` with an associated value."""
+        update, steps = self._predecessors(key)
+        following = update[0].next[0]
+        if following is not None and following.key == key:
+            raise KeyError(key)
+
+        level = self._random_level()
+        node = _Node(key, value, level)
+        position = steps[0] + 1
+        for i in range(level):
+            previous = update[i]
+            skipped = position - steps[i]
+            node.next[i] = previous.next[i]
+            node.width[i] = previous.width[i] - skipped + 1
+            previous.next[i] = node
+            previous.width[i] = skipped
+        for i in range(level, self.MAX_LEVEL):
+            update[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        """Remove ``key`` and return its value."""
+        update, _ = self._predecessors(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+
+        for i in range(self.MAX_LEVEL):
+            previous = update[i]
+            if i < len(node.next) and previous.next[i] is node:
+                previous.width[i] += node.width[i] - 1
+                previous.next[i] = node.next[i]
+            else:
+                previous.width[i] -= 1
+        self._size -= 1
+        return node.value
+
+    def count_less(self, key):
+        """Return the number of keys that sort before ``key``."""
+        node = self._head
+        position = 0
+        for i in reversed(range(self.MAX_LEVEL)):
+            following = node.next[i]
+            while following is not None and following.key < key:
+                position += node.width[i]
+                node = following
+                following = node.next[i]
+        return position
+
+    def slice(self, start, count):
+        """Return up to ``count`` (key, value) pairs starting at index ``start``."""
+        if start >= self._size or count <= 0:
+            return []
+        node = self._head
+        position = 0
+        for i in reversed(range(self.MAX_LEVEL)):
+            while node.next[i] is not None and position + node.width[i] <= start + 1:
+                position += node.width[i]
+                node = node.next[i]
+
+        items = []
+        while node is not None and len(items) < count:
+            items.append((node.key, node.value))
+            node = node.next[0]
+        return items
+
+
+def _distance_key(distance):
+    # Longest distance first; sessions without a distance sort last, as in SQL
+    return (distance is None, -distance if distance is not None else 0)
+
+
+def _entry_key(entry):
+    # Ties are broken by finish time, with missing times first as in SQL
+    finish_time = entry["FinishTime"]
+    return _distance_key(entry["Distance"]) + (
+        finish_time is not None,
+        finish_time if finish_time is not None else 0,
+        entry["SessionID"],
+    )
+
+
+class EventLeaderboard:
+    """Ranked leaderboard entries for one event.
+
+    Entries are leaderboardentry rows. Ranks follow RANK() over distance:
+    sessions with the same distance share a rank and the next distance skips
+    ahead by the size of the tie.
+    """
+
+    def __init__(self, event_id, entries=()):
+        self.event_id = event_id
+        self.loaded_at = time.monotonic()
+        self._keys = {}
+        self._sessions_by_jogger = {}
+        items = {}
+        for entry in entries:
+            key = _entry_key(entry)
+            items[entry["SessionID"]] = (key, dict(entry))
+            self._keys[entry["SessionID"]] = key
+            self._sessions_by_jogger.setdefault(entry["JoggerEmail"], set()).add(
+                entry["SessionID"]
+            )
+        self._entries = IndexableSkipList.from_sorted(sorted(items.values()))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, session_id):
+        return session_id in self._keys
+
+    def upsert(self, entry):
+        """Add a session's entry, replacing any previous one."""
+        self.discard(entry["SessionID"])
+        key = _entry_key(entry)
+        self._entries.insert(key, dict(entry))
+        self._keys[entry["SessionID"]] = key
+        self._sessions_by_jogger.setdefault(entry["JoggerEmail"], set()).add(
+            entry["SessionID"]
+        )
+
+    def discard(self, session_id):
+        """Remove a session's entry if present."""
+        key = self._keys.pop(session_id, None)
+        if key is None:
+            return
+        entry = self._entries.remove(key)
+        sessions = self._sessions_by_jogger[entry["JoggerEmail"]]
+        sessions.discard(session_id)
+        if not sessions:
+            del self._sessions_by_jogger[entry["JoggerEmail"]]
+
+    def _rank_at(self, key):
+        return self._entries.count_less(key[:2]) + 1
+
+    def _ranked(self, start, count):
+        items = self._entries.slice(start, count)
+        ranked = []
+        rank = None
+        for position, (key, entry) in enumerate(items, start + 1):
+            if rank is None:
+                rank = self._rank_at(key)
+            elif key[:2] != previous:
+                rank = position
+            previous = key[:2]
+            ranked.append({**entry, "Rank": rank})
+        return ranked
+
+    def _best_key(self, jogger_email):
+        sessions = self._sessions_by_jogger.get(jogger_email)
+        if not sessions:
+            return None
+        return min(self._keys[session_id] for session_id in sessions)
+
+    def top(self, limit=None):
+        """Return the first ``limit`` entries in rank order, or all of them."""
+        return self._ranked(0, len(self._entries) if limit is None else limit)
+
+    def page(self, offset, limit):
+        """Return ``limit`` entries starting at zero-based position ``offset``."""
+        return self._ranked(offset, limit)
+
+    def page_after(self, after, limit):
+        """Return ``limit`` entries following ``after`` in rank order.
+
+        Args:
+            after (dict): Distance, FinishTime and SessionID of the last entry
+                already shown, or None to start at the top
+            limit (int): The number of entries to return
+        """
+        start = 0
+        if after is not None:
+            key = _entry_key(after)
+            start = self._entries.count_less(key)
+            if self._keys.get(after["SessionID"]) == key:
+                start += 1
+        return self._ranked(start, limit)
+
+    def jogger_entry(self, jogger_email):
+        """Return a jogger's best entry with its rank, or None."""
+        key = self._best_key(jogger_email)
+        if key is None:
+            return None
+        return self._ranked(self._entries.count_less(key), 1)[0]
+
+    def around(self, jogger_email, radius):
+        """Return a jogger's best entry with up to ``radius`` entries either side."""
+        key = self._best_key(jogger_email)
+        if key is None:
+            return []
+        position = self._entries.count_less(key)
+        start = max(0, position - radius)
+        return self._ranked(start, position - start + radius + 1)
+
+
+class LeaderboardEngine:
+    """Process-wide cache of event leaderboards answering rank queries.
+
+    Events are loaded on first use through ``load(event_id)`` and then kept
+    in step by the write methods, which report committed changes via
+    upsert(), remove() and remove_session(). Changes made by other processes
+    are only picked up when an event is older than ``max_age`` seconds or is
+    invalidated.
+    """
+
+    LOAD_ATTEMPTS = 3
+
+    def __init__(self, load, max_age=None):
+        self._load = load
+        self.max_age = LEADERBOARD_CONFIG["max_age"] if max_age is None else max_age
+        self._lock = threading.RLock()
+        self._events = {}
+        self._writes = 0
+
+    def _fresh(self, board):
+        return board is not None and (
+            not self.max_age or time.monotonic() - board.loaded_at < self.max_age
+        )
+
+    def _board(self, event_id):
+        """Return the loaded board for an event; call with the lock held."""
+        board = self._events.get(event_id)
+        if self._fresh(board):
+            return board
+
+        # Load without the lock so other events stay readable, and retry if a
+        # write landed meanwhile since the loaded rows may predate it
+        for _ in range(self.LOAD_ATTEMPTS):
+            writes = self._writes
+            self._lock.release()
+            try:
+                entries = self._load(event_id)
+            finally:
+                self._lock.acquire()
+            board = EventLeaderboard(event_id, entries)
+            if writes == self._writes:
+                break
+        else:
+            board.loaded_at = float("-inf")
+        self._events[event_id] = board
+        return board
+
+    def top(self, event_id, limit=None):
+        with self._lock:
+            return self._board(event_id).top(limit)
+
+    def page(self, event_id, offset, limit):
+        with self._lock:
+            return self._board(event_id).page(offset, limit)
+
+    def page_after(self, event_id, after, limit):
+        with self._lock:
+            return self._board(event_id).page_after(after, limit)
+
+    def jogger_entry(self, event_id, jogger_email):
+        with self._lock:
+            return self._board(event_id).jogger_entry(jogger_email)
+
+    def around(self, event_id, jogger_email, radius):
+        with self._lock:
+            return self._board(event_id).around(jogger_email, radius)
+
+    def size(self, event_id):
+        with self._lock:
+            return len(self._board(event_id))
+
+    def upsert(self, entries):
+        """Apply committed leaderboardentry rows to the loaded events."""
+        with self._lock:
+            self._writes += 1
+            for entry in entries:
+                board = self._events.get(entry["EventID"])
+                if board is not None:
+                    board.upsert(entry)
+
+    def remove(self, event_id, session_id):
+        """Drop a session from one event's leaderboard."""
+        with self._lock:
+            self._writes += 1
+            board = self._events.get(event_id)
+            if board is not None:
+                board.discard(session_id)
+
+    def remove_session(self, session_id):
+        """Drop a session from every loaded leaderboard."""
+        with self._lock:
+            self._writes += 1
+            for board in self._events.values():
+                board.discard(session_id)
+
+    def invalidate(self, event_id=None):
+        """Forget one event, or all of them, so they are reloaded on next use."""
+        with self._lock:
+            self._writes += 1
+            if event_id is None:
+                self._events.clear()
+            else:
+                self._events.pop(event_id, None)
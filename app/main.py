@@ -1,17 +1,30 @@
 from fastapi import FastAPI, Request, Form, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
 
 # Fix the imports to use relative imports
-from models.repositories import JoggerRepository
+from database import UnitOfWorkMiddleware
+import metrics
+from instrumentation import RequestInstrumentationMiddleware, instrument_templates
+from models.async_repositories import JoggerRepository
 from routers import admin_router, user_router, organizer_router
 
 # Create FastAPI app instance
 app = FastAPI(title="Jogging App")
 
+# Every request shares one connection and transaction, committed before the response
+app.add_middleware(UnitOfWorkMiddleware)
+
+# Count queries, pool checkouts and template time per request
+app.add_middleware(RequestInstrumentationMiddleware)
+instrument_templates()
+
+# Count and time requests per route for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Set up templates directory
 templates_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 templates = Jinja2Templates(directory=templates_path)
@@ -38,24 +51,28 @@ def home(request: Request):
 async def login(request: Request, email: str = Form(...), role: str = Form(...)):
     """Handle login and redirect to appropriate view."""
     # Check if the email exists
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
 
     # Special case for admin - if they exist in appadmin table but not in jogger table
-    if not user and role == "admin" and JoggerRepository.check_if_admin(email):
+    if not user and role == "admin" and await JoggerRepository.check_if_admin(email):
         # Auto-create the admin in the jogger table
-        JoggerRepository.create_jogger(email, "Admin User")
-        user = JoggerRepository.get_jogger_by_email(email)
+        await JoggerRepository.create_jogger(email, "Admin User")
+        user = await JoggerRepository.get_jogger_by_email(email)
 
     # Special case for organizer - if they exist in eventorganizer table but not in jogger table
-    if not user and role == "organizer" and JoggerRepository.check_if_organizer(email):
+    if (
+        not user
+        and role == "organizer"
+        and await JoggerRepository.check_if_organizer(email)
+    ):
         # Auto-create the organizer in the jogger table
-        organizer_name = JoggerRepository.get_organizer_name(email)
+        organizer_name = await JoggerRepository.get_organizer_name(email)
         name = organizer_name if organizer_name else "Event Organizer"
-        JoggerRepository.create_jogger(email, name)
-        user = JoggerRepository.get_jogger_by_email(email)
+        await JoggerRepository.create_jogger(email, name)
+        user = await JoggerRepository.get_jogger_by_email(email)
 
     # Validate roles
-    if role == "admin" and not JoggerRepository.check_if_admin(email):
+    if role == "admin" and not await JoggerRepository.check_if_admin(email):
         return templates.TemplateResponse(
             "index.html",
             {
@@ -65,7 +82,7 @@ async def login(request: Request, email: str = Form(...), role: str = Form(...))
             },
         )
 
-    if role == "organizer" and not JoggerRepository.check_if_organizer(email):
+    if role == "organizer" and not await JoggerRepository.check_if_organizer(email):
         return templates.TemplateResponse(
             "index.html",
             {
@@ -79,7 +96,7 @@ async def login(request: Request, email: str = Form(...), role: str = Form(...))
     if not user and role == "user":
         # For simplicity, we'll automatically create a new user with a default name
         # In a real app, you would have a registration form
-        JoggerRepository.create_jogger(email, "New User")
+        await JoggerRepository.create_jogger(email, "New User")
     elif not user:
         return templates.TemplateResponse(
             "index.html",
@@ -101,6 +118,14 @@ async def login(request: Request, email: str = Form(...), role: str = Form(...))
         return RedirectResponse(url=f"/user/dashboard?email={email}", status_code=303)
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Request, database pool and cache metrics of this worker for Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # Changed this to run the app directly without the app module prefix
 if __name__ == "__main__":
+    # Log every query in full when running the development server
+    os.environ.setdefault("QUERY_LOG_LEVEL", "full")
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
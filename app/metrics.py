@@ -0,0 +1,331 @@
+import bisect
+import os
+import sys
+import threading
+import time
+
+from cache import get_cache_stats
+from database import get_pool_stats
+
+# Metrics configuration
+METRICS_CONFIG = {
+    "enabled": os.environ.get("METRICS", "on") == "on",
+    # Upper bounds, in seconds, of the request latency histogram buckets
+    "request_buckets": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    # Upper bounds, in seconds, of the query latency histogram buckets
+    "query_buckets": (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shards:
+    """Per-thread value maps that are only summed when scraped.
+
+    A thread only ever writes to its own map, so recording a value takes no
+    lock. The lock is taken once per thread to register its map, and by
+    scrapes to list the maps. Scrapes fold the maps of threads that have
+    exited, such as retired worker threads, into one retired map with
+    ``fold``, so the list does not grow with every thread ever started.
+    """
+
+    def __init__(self, fold):
+        self._fold = fold
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+
+    def mine(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    def snapshots(self):
+        with self._lock:
+            live = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    self._fold(self._retired, values)
+            self._shards = live
+            retired = self._retired.copy()
+        return [retired] + [values.copy() for _, values in live]
+
+
+class Counter:
+    """A value per label set that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._shards = _Shards(self._fold)
+
+    def inc(self, *labels, amount=1):
+        values = self._shards.mine()
+        values[labels] = values.get(labels, 0) + amount
+
+    @staticmethod
+    def _fold(totals, shard):
+        """Add one thread's values into ``totals``."""
+        for labels, value in shard.items():
+            totals[labels] = totals.get(labels, 0) + value
+
+    def collect(self):
+        """Return {label values: total} summed over every thread."""
+        totals = {}
+        for shard in self._shards.snapshots():
+            self._fold(totals, shard)
+        return totals
+
+    def samples(self):
+        for labels, value in sorted(self.collect().items()):
+            yield self.name, dict(zip(self.labels, labels)), value
+
+
+class Gauge(Counter):
+    """A value per label set that goes up and down."""
+
+    type = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Counter):
+    """Observations counted into cumulative ``le`` buckets per label set."""
+
+    type = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=()):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        values = self._shards.mine()
+        counts = values.get(labels)
+        if counts is None:
+            # One slot per bucket, then +Inf, the sum and the count
+            counts = values[labels] = [0] * (len(self.buckets) + 3)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    @staticmethod
+    def _fold(totals, shard):
+        # Sums go into new lists, so totals never share one with a shard
+        for labels, counts in shard.items():
+            total = totals.get(labels, [0] * len(counts))
+            totals[labels] = [a + b for a, b in zip(total, counts)]
+
+    def samples(self):
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, counts in sorted(self.collect().items()):
+            labels = dict(zip(self.labels, labels))
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": bound}, cumulative
+            yield f"{self.name}_sum", labels, counts[-2]
+            yield f"{self.name}_count", labels, counts[-1]
+
+
+requests_total = Counter(
+    "jogging_http_requests_total",
+    "HTTP requests handled, by route template and status.",
+    ("method", "route", "status"),
+)
+request_seconds = Histogram(
+    "jogging_http_request_duration_seconds",
+    "HTTP request latency, by route template.",
+    ("method", "route"),
+    METRICS_CONFIG["request_buckets"],
+)
+requests_in_flight = Gauge(
+    "jogging_http_requests_in_flight", "HTTP requests being handled."
+)
+query_seconds = Histogram(
+    "jogging_db_query_duration_seconds",
+    "Database query latency, by the repository method that ran it.",
+    ("method",),
+    METRICS_CONFIG["query_buckets"],
+)
+
+METRICS = [requests_total, request_seconds, requests_in_flight, query_seconds]
+
+
+def observe_query(duration, depth=1):
+    """Record a query's duration against the function ``depth`` frames up.
+
+    Queries run from a lambda or helper inside a repository method count
+    against that method.
+    """
+    if not METRICS_CONFIG["enabled"]:
+        return
+    code = sys._getframe(depth + 1).f_code
+    method = getattr(code, "co_qualname", code.co_name).split(".<locals>")[0]
+    query_seconds.observe(duration, method)
+
+
+def route_template(scope):
+    """Return the matched route's path with any router prefix, or None."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return None
+    # Some FastAPI versions report included routes without their prefix
+    extra = scope["path"].count("/") - path.count("/")
+    if extra > 0:
+        path = "/".join(scope["path"].split("/")[: extra + 1]) + path
+    return path
+
+
+class MetricsMiddleware:
+    """ASGI middleware that counts requests and times them per route template.
+
+    Requests that match no route are grouped as "unmatched", so probing
+    random URLs cannot create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_CONFIG["enabled"]:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            method = scope["method"]
+            route = route_template(scope) or "unmatched"
+            request_seconds.observe(time.perf_counter() - started, method, route)
+            requests_total.inc(method, route, str(status))
+
+
+def _pool_metrics():
+    stats = get_pool_stats()
+    connections = [
+        ({"state": "in_use"}, stats["in_use"]),
+        ({"state": "idle"}, stats["idle"]),
+    ]
+    return [
+        (
+            "jogging_db_pool_connections",
+            "gauge",
+            "Open pooled connections, by state.",
+            connections,
+        ),
+        (
+            "jogging_db_pool_max_connections",
+            "gauge",
+            "Connections the pool may open, including overflow.",
+            [({}, stats["pool_size"] + stats["max_overflow"])],
+        ),
+        (
+            "jogging_db_pool_checkouts_total",
+            "counter",
+            "Connections borrowed from the pool.",
+            [({}, stats["checkouts"])],
+        ),
+        (
+            "jogging_db_pool_timeouts_total",
+            "counter",
+            "Checkouts that timed out waiting for a connection.",
+            [({}, stats["timeouts"])],
+        ),
+        (
+            "jogging_db_pool_wait_seconds_max",
+            "gauge",
+            "Longest wait for a connection so far.",
+            [({}, stats["max_wait_ms"] / 1000)],
+        ),
+    ]
+
+
+def _cache_metrics():
+    caches = sorted(get_cache_stats().items())
+    hits, misses, ratios = [], [], []
+    for name, stats in caches:
+        labels = {"cache": name}
+        # Snapshots count reloads rather than misses
+        missed = stats.get("misses", stats.get("loads", 0))
+        hits.append((labels, stats["hits"]))
+        misses.append((labels, missed))
+        lookups = stats["hits"] + missed
+        ratios.append((labels, stats["hits"] / lookups if lookups else 0))
+    return [
+        (
+            "jogging_cache_hits_total",
+            "counter",
+            "Cache lookups answered from the cache.",
+            hits,
+        ),
+        (
+            "jogging_cache_misses_total",
+            "counter",
+            "Cache lookups that had to load.",
+            misses,
+        ),
+        (
+            "jogging_cache_hit_ratio",
+            "gauge",
+            "Share of cache lookups that were hits.",
+            ratios,
+        ),
+    ]
+
+
+COLLECTORS = [_pool_metrics, _cache_metrics]
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _line(name, labels, value):
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        return f"{name}{{{rendered}}} {_number(value)}"
+    return f"{name} {_number(value)}"
+
+
+def render():
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(_line(*sample) for sample in metric.samples())
+    for collect in COLLECTORS:
+        for name, kind, description, samples in collect():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_line(name, labels, value) for labels, value in samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,143 @@
+from database import get_db_cursor
+
+# Schema changes applied on top of the base jogging schema, in order. Each
+# entry is (name, statements); applied names are recorded in schema_migrations.
+MIGRATIONS = [
+    (
+        "001_event_participant_counter",
+        [
+            """
+            ALTER TABLE joggingevent
+            ADD COLUMN CurrentParticipants INT NOT NULL DEFAULT 0
+            """,
+            """
+            UPDATE joggingevent je
+            SET CurrentParticipants = (
+                SELECT COUNT(*) FROM eventregistration er
+                WHERE er.EventID = je.EventID
+            )
+            """,
+        ],
+    ),
+    (
+        "002_event_waitlist",
+        [
+            """
+            CREATE TABLE eventwaitlist (
+                WaitlistID BIGINT AUTO_INCREMENT PRIMARY KEY,
+                EventID INT NOT NULL,
+                JoggerEmail VARCHAR(255) NOT NULL,
+                JoinedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE KEY uq_waitlist_jogger (EventID, JoggerEmail),
+                KEY idx_waitlist_order (EventID, WaitlistID)
+            )
+            """,
+        ],
+    ),
+    (
+        "003_materialized_leaderboard",
+        [
+            """
+            CREATE TABLE leaderboardentry (
+                EventID INT NOT NULL,
+                SessionID INT NOT NULL,
+                JoggerEmail VARCHAR(255) NOT NULL,
+                JoggerName VARCHAR(255) NOT NULL,
+                Distance DOUBLE,
+                FinishTime INT,
+                PRIMARY KEY (EventID, SessionID),
+                KEY idx_leaderboard_order (EventID, Distance DESC, FinishTime, SessionID),
+                KEY idx_leaderboard_session (SessionID),
+                KEY idx_leaderboard_jogger (JoggerEmail)
+            )
+            """,
+            """
+            INSERT INTO leaderboardentry
+                (EventID, SessionID, JoggerEmail, JoggerName, Distance, FinishTime)
+            SELECT es.EventID, es.SessionID, j.Email, j.Name, jog.Distance,
+                   TIMESTAMPDIFF(SECOND, jog.StartDT, jog.EndDT)
+            FROM eventsession es
+            JOIN jogging jog ON es.SessionID = jog.SessionID
+            JOIN jogger j ON jog.JoggerEmail = j.Email
+            """,
+        ],
+    ),
+    (
+        "004_keyset_page_indexes",
+        [
+            """
+            CREATE INDEX idx_registration_page
+            ON eventregistration (EventID, TimeStamp, JoggerEmail)
+            """,
+            "CREATE INDEX idx_eventreview_page ON eventreview (EventID, ReviewID)",
+            "CREATE INDEX idx_routereview_page ON routereview (RouteID, ReviewID)",
+        ],
+    ),
+    (
+        "005_rating_summaries",
+        [
+            """
+            CREATE TABLE ratingsummary (
+                Subject VARCHAR(10) NOT NULL,
+                SubjectID INT NOT NULL,
+                RatingSum INT NOT NULL DEFAULT 0,
+                RatingCount INT NOT NULL DEFAULT 0,
+                Stars1 INT NOT NULL DEFAULT 0,
+                Stars2 INT NOT NULL DEFAULT 0,
+                Stars3 INT NOT NULL DEFAULT 0,
+                Stars4 INT NOT NULL DEFAULT 0,
+                Stars5 INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (Subject, SubjectID)
+            )
+            """,
+            """
+            INSERT INTO ratingsummary
+                (Subject, SubjectID, RatingSum, RatingCount,
+                 Stars1, Stars2, Stars3, Stars4, Stars5)
+            SELECT 'route', RouteID, SUM(Rating), COUNT(*),
+                   SUM(Rating = 1), SUM(Rating = 2), SUM(Rating = 3),
+                   SUM(Rating = 4), SUM(Rating = 5)
+            FROM routereview
+            GROUP BY RouteID
+            """,
+            """
+            INSERT INTO ratingsummary
+                (Subject, SubjectID, RatingSum, RatingCount,
+                 Stars1, Stars2, Stars3, Stars4, Stars5)
+            SELECT 'event', EventID, SUM(Rating), COUNT(*),
+                   SUM(Rating = 1), SUM(Rating = 2), SUM(Rating = 3),
+                   SUM(Rating = 4), SUM(Rating = 5)
+            FROM eventreview
+            GROUP BY EventID
+            """,
+        ],
+    ),
+]
+
+
+def get_applied_migrations():
+    """Return the names of migrations already applied to the database."""
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                Name VARCHAR(100) PRIMARY KEY,
+                AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+        cursor.execute("SELECT Name FROM schema_migrations")
+        return {row["Name"] for row in cursor.fetchall()}
+
+
+def apply_migrations():
+    """Apply every pending migration and return the names applied."""
+    applied = get_applied_migrations()
+    newly_applied = []
+    for name, statements in MIGRATIONS:
+        if name in applied:
+            continue
+        with get_db_cursor(commit=True) as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (Name) VALUES (%s)", (name,))
+        newly_applied.append(name)
+    return newly_applied
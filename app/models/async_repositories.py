@@ -0,0 +1,47 @@
+import functools
+
+from database import run_in_db_thread
+from models import repositories
+from models.repositories import RegistrationResult
+
+
+def _awaitable(method):
+    """Wrap a blocking repository method in a coroutine function."""
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db_thread(method, *args, **kwargs)
+
+    return staticmethod(wrapper)
+
+
+def _mirror(repository):
+    """Build an awaitable twin of a repository class.
+
+    Every public static method, including inherited ones, becomes a coroutine
+    function with the same name and signature that runs the original query
+    through run_in_db_thread. The blocking class stays reachable as ``sync``.
+    """
+    namespace = {
+        "__doc__": f"Awaitable version of {repository.__name__}.",
+        "__module__": __name__,
+        "sync": repository,
+    }
+    for klass in reversed(repository.__mro__):
+        for name, value in vars(klass).items():
+            if isinstance(value, staticmethod) and not name.startswith("_"):
+                namespace[name] = _awaitable(value.__func__)
+    return type(repository.__name__, (), namespace)
+
+
+# Calls made within one request share its unit of work, so await them one at
+# a time rather than gathering them concurrently.
+BaseRepository = _mirror(repositories.BaseRepository)
+JoggerRepository = _mirror(repositories.JoggerRepository)
+RouteRepository = _mirror(repositories.RouteRepository)
+EventRepository = _mirror(repositories.EventRepository)
+RegistrationRepository = _mirror(repositories.RegistrationRepository)
+WaitlistRepository = _mirror(repositories.WaitlistRepository)
+JoggingSessionRepository = _mirror(repositories.JoggingSessionRepository)
+ReviewRepository = _mirror(repositories.ReviewRepository)
+LeaderboardRepository = _mirror(repositories.LeaderboardRepository)
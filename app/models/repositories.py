@@ -1,130 +1,345 @@
-from database import get_db_cursor
+import bisect
+import time
+from collections import Counter
+
+from mysql.connector import IntegrityError, errorcode
+
+import metrics
+import query_log
+from cache import CACHE_CONFIG, get_cache, get_snapshot
+from database import (
+    detached_connection,
+    get_db_cursor,
+    on_commit,
+    on_rollback,
+    unit_of_work,
+    writes_pending,
+)
+from leaderboard import LEADERBOARD_CONFIG, LeaderboardEngine
+from pagination import decode_cursor, make_page, page_size
+from route_search import MATCH_TYPES, RouteSearch, is_sort_key
+
+jogger_cache = get_cache("jogger")
+event_cache = get_cache("events")
+rating_cache = get_cache("ratings")
+
+# Review table and subject column for each kind of rating summary
+REVIEW_TABLES = {
+    "route": ("routereview", "RouteID"),
+    "event": ("eventreview", "EventID"),
+}
+
+
+def _forget(cache, *keys):
+    """Drop cached entries now and again once the current write commits.
+
+    Dropping them now lets later reads in the same unit see the write, and
+    dropping them after the commit stops another request from caching the
+    old value in between. With the shared backend this reaches every worker.
+    """
+    cache.delete(*keys)
+    on_commit(lambda: cache.delete(*keys))
+
+
+def _cached(cache, key, load):
+    """Read ``key`` through ``cache``, calling ``load(connection)`` on a miss.
+
+    Values that get cached are loaded on a detached connection. The unit's
+    own snapshot may predate a write another request has since committed
+    and invalidated, and caching what it still shows would undo that
+    invalidation for the whole TTL. Reads that skip the cache get None, so
+    they run on the unit's connection and see its own writes.
+    """
+    if writes_pending() or not CACHE_CONFIG["enabled"]:
+        return load(None)
+
+    def load_committed():
+        with detached_connection() as connection:
+            return load(connection)
+
+    return cache.get_or_load(key, load_committed)
+
+
+def _forget_all(cache):
+    """Drop every entry of a cache now and again once the current write commits."""
+    cache.clear()
+    on_commit(cache.clear)
+
+
+def _bump(snapshot):
+    """Move a snapshot to a new version now and again once the current write ends.
+
+    It is bumped after a rollback too, in case the unit's uncommitted rows
+    were loaded in between.
+    """
+    snapshot.bump()
+    on_commit(snapshot.bump)
+    on_rollback(snapshot.bump)
 
 
 class BaseRepository:
     """Base repository with common database operations."""
 
     @staticmethod
-    def execute_query(query, params=None, commit=False):
-        """Execute a database query and return results."""
-        print(f"Executing SQL: {query}")
-        if params:
-            print(f"Parameters: {params}")
-
-            formatted_query = query
-            if isinstance(params, (list, tuple)):
-                for param in params:
-                    if param is None:
-                        formatted_value = "NULL"
-                    elif isinstance(param, str):
-                        formatted_value = f"'{param}'"
-                    elif isinstance(param, (int, float)):
-                        formatted_value = str(param)
-                    else:
-                        formatted_value = f"'{param}'"
-
-                    formatted_query = formatted_query.replace("%s", formatted_value, 1)
-            elif isinstance(params, dict):
-                for key, value in params.items():
-                    if value is None:
-                        formatted_value = "NULL"
-                    elif isinstance(value, str):
-                        formatted_value = f"'{value}'"
-                    elif isinstance(value, (int, float)):
-                        formatted_value = str(value)
-                    else:
-                        formatted_value = f"'{value}'"
-
-                    formatted_query = formatted_query.replace(
-                        f"%({key})s", formatted_value
-                    )
+    def execute_query(query, params=None, commit=False, connection=None):
+        """Execute a database query and return results.
 
-            print(f"Formatted SQL: {formatted_query}")
+        Reads return the fetched rows, inserts return the generated id as
+        {"id": ...}, and other writes return the number of affected rows.
+
+        Args:
+            connection (Connection): A connection to run on instead of the unit's
+        """
+        logged = query_log.should_log()
+        started = time.perf_counter()
 
-        with get_db_cursor(commit) as cursor:
+        with get_db_cursor(commit, connection) as cursor:
             cursor.execute(query, params or ())
             if not commit:
-                return cursor.fetchall()
+                result = cursor.fetchall()
+                row_count = len(result)
             else:
+                row_count = cursor.rowcount
+                result = row_count
                 if (
                     "INSERT" in query.upper()
                     and "LAST_INSERT_ID()" not in query.upper()
                 ):
                     cursor.execute("SELECT LAST_INSERT_ID() as id")
                     result = cursor.fetchone()
-                    print(f"Generated ID: {result}")
-                    return result
-                return None
+
+        duration = time.perf_counter() - started
+        metrics.observe_query(duration)
+        if logged:
+            query_log.log_query(query, params, duration, row_count)
+        return result
 
 
 class JoggerRepository(BaseRepository):
-    """Repository for jogger operations."""
+    """Repository for jogger operations.
+
+    Jogger records and role checks are read on nearly every request, so they
+    go through a process-wide TTL cache that the write methods invalidate.
+    """
+
+    @staticmethod
+    def _forget(email):
+        """Drop cached records and role checks for ``email``."""
+        _forget(
+            jogger_cache,
+            *((kind, email) for kind in ("jogger", "admin", "organizer", "name")),
+        )
 
     @staticmethod
     def get_jogger_by_email(email):
         """Get jogger by email."""
-        query = "SELECT * FROM jogger WHERE Email = %s"
-        result = BaseRepository.execute_query(query, (email,))
-        print(query, result)
-        return result[0] if result else None
+
+        def load(connection):
+            query = "SELECT * FROM jogger WHERE Email = %s"
+            result = BaseRepository.execute_query(
+                query, (email,), connection=connection
+            )
+            return result[0] if result else None
+
+        jogger = _cached(jogger_cache, ("jogger", email), load)
+        return dict(jogger) if jogger else None
 
     @staticmethod
     def create_jogger(email, name):
         """Create a new jogger."""
         query = "INSERT INTO jogger (Email, Name) VALUES (%s, %s)"
         BaseRepository.execute_query(query, (email, name), commit=True)
+        JoggerRepository._forget(email)
 
     @staticmethod
     def update_jogger(email, name):
         """Update jogger information."""
-        query = "UPDATE jogger SET Name = %s WHERE Email = %s"
-        BaseRepository.execute_query(query, (name, email), commit=True)
+        with unit_of_work():
+            query = "UPDATE jogger SET Name = %s WHERE Email = %s"
+            BaseRepository.execute_query(query, (name, email), commit=True)
+            query = "UPDATE leaderboardentry SET JoggerName = %s WHERE JoggerEmail = %s"
+            BaseRepository.execute_query(query, (name, email), commit=True)
+            LeaderboardRepository._sync_entries("JoggerEmail = %s", (email,))
+            JoggerRepository._forget(email)
 
     @staticmethod
     def check_if_admin(email):
         """Check if the jogger is an admin."""
-        query = "SELECT * FROM appadmin WHERE AdminEmail = %s"
-        result = BaseRepository.execute_query(query, (email,))
-        return bool(result)
+
+        def load(connection):
+            query = "SELECT 1 FROM appadmin WHERE AdminEmail = %s LIMIT 1"
+            return bool(
+                BaseRepository.execute_query(query, (email,), connection=connection)
+            )
+
+        return _cached(jogger_cache, ("admin", email), load)
 
     @staticmethod
     def check_if_organizer(email):
         """Check if the jogger is an event organizer."""
-        query = "SELECT * FROM eventorganizer WHERE Email = %s"
-        result = BaseRepository.execute_query(query, (email,))
-        return bool(result)
+
+        def load(connection):
+            query = "SELECT 1 FROM eventorganizer WHERE Email = %s LIMIT 1"
+            return bool(
+                BaseRepository.execute_query(query, (email,), connection=connection)
+            )
+
+        return _cached(jogger_cache, ("organizer", email), load)
 
     @staticmethod
     def get_organizer_name(email):
         """Get the name of an organizer by email."""
-        query = "SELECT Name FROM eventorganizer WHERE Email = %s"
-        result = BaseRepository.execute_query(query, (email,))
-        return result[0]["Name"] if result else None
+
+        def load(connection):
+            query = "SELECT Name FROM eventorganizer WHERE Email = %s"
+            result = BaseRepository.execute_query(
+                query, (email,), connection=connection
+            )
+            return result[0]["Name"] if result else None
+
+        return _cached(jogger_cache, ("name", email), load)
+
+    @staticmethod
+    def grant_admin(email):
+        """Give a jogger the admin role."""
+        query = "INSERT IGNORE INTO appadmin (AdminEmail) VALUES (%s)"
+        BaseRepository.execute_query(query, (email,), commit=True)
+        JoggerRepository._forget(email)
+
+    @staticmethod
+    def revoke_admin(email):
+        """Take the admin role away from a jogger."""
+        query = "DELETE FROM appadmin WHERE AdminEmail = %s"
+        BaseRepository.execute_query(query, (email,), commit=True)
+        JoggerRepository._forget(email)
+
+    @staticmethod
+    def grant_organizer(email, name):
+        """Give a jogger the event organizer role."""
+        query = """
+        INSERT INTO eventorganizer (Email, Name) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE Name = VALUES(Name)
+        """
+        BaseRepository.execute_query(query, (email, name), commit=True)
+        JoggerRepository._forget(email)
+
+    @staticmethod
+    def revoke_organizer(email):
+        """Take the event organizer role away from a jogger."""
+        query = "DELETE FROM eventorganizer WHERE Email = %s"
+        BaseRepository.execute_query(query, (email,), commit=True)
+        JoggerRepository._forget(email)
 
 
 class RouteRepository(BaseRepository):
     """Repository for jogging route operations."""
 
     @staticmethod
-    def get_all_routes():
-        """Get all jogging routes."""
+    def _load_routes():
         query = "SELECT * FROM joggingroute"
-        return BaseRepository.execute_query(query)
+        # Every request shares the catalogue, so it must hold committed rows only
+        with detached_connection() as connection:
+            return BaseRepository.execute_query(query, connection=connection)
+
+    @staticmethod
+    def get_all_routes():
+        """Get all jogging routes, as read-only rows of the route catalogue."""
+        return list(route_catalogue.rows())
+
+    @staticmethod
+    def search_routes(
+        query=None,
+        min_distance=None,
+        max_distance=None,
+        min_pace=None,
+        max_pace=None,
+        cursor=None,
+        limit=None,
+    ):
+        """Search the route catalogue by name, distance and pace.
+
+        Names match as exact, prefix, word prefix, substring or, for typos,
+        by trigram similarity, and are ranked in that order.
+
+        Args:
+            query (str): Text to look for in route names, or None for any name
+            min_distance, max_distance (float): Distance range in km
+            min_pace, max_pace (float): Average pace range
+            cursor (str): next_cursor of the previous page, or None for the first page
+            limit (int): Page size, clamped to PAGINATION_CONFIG
+
+        Returns:
+            Page: Route rows, each with a MatchType when ``query`` is given
+        """
+        limit = page_size(limit)
+        after = decode_cursor(cursor, 4)
+        results = route_search.search(
+            query, (min_distance, max_distance), (min_pace, max_pace)
+        )
+        start = 0
+        if after:
+            if not is_sort_key(after):
+                raise ValueError(f"Invalid page cursor: {cursor}")
+            start = bisect.bisect_right(results, tuple(after), key=lambda r: r[0])
+        page = make_page(results[start : start + limit + 1], limit, lambda r: r[0])
+        page.items = [dict(route) for _, route in page.items]
+        if query and query.strip():
+            for (key, _), route in zip(results[start:], page.items):
+                route["MatchType"] = MATCH_TYPES[key[0]]
+        return page
+
+    @staticmethod
+    def get_catalogue_stats():
+        """Get the route catalogue's version, size and load counters."""
+        return route_catalogue.stats()
+
+    @staticmethod
+    def refresh_catalogue():
+        """Reload the route catalogue from the database.
+
+        Returns:
+            int: The catalogue's new version
+        """
+        return route_catalogue.refresh()
+
+    @staticmethod
+    def get_routes_with_review_status(jogger_email):
+        """Get all routes with rating stats and the jogger's own review, if any."""
+        query = """
+        SELECT jr.*,
+               stats.AverageRating,
+               COALESCE(stats.ReviewCount, 0) AS ReviewCount,
+               mine.ReviewID AS JoggerReviewID
+        FROM joggingroute jr
+        LEFT JOIN (
+            SELECT RouteID, ROUND(AVG(Rating), 1) AS AverageRating,
+                   COUNT(*) AS ReviewCount
+            FROM routereview
+            GROUP BY RouteID
+        ) stats ON stats.RouteID = jr.RouteID
+        LEFT JOIN (
+            SELECT RouteID, MIN(ReviewID) AS ReviewID
+            FROM routereview
+            WHERE JoggerEmail = %s
+            GROUP BY RouteID
+        ) mine ON mine.RouteID = jr.RouteID
+        """
+        return BaseRepository.execute_query(query, (jogger_email,))
 
     @staticmethod
     def get_route_by_id(route_id):
-        """Get a jogging route by ID."""
-        query = "SELECT * FROM joggingroute WHERE RouteID = %s"
-        result = BaseRepository.execute_query(query, (route_id,))
-        return result[0] if result else None
+        """Get a jogging route by ID, as a read-only row of the route catalogue."""
+        return route_catalogue.get(int(route_id))
 
     @staticmethod
     def create_route(route_name, distance, avg_pace=None):
         """Create a new jogging route."""
         query = "INSERT INTO joggingroute (RouteName, Distance, AvgPace) VALUES (%s, %s, %s)"
-        return BaseRepository.execute_query(
+        route_id = BaseRepository.execute_query(
             query, (route_name, distance, avg_pace), commit=True
         )["id"]
+        _bump(route_catalogue)
+        return route_id
 
         # query = "SELECT LAST_INSERT_ID() as id"
         # result = BaseRepository.execute_query(query)
@@ -134,16 +349,23 @@ class RouteRepository(BaseRepository):
     def update_route(route_id, route_name, distance, avg_pace=None):
         """Update a jogging route."""
         query = "UPDATE joggingroute SET RouteName = %s, Distance = %s, AvgPace = %s WHERE RouteID = %s"
-        print(query, route_name, distance, avg_pace, route_id)
         BaseRepository.execute_query(
             query, (route_name, distance, avg_pace, route_id), commit=True
         )
+        _bump(route_catalogue)
 
     @staticmethod
     def delete_route(route_id):
-        """Delete a jogging route."""
-        query = "DELETE FROM joggingroute WHERE RouteID = %s"
-        BaseRepository.execute_query(query, (route_id,), commit=True)
+        """Delete a jogging route and its rating summary."""
+        with unit_of_work():
+            query = (
+                "DELETE FROM ratingsummary WHERE Subject = 'route' AND SubjectID = %s"
+            )
+            BaseRepository.execute_query(query, (route_id,), commit=True)
+            query = "DELETE FROM joggingroute WHERE RouteID = %s"
+            BaseRepository.execute_query(query, (route_id,), commit=True)
+            _bump(route_catalogue)
+            _forget(rating_cache, ("route", route_id))
 
 
 class EventRepository(BaseRepository):
@@ -155,12 +377,39 @@ class EventRepository(BaseRepository):
         query = "SELECT * FROM joggingevent ORDER BY EventDate"
         return BaseRepository.execute_query(query)
 
+    @staticmethod
+    def get_events_with_registration_status(jogger_email):
+        """Get all events with participant counts, the jogger's registration flag
+        and the jogger's place on each event's waitlist."""
+        query = """
+        SELECT je.*, mine.JoggerEmail IS NOT NULL AS IsRegistered,
+               CASE WHEN wl.WaitlistID IS NULL THEN NULL ELSE (
+                   SELECT COUNT(*) FROM eventwaitlist ahead
+                   WHERE ahead.EventID = je.EventID
+                     AND ahead.WaitlistID <= wl.WaitlistID
+               ) END AS WaitlistPosition
+        FROM joggingevent je
+        LEFT JOIN eventregistration mine
+            ON mine.EventID = je.EventID AND mine.JoggerEmail = %s
+        LEFT JOIN eventwaitlist wl
+            ON wl.EventID = je.EventID AND wl.JoggerEmail = %s
+        ORDER BY je.EventDate
+        """
+        return BaseRepository.execute_query(query, (jogger_email, jogger_email))
+
     @staticmethod
     def get_event_by_id(event_id):
         """Get a jogging event by ID."""
-        query = "SELECT * FROM joggingevent WHERE EventID = %s"
-        result = BaseRepository.execute_query(query, (event_id,))
-        return result[0] if result else None
+
+        def load(connection):
+            query = "SELECT * FROM joggingevent WHERE EventID = %s"
+            result = BaseRepository.execute_query(
+                query, (event_id,), connection=connection
+            )
+            return result[0] if result else None
+
+        event = _cached(event_cache, ("event", event_id), load)
+        return dict(event) if event else None
 
     @staticmethod
     def create_event(event_name, event_date, max_participants):
@@ -171,6 +420,7 @@ class EventRepository(BaseRepository):
         )
 
         if result and "id" in result:
+            _forget(event_cache, ("event", result["id"]))
             return result["id"]
 
         query = "SELECT LAST_INSERT_ID() as id"
@@ -182,17 +432,56 @@ class EventRepository(BaseRepository):
 
     @staticmethod
     def update_event(event_id, event_name, event_date, max_participants):
-        """Update a jogging event."""
-        query = "UPDATE joggingevent SET EventName = %s, EventDate = %s, MaxParticipants = %s WHERE EventID = %s"
-        BaseRepository.execute_query(
-            query, (event_name, event_date, max_participants, event_id), commit=True
-        )
+        """Update a jogging event, filling any seats it gains from the waitlist."""
+        with unit_of_work():
+            query = "UPDATE joggingevent SET EventName = %s, EventDate = %s, MaxParticipants = %s WHERE EventID = %s"
+            BaseRepository.execute_query(
+                query,
+                (event_name, event_date, max_participants, event_id),
+                commit=True,
+            )
+            _forget(event_cache, ("event", event_id))
+            WaitlistRepository.promote(event_id)
 
     @staticmethod
     def delete_event(event_id):
-        """Delete a jogging event."""
-        query = "DELETE FROM joggingevent WHERE EventID = %s"
-        BaseRepository.execute_query(query, (event_id,), commit=True)
+        """Delete a jogging event, its waitlist, leaderboard and rating summary."""
+        with unit_of_work():
+            query = "DELETE FROM eventwaitlist WHERE EventID = %s"
+            BaseRepository.execute_query(query, (event_id,), commit=True)
+            query = "DELETE FROM leaderboardentry WHERE EventID = %s"
+            BaseRepository.execute_query(query, (event_id,), commit=True)
+            on_commit(lambda: leaderboard_engine.invalidate(event_id))
+            query = (
+                "DELETE FROM ratingsummary WHERE Subject = 'event' AND SubjectID = %s"
+            )
+            BaseRepository.execute_query(query, (event_id,), commit=True)
+            query = "DELETE FROM joggingevent WHERE EventID = %s"
+            BaseRepository.execute_query(query, (event_id,), commit=True)
+            _forget(event_cache, ("event", event_id))
+            _forget(rating_cache, ("event", event_id))
+
+    @staticmethod
+    def get_organizer_event_summaries(organizer_email):
+        """Get an organizer's events with participant counts and review averages."""
+        query = """
+        SELECT je.*,
+               (SELECT ROUND(AVG(ev.Rating), 1) FROM eventreview ev
+                WHERE ev.EventID = je.EventID) AS AverageRating,
+               (SELECT COUNT(*) FROM eventreview ev
+                WHERE ev.EventID = je.EventID) AS ReviewCount
+        FROM joggingevent je
+        JOIN event_em em ON je.EventID = em.EventID
+        WHERE em.OrganizerEmail = %s
+        ORDER BY je.EventDate
+        """
+        return BaseRepository.execute_query(query, (organizer_email,))
+
+    @staticmethod
+    def assign_organizer(event_id, organizer_email):
+        """Make an organizer responsible for an event."""
+        query = "INSERT INTO event_em (OrganizerEmail, EventID) VALUES (%s, %s)"
+        BaseRepository.execute_query(query, (organizer_email, event_id), commit=True)
 
     @staticmethod
     def get_events_by_organizer(organizer_email):
@@ -206,20 +495,141 @@ class EventRepository(BaseRepository):
         return BaseRepository.execute_query(query, (organizer_email,))
 
 
+class RegistrationResult:
+    """Outcomes of RegistrationRepository.reserve_seat."""
+
+    REGISTERED = "registered"
+    ALREADY_REGISTERED = "already_registered"
+    FULL = "full"
+    PAST = "past"
+    NOT_FOUND = "not_found"
+
+
 class RegistrationRepository(BaseRepository):
     """Repository for event registration operations."""
 
+    @staticmethod
+    def get_event_registrations_page(event_id, cursor=None, limit=None):
+        """Get one page of an event's registrations, oldest first.
+
+        Args:
+            event_id (int): The event
+            cursor (str): next_cursor of the previous page, or None for the first page
+            limit (int): Page size, clamped to PAGINATION_CONFIG
+        """
+        limit = page_size(limit)
+        after = decode_cursor(cursor, 2)
+        condition, params = "", ()
+        if after:
+            condition = """
+            AND (er.TimeStamp > %s OR (er.TimeStamp = %s AND er.JoggerEmail > %s))
+            """
+            params = (after[0], after[0], after[1])
+        query = f"""
+        SELECT er.*, j.Name as JoggerName
+        FROM eventregistration er
+        JOIN jogger j ON er.JoggerEmail = j.Email
+        WHERE er.EventID = %s {condition}
+        ORDER BY er.TimeStamp, er.JoggerEmail
+        LIMIT %s
+        """
+        rows = BaseRepository.execute_query(query, (event_id, *params, limit + 1))
+        return make_page(
+            rows, limit, lambda row: (row["TimeStamp"], row["JoggerEmail"])
+        )
+
+    @staticmethod
+    def reserve_seat(event_id, jogger_email, allow_past=False):
+        """Atomically take a seat at an event and register the jogger for it.
+
+        The conditional counter update is the only capacity check, and it
+        holds the event row lock until the surrounding unit of work commits.
+        Concurrent registrations for the same event therefore queue on one row
+        instead of racing between a count and an insert, and can never overbook.
+
+        Args:
+            event_id (int): Event to register for
+            jogger_email (str): Jogger taking the seat
+            allow_past (bool): Whether registering for an event that already took place is allowed
+
+        Returns:
+            str: One of the RegistrationResult values
+        """
+        with unit_of_work():
+            query = """
+            UPDATE joggingevent SET CurrentParticipants = CurrentParticipants + 1
+            WHERE EventID = %s AND CurrentParticipants < MaxParticipants
+            """
+            if not allow_past:
+                query += " AND EventDate >= NOW()"
+            BaseRepository.execute_query("SAVEPOINT reserve_seat", commit=True)
+            if BaseRepository.execute_query(query, (event_id,), commit=True):
+                _forget(event_cache, ("event", event_id))
+                try:
+                    query = "INSERT INTO eventregistration (EventID, JoggerEmail) VALUES (%s, %s)"
+                    BaseRepository.execute_query(
+                        query, (event_id, jogger_email), commit=True
+                    )
+                    return RegistrationResult.REGISTERED
+                except IntegrityError as e:
+                    if e.errno != errorcode.ER_DUP_ENTRY:
+                        raise
+                    BaseRepository.execute_query(
+                        "ROLLBACK TO SAVEPOINT reserve_seat", commit=True
+                    )
+                    return RegistrationResult.ALREADY_REGISTERED
+
+            query = """
+            SELECT je.EventDate < NOW() AS IsPast,
+                   er.JoggerEmail IS NOT NULL AS IsRegistered
+            FROM joggingevent je
+            LEFT JOIN eventregistration er
+                ON er.EventID = je.EventID AND er.JoggerEmail = %s
+            WHERE je.EventID = %s
+            """
+            result = BaseRepository.execute_query(query, (jogger_email, event_id))
+            if not result:
+                return RegistrationResult.NOT_FOUND
+            if result[0]["IsRegistered"]:
+                return RegistrationResult.ALREADY_REGISTERED
+            if result[0]["IsPast"] and not allow_past:
+                return RegistrationResult.PAST
+            return RegistrationResult.FULL
+
     @staticmethod
     def register_for_event(event_id, jogger_email):
-        """Register a jogger for an event."""
-        query = "INSERT INTO eventregistration (EventID, JoggerEmail) VALUES (%s, %s)"
-        BaseRepository.execute_query(query, (event_id, jogger_email), commit=True)
+        """Register a jogger for an event and bump its participant counter."""
+        with unit_of_work():
+            query = (
+                "INSERT INTO eventregistration (EventID, JoggerEmail) VALUES (%s, %s)"
+            )
+            BaseRepository.execute_query(query, (event_id, jogger_email), commit=True)
+            query = """
+            UPDATE joggingevent SET CurrentParticipants = CurrentParticipants + 1
+            WHERE EventID = %s
+            """
+            BaseRepository.execute_query(query, (event_id,), commit=True)
+            _forget(event_cache, ("event", event_id))
 
     @staticmethod
     def unregister_from_event(event_id, jogger_email):
-        """Unregister a jogger from an event."""
-        query = "DELETE FROM eventregistration WHERE EventID = %s AND JoggerEmail = %s"
-        BaseRepository.execute_query(query, (event_id, jogger_email), commit=True)
+        """Unregister a jogger from an event, handing the seat to the waitlist head."""
+        with unit_of_work():
+            query = (
+                "DELETE FROM eventregistration WHERE EventID = %s AND JoggerEmail = %s"
+            )
+            deleted = BaseRepository.execute_query(
+                query, (event_id, jogger_email), commit=True
+            )
+            if deleted:
+                query = """
+                UPDATE joggingevent
+                SET CurrentParticipants = GREATEST(CurrentParticipants - %s, 0)
+                WHERE EventID = %s
+                """
+                BaseRepository.execute_query(query, (deleted, event_id), commit=True)
+                _forget(event_cache, ("event", event_id))
+                WaitlistRepository.promote(event_id)
 
     @staticmethod
     def get_event_registrations(event_id):
@@ -255,11 +665,43 @@ class RegistrationRepository(BaseRepository):
 
     @staticmethod
     def count_registrations(event_id):
-        """Count the number of registrations for an event."""
-        query = "SELECT COUNT(*) as count FROM eventregistration WHERE EventID = %s"
+        """Get the number of registrations for an event from its counter."""
+        query = (
+            "SELECT CurrentParticipants as count FROM joggingevent WHERE EventID = %s"
+        )
         result = BaseRepository.execute_query(query, (event_id,))
         return result[0]["count"] if result else 0
 
+    @staticmethod
+    def reconcile_participant_counts(repair=False):
+        """Find events whose participant counter disagrees with their registrations.
+
+        Args:
+            repair (bool): Whether to rewrite the drifted counters from the registrations table
+        """
+        query = """
+        SELECT je.EventID, je.CurrentParticipants,
+               COUNT(er.JoggerEmail) AS ActualParticipants
+        FROM joggingevent je
+        LEFT JOIN eventregistration er ON er.EventID = je.EventID
+        GROUP BY je.EventID, je.CurrentParticipants
+        HAVING je.CurrentParticipants <> ActualParticipants
+        """
+        drift = BaseRepository.execute_query(query)
+        if repair:
+            query = """
+            UPDATE joggingevent je
+            SET CurrentParticipants = (
+                SELECT COUNT(*) FROM eventregistration er
+                WHERE er.EventID = je.EventID
+            )
+            WHERE je.EventID = %s
+            """
+            for row in drift:
+                BaseRepository.execute_query(query, (row["EventID"],), commit=True)
+                _forget(event_cache, ("event", row["EventID"]))
+        return drift
+
     @staticmethod
     def get_registration(event_id, jogger_email):
         """Get registration details for a specific event and jogger."""
@@ -273,6 +715,106 @@ class RegistrationRepository(BaseRepository):
         return result[0] if result else None
 
 
+class WaitlistRepository(BaseRepository):
+    """Repository for event waitlist operations.
+
+    Joggers queue in WaitlistID order. Whenever a seat frees up the head of
+    the queue is registered in the same unit of work, so the freed seat is
+    never up for grabs.
+    """
+
+    @staticmethod
+    def join_waitlist(event_id, jogger_email):
+        """Register the jogger if a seat is free, otherwise queue them.
+
+        Returns:
+            str: The RegistrationResult of the seat attempt; FULL means the
+                jogger is now on the waitlist
+        """
+        with unit_of_work():
+            result = RegistrationRepository.reserve_seat(event_id, jogger_email)
+            if result == RegistrationResult.FULL:
+                query = "INSERT IGNORE INTO eventwaitlist (EventID, JoggerEmail) VALUES (%s, %s)"
+                BaseRepository.execute_query(
+                    query, (event_id, jogger_email), commit=True
+                )
+            return result
+
+    @staticmethod
+    def leave_waitlist(event_id, jogger_email):
+        """Remove a jogger from an event's waitlist."""
+        query = "DELETE FROM eventwaitlist WHERE EventID = %s AND JoggerEmail = %s"
+        return BaseRepository.execute_query(
+            query, (event_id, jogger_email), commit=True
+        )
+
+    @staticmethod
+    def get_position(event_id, jogger_email):
+        """Get the jogger's 1-based place in the queue, or None if not queued."""
+        query = """
+        SELECT COUNT(*) AS position
+        FROM eventwaitlist mine
+        JOIN eventwaitlist ahead
+            ON ahead.EventID = mine.EventID AND ahead.WaitlistID <= mine.WaitlistID
+        WHERE mine.EventID = %s AND mine.JoggerEmail = %s
+        """
+        result = BaseRepository.execute_query(query, (event_id, jogger_email))
+        return result[0]["position"] if result and result[0]["position"] else None
+
+    @staticmethod
+    def get_waitlist(event_id):
+        """Get the waitlist for an event in queue order."""
+        query = """
+        SELECT wl.*, j.Name AS JoggerName
+        FROM eventwaitlist wl
+        JOIN jogger j ON wl.JoggerEmail = j.Email
+        WHERE wl.EventID = %s
+        ORDER BY wl.WaitlistID
+        """
+        return BaseRepository.execute_query(query, (event_id,))
+
+    @staticmethod
+    def promote(event_id):
+        """Register waitlisted joggers, head first, while the event has free seats.
+
+        Each step locks the head entry through the (EventID, WaitlistID) index,
+        so taking it costs the same however long the queue is.
+
+        Returns:
+            list: Emails of the joggers that were registered
+        """
+        promoted = []
+        with unit_of_work():
+            query = """
+            SELECT WaitlistID, JoggerEmail FROM eventwaitlist
+            WHERE EventID = %s
+            ORDER BY WaitlistID
+            LIMIT 1
+            FOR UPDATE
+            """
+            while True:
+                head = BaseRepository.execute_query(query, (event_id,))
+                if not head:
+                    break
+                head = head[0]
+                result = RegistrationRepository.reserve_seat(
+                    event_id, head["JoggerEmail"]
+                )
+                if result not in (
+                    RegistrationResult.REGISTERED,
+                    RegistrationResult.ALREADY_REGISTERED,
+                ):
+                    break
+                BaseRepository.execute_query(
+                    "DELETE FROM eventwaitlist WHERE WaitlistID = %s",
+                    (head["WaitlistID"],),
+                    commit=True,
+                )
+                if result == RegistrationResult.REGISTERED:
+                    promoted.append(head["JoggerEmail"])
+        return promoted
+
+
 class JoggingSessionRepository(BaseRepository):
     """Repository for jogging session operations."""
 
@@ -313,38 +855,95 @@ class JoggingSessionRepository(BaseRepository):
 
     @staticmethod
     def update_session(session_id, start_dt, end_dt, distance, route_id=None):
-        """Update a jogging session."""
-        query = """
-        UPDATE jogging 
-        SET StartDT = %s, EndDT = %s, Distance = %s, RouteID = %s 
-        WHERE SessionID = %s
-        """
-        BaseRepository.execute_query(
-            query, (start_dt, end_dt, distance, route_id, session_id), commit=True
-        )
+        """Update a jogging session and its leaderboard entries."""
+        with unit_of_work():
+            query = """
+            UPDATE jogging 
+            SET StartDT = %s, EndDT = %s, Distance = %s, RouteID = %s 
+            WHERE SessionID = %s
+            """
+            BaseRepository.execute_query(
+                query, (start_dt, end_dt, distance, route_id, session_id), commit=True
+            )
+            LeaderboardRepository.refresh_session(session_id)
 
     @staticmethod
     def delete_session(session_id):
-        """Delete a jogging session."""
-        query = "DELETE FROM jogging WHERE SessionID = %s"
-        BaseRepository.execute_query(query, (session_id,), commit=True)
+        """Delete a jogging session and its leaderboard entries."""
+        with unit_of_work():
+            query = "DELETE FROM leaderboardentry WHERE SessionID = %s"
+            BaseRepository.execute_query(query, (session_id,), commit=True)
+            on_commit(lambda: leaderboard_engine.remove_session(session_id))
+            query = "DELETE FROM jogging WHERE SessionID = %s"
+            BaseRepository.execute_query(query, (session_id,), commit=True)
 
     @staticmethod
     def add_session_to_event(event_id, session_id):
-        """Associate a session with an event."""
-        query = "INSERT INTO EventSession (EventID, SessionID) VALUES (%s, %s)"
-        BaseRepository.execute_query(query, (event_id, session_id), commit=True)
+        """Associate a session with an event and enter it on the leaderboard."""
+        with unit_of_work():
+            query = "INSERT INTO EventSession (EventID, SessionID) VALUES (%s, %s)"
+            BaseRepository.execute_query(query, (event_id, session_id), commit=True)
+            LeaderboardRepository.add_entry(event_id, session_id)
 
     @staticmethod
     def remove_session_from_event(event_id, session_id):
-        """Remove a session from an event."""
-        query = "DELETE FROM EventSession WHERE EventID = %s AND SessionID = %s"
-        BaseRepository.execute_query(query, (event_id, session_id), commit=True)
+        """Remove a session from an event and from its leaderboard."""
+        with unit_of_work():
+            query = "DELETE FROM EventSession WHERE EventID = %s AND SessionID = %s"
+            BaseRepository.execute_query(query, (event_id, session_id), commit=True)
+            query = "DELETE FROM leaderboardentry WHERE EventID = %s AND SessionID = %s"
+            BaseRepository.execute_query(query, (event_id, session_id), commit=True)
+            on_commit(lambda: leaderboard_engine.remove(event_id, session_id))
 
 
 class ReviewRepository(BaseRepository):
     """Repository for review operations."""
 
+    @staticmethod
+    def _reviews_page(table, column, owner_id, cursor, limit):
+        """Get one page of reviews, newest first, keyed on ReviewID."""
+        limit = page_size(limit)
+        after = decode_cursor(cursor, 1)
+        condition, params = "", ()
+        if after:
+            condition, params = "AND r.ReviewID < %s", (after[0],)
+        query = f"""
+        SELECT r.*, j.Name as JoggerName
+        FROM {table} r
+        JOIN jogger j ON r.JoggerEmail = j.Email
+        WHERE r.{column} = %s {condition}
+        ORDER BY r.ReviewID DESC
+        LIMIT %s
+        """
+        rows = BaseRepository.execute_query(query, (owner_id, *params, limit + 1))
+        return make_page(rows, limit, lambda row: (row["ReviewID"],))
+
+    @staticmethod
+    def get_route_reviews_page(route_id, cursor=None, limit=None):
+        """Get one page of a route's reviews, newest first.
+
+        Args:
+            route_id (int): The route
+            cursor (str): next_cursor of the previous page, or None for the first page
+            limit (int): Page size, clamped to PAGINATION_CONFIG
+        """
+        return ReviewRepository._reviews_page(
+            "routereview", "RouteID", route_id, cursor, limit
+        )
+
+    @staticmethod
+    def get_event_reviews_page(event_id, cursor=None, limit=None):
+        """Get one page of an event's reviews, newest first.
+
+        Args:
+            event_id (int): The event
+            cursor (str): next_cursor of the previous page, or None for the first page
+            limit (int): Page size, clamped to PAGINATION_CONFIG
+        """
+        return ReviewRepository._reviews_page(
+            "eventreview", "EventID", event_id, cursor, limit
+        )
+
     @staticmethod
     def get_route_reviews(route_id):
         """Get all reviews for a route."""
@@ -383,88 +982,450 @@ class ReviewRepository(BaseRepository):
         result = BaseRepository.execute_query(query, (event_id, jogger_email))
         return result[0] if result else None
 
+    @staticmethod
+    def _add_rating(subject, subject_id, rating, delta):
+        """Add (delta 1) or remove (delta -1) one rating from a rating summary."""
+        stars = [delta if rating == n else 0 for n in range(1, 6)]
+        query = """
+        INSERT INTO ratingsummary
+            (Subject, SubjectID, RatingSum, RatingCount,
+             Stars1, Stars2, Stars3, Stars4, Stars5)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            RatingSum = RatingSum + VALUES(RatingSum),
+            RatingCount = RatingCount + VALUES(RatingCount),
+            Stars1 = Stars1 + VALUES(Stars1), Stars2 = Stars2 + VALUES(Stars2),
+            Stars3 = Stars3 + VALUES(Stars3), Stars4 = Stars4 + VALUES(Stars4),
+            Stars5 = Stars5 + VALUES(Stars5)
+        """
+        BaseRepository.execute_query(
+            query, (subject, subject_id, rating * delta, delta, *stars), commit=True
+        )
+        _forget(rating_cache, (subject, subject_id))
+
+    @staticmethod
+    def _create_review(subject, subject_id, jogger_email, rating, comment):
+        table, column = REVIEW_TABLES[subject]
+        with unit_of_work():
+            query = f"INSERT INTO {table} ({column}, JoggerEmail, Rating, Comment) VALUES (%s, %s, %s, %s)"
+            BaseRepository.execute_query(
+                query, (subject_id, jogger_email, rating, comment), commit=True
+            )
+            ReviewRepository._add_rating(subject, subject_id, rating, 1)
+
+    @staticmethod
+    def _locked_review(subject, review_id):
+        """Lock a review and return its subject ID and rating, or None."""
+        table, column = REVIEW_TABLES[subject]
+        query = f"SELECT {column} AS SubjectID, Rating FROM {table} WHERE ReviewID = %s FOR UPDATE"
+        result = BaseRepository.execute_query(query, (review_id,))
+        return result[0] if result else None
+
+    @staticmethod
+    def _update_review(subject, review_id, rating, comment):
+        table, _ = REVIEW_TABLES[subject]
+        with unit_of_work():
+            old = ReviewRepository._locked_review(subject, review_id)
+            query = f"UPDATE {table} SET Rating = %s, Comment = %s WHERE ReviewID = %s"
+            BaseRepository.execute_query(
+                query, (rating, comment, review_id), commit=True
+            )
+            if old and old["Rating"] != rating:
+                ReviewRepository._add_rating(
+                    subject, old["SubjectID"], old["Rating"], -1
+                )
+                ReviewRepository._add_rating(subject, old["SubjectID"], rating, 1)
+
+    @staticmethod
+    def _delete_review(subject, review_id):
+        table, _ = REVIEW_TABLES[subject]
+        with unit_of_work():
+            old = ReviewRepository._locked_review(subject, review_id)
+            query = f"DELETE FROM {table} WHERE ReviewID = %s"
+            BaseRepository.execute_query(query, (review_id,), commit=True)
+            if old:
+                ReviewRepository._add_rating(
+                    subject, old["SubjectID"], old["Rating"], -1
+                )
+
     @staticmethod
     def create_route_review(route_id, jogger_email, rating, comment=None):
         """Create a new route review."""
-        query = "INSERT INTO routereview (RouteID, JoggerEmail, Rating, Comment) VALUES (%s, %s, %s, %s)"
-        BaseRepository.execute_query(
-            query, (route_id, jogger_email, rating, comment), commit=True
+        ReviewRepository._create_review(
+            "route", route_id, jogger_email, rating, comment
         )
 
     @staticmethod
     def create_event_review(event_id, jogger_email, rating, comment=None):
         """Create a new event review."""
-        query = "INSERT INTO eventreview (EventID, JoggerEmail, Rating, Comment) VALUES (%s, %s, %s, %s)"
-        BaseRepository.execute_query(
-            query, (event_id, jogger_email, rating, comment), commit=True
+        ReviewRepository._create_review(
+            "event", event_id, jogger_email, rating, comment
         )
 
     @staticmethod
     def update_route_review(review_id, rating, comment=None):
         """Update a route review."""
-        query = "UPDATE routereview SET Rating = %s, Comment = %s WHERE ReviewID = %s"
-        BaseRepository.execute_query(query, (rating, comment, review_id), commit=True)
+        ReviewRepository._update_review("route", review_id, rating, comment)
 
     @staticmethod
     def update_event_review(review_id, rating, comment=None):
         """Update an event review."""
-        query = "UPDATE eventreview SET Rating = %s, Comment = %s WHERE ReviewID = %s"
-        BaseRepository.execute_query(query, (rating, comment, review_id), commit=True)
+        ReviewRepository._update_review("event", review_id, rating, comment)
 
     @staticmethod
     def delete_route_review(review_id):
         """Delete a route review."""
-        query = "DELETE FROM routereview WHERE ReviewID = %s"
-        BaseRepository.execute_query(query, (review_id,), commit=True)
+        ReviewRepository._delete_review("route", review_id)
 
     @staticmethod
     def delete_event_review(review_id):
         """Delete an event review."""
-        query = "DELETE FROM eventreview WHERE ReviewID = %s"
-        BaseRepository.execute_query(query, (review_id,), commit=True)
+        ReviewRepository._delete_review("event", review_id)
+
+    @staticmethod
+    def _rating_summary(subject, subject_id):
+        """Read a rating summary as average, count and 1-5 star histogram."""
+
+        def load(connection):
+            query = """
+            SELECT RatingSum, RatingCount, Stars1, Stars2, Stars3, Stars4, Stars5
+            FROM ratingsummary
+            WHERE Subject = %s AND SubjectID = %s
+            """
+            result = BaseRepository.execute_query(
+                query, (subject, subject_id), connection=connection
+            )
+            row = result[0] if result else {}
+            count = row.get("RatingCount") or 0
+            return {
+                "average": round(row["RatingSum"] / count, 1) if count else 0,
+                "count": count,
+                "histogram": {n: row.get(f"Stars{n}") or 0 for n in range(1, 6)},
+            }
+
+        return _cached(rating_cache, (subject, subject_id), load)
 
     @staticmethod
     def get_route_average_rating(route_id):
-        """Get the average rating for a route."""
-        query = """
-        SELECT AVG(Rating) as average_rating, COUNT(*) as review_count
-        FROM routereview 
-        WHERE RouteID = %s
-        """
-        result = BaseRepository.execute_query(query, (route_id,))
-        return {
-            "average": (
-                round(result[0]["average_rating"], 1)
-                if result[0]["average_rating"]
-                else 0
-            ),
-            "count": result[0]["review_count"],
-        }
+        """Get the average rating, review count and star histogram for a route."""
+        return ReviewRepository._rating_summary("route", route_id)
 
     @staticmethod
     def get_event_average_rating(event_id):
-        """Get the average rating for an event."""
-        query = """
-        SELECT AVG(Rating) as average_rating, COUNT(*) as review_count
-        FROM eventreview 
-        WHERE EventID = %s
+        """Get the average rating, review count and star histogram for an event."""
+        return ReviewRepository._rating_summary("event", event_id)
+
+    @staticmethod
+    def rebuild_rating_summaries(subject=None):
+        """Recompute rating summaries from the review tables.
+
+        Args:
+            subject (str): "route" or "event" to rebuild one kind, or None for both
+
+        Returns:
+            int: The number of rating summaries written
         """
-        result = BaseRepository.execute_query(query, (event_id,))
-        return {
-            "average": (
-                round(result[0]["average_rating"], 1)
-                if result[0]["average_rating"]
-                else 0
-            ),
-            "count": result[0]["review_count"],
-        }
+        subjects = [subject] if subject else list(REVIEW_TABLES)
+        written = 0
+        with unit_of_work():
+            for subject in subjects:
+                table, column = REVIEW_TABLES[subject]
+                query = "DELETE FROM ratingsummary WHERE Subject = %s"
+                BaseRepository.execute_query(query, (subject,), commit=True)
+                query = f"""
+                INSERT INTO ratingsummary
+                    (Subject, SubjectID, RatingSum, RatingCount,
+                     Stars1, Stars2, Stars3, Stars4, Stars5)
+                SELECT %s, {column}, SUM(Rating), COUNT(*),
+                       SUM(Rating = 1), SUM(Rating = 2), SUM(Rating = 3),
+                       SUM(Rating = 4), SUM(Rating = 5)
+                FROM {table}
+                GROUP BY {column}
+                """
+                BaseRepository.execute_query(query, (subject,), commit=True)
+                query = (
+                    "SELECT COUNT(*) AS Summaries FROM ratingsummary WHERE Subject = %s"
+                )
+                written += BaseRepository.execute_query(query, (subject,))[0][
+                    "Summaries"
+                ]
+            _forget_all(rating_cache)
+        return written
 
 
 class LeaderboardRepository(BaseRepository):
-    """Repository for leaderboard operations."""
+    """Repository for leaderboard operations.
+
+    Leaderboards are read from leaderboardentry, a materialized copy of the
+    leaderboard view that the session write methods keep up to date one
+    session at a time. Ranks are computed over a single event's rows, which
+    are read in rank order from the (EventID, Distance, FinishTime) index.
+
+    With LEADERBOARD_CONFIG enabled, reads are answered by an in-memory
+    engine that is loaded from leaderboardentry per event and updated after
+    each committed session write, so rank lookups take O(log n).
+    """
+
+    ENTRY_SOURCE = """
+    SELECT es.EventID, es.SessionID, j.Email, j.Name, jog.Distance,
+           TIMESTAMPDIFF(SECOND, jog.StartDT, jog.EndDT)
+    FROM eventsession es
+    JOIN jogging jog ON es.SessionID = jog.SessionID
+    JOIN jogger j ON jog.JoggerEmail = j.Email
+    """
 
     @staticmethod
     def get_leaderboard_for_event(event_id):
         """Get the leaderboard for an event."""
-        query = "SELECT * FROM leaderboard WHERE EventID = %s ORDER BY `Rank`"
+        if LEADERBOARD_CONFIG["enabled"]:
+            return leaderboard_engine.top(event_id)
+        query = """
+        SELECT EventID, SessionID, JoggerEmail, JoggerName, Distance, FinishTime,
+               RANK() OVER (ORDER BY Distance DESC) AS `Rank`
+        FROM leaderboardentry
+        WHERE EventID = %s
+        ORDER BY Distance DESC, FinishTime, SessionID
+        """
         return BaseRepository.execute_query(query, (event_id,))
+
+    @staticmethod
+    def add_entry(event_id, session_id):
+        """Enter a session on an event's leaderboard."""
+        query = f"""
+        INSERT INTO leaderboardentry
+            (EventID, SessionID, JoggerEmail, JoggerName, Distance, FinishTime)
+        {LeaderboardRepository.ENTRY_SOURCE}
+        WHERE es.EventID = %s AND es.SessionID = %s
+        ON DUPLICATE KEY UPDATE
+            JoggerEmail = VALUES(JoggerEmail), JoggerName = VALUES(JoggerName),
+            Distance = VALUES(Distance), FinishTime = VALUES(FinishTime)
+        """
+        BaseRepository.execute_query(query, (event_id, session_id), commit=True)
+        LeaderboardRepository._sync_entries(
+            "EventID = %s AND SessionID = %s", (event_id, session_id)
+        )
+
+    @staticmethod
+    def refresh_session(session_id):
+        """Copy a session's current distance and time into its leaderboard entries."""
+        query = """
+        UPDATE leaderboardentry le
+        JOIN jogging jog ON le.SessionID = jog.SessionID
+        SET le.Distance = jog.Distance,
+            le.FinishTime = TIMESTAMPDIFF(SECOND, jog.StartDT, jog.EndDT)
+        WHERE le.SessionID = %s
+        """
+        BaseRepository.execute_query(query, (session_id,), commit=True)
+        LeaderboardRepository._sync_entries("SessionID = %s", (session_id,))
+
+    @staticmethod
+    def _sync_entries(where, params):
+        """Pass the matching leaderboardentry rows to the engine once committed."""
+        query = f"""
+        SELECT EventID, SessionID, JoggerEmail, JoggerName, Distance, FinishTime
+        FROM leaderboardentry
+        WHERE {where}
+        """
+        entries = BaseRepository.execute_query(query, params)
+        on_commit(lambda: leaderboard_engine.upsert(entries))
+
+    @staticmethod
+    def _load_entries(event_id):
+        """Read an event's leaderboard entries for the in-memory engine."""
+        query = """
+        SELECT EventID, SessionID, JoggerEmail, JoggerName, Distance, FinishTime
+        FROM leaderboardentry
+        WHERE EventID = %s
+        """
+        # Outside the request's transaction, whose snapshot may predate writes
+        # the engine has already applied
+        with detached_connection() as connection:
+            return BaseRepository.execute_query(
+                query, (event_id,), connection=connection
+            )
+
+    @staticmethod
+    def _ranked_entries(event_id, condition, params, limit=None):
+        """Rank an event's entries in SQL and filter them by rank position."""
+        query = f"""
+        SELECT * FROM (
+            SELECT EventID, SessionID, JoggerEmail, JoggerName, Distance, FinishTime,
+                   RANK() OVER (ORDER BY Distance DESC) AS `Rank`,
+                   ROW_NUMBER() OVER (
+                       ORDER BY Distance IS NULL, Distance DESC,
+                                FinishTime IS NOT NULL, FinishTime, SessionID
+                   ) AS Position
+            FROM leaderboardentry
+            WHERE EventID = %s
+        ) ranked
+        WHERE {condition}
+        ORDER BY Position
+        """
+        if limit is not None:
+            query += " LIMIT %s"
+            params = (*params, limit)
+        return BaseRepository.execute_query(query, (event_id, *params))
+
+    @staticmethod
+    def get_leaderboard_page(event_id, cursor=None, limit=None):
+        """Get one page of an event's leaderboard in rank order.
+
+        Args:
+            event_id (int): The event
+            cursor (str): next_cursor of the previous page, or None for the top
+            limit (int): Page size, clamped to PAGINATION_CONFIG
+        """
+        limit = page_size(limit)
+        after = decode_cursor(cursor, 3)
+        if LEADERBOARD_CONFIG["enabled"]:
+            after_entry = (
+                dict(zip(("Distance", "FinishTime", "SessionID"), after))
+                if after
+                else None
+            )
+            rows = leaderboard_engine.page_after(event_id, after_entry, limit + 1)
+        else:
+            condition, params = "TRUE", ()
+            if after:
+                # Entries without a distance rank last and those without a
+                # finish time first, so NULLs get flags instead of comparisons
+                condition = """
+                (Distance IS NULL, COALESCE(-Distance, 0),
+                 FinishTime IS NOT NULL, COALESCE(FinishTime, 0), SessionID)
+                > (%s, %s, %s, %s, %s)
+                """
+                distance, finish_time, session_id = after
+                params = (
+                    distance is None,
+                    -distance if distance is not None else 0,
+                    finish_time is not None,
+                    finish_time if finish_time is not None else 0,
+                    session_id,
+                )
+            rows = LeaderboardRepository._ranked_entries(
+                event_id, condition, params, limit + 1
+            )
+        return make_page(
+            rows,
+            limit,
+            lambda row: (row["Distance"], row["FinishTime"], row["SessionID"]),
+        )
+
+    @staticmethod
+    def count_entries(event_id):
+        """Get the number of entries on an event's leaderboard."""
+        if LEADERBOARD_CONFIG["enabled"]:
+            return leaderboard_engine.size(event_id)
+        query = "SELECT COUNT(*) AS Entries FROM leaderboardentry WHERE EventID = %s"
+        return BaseRepository.execute_query(query, (event_id,))[0]["Entries"]
+
+    @staticmethod
+    def get_top_entries(event_id, limit=10):
+        """Get the best ``limit`` entries of an event's leaderboard."""
+        if LEADERBOARD_CONFIG["enabled"]:
+            return leaderboard_engine.top(event_id, limit)
+        return LeaderboardRepository._ranked_entries(
+            event_id, "Position <= %s", (limit,)
+        )
+
+    @staticmethod
+    def get_jogger_rank(event_id, jogger_email):
+        """Get a jogger's best leaderboard entry, with its rank, or None."""
+        if LEADERBOARD_CONFIG["enabled"]:
+            return leaderboard_engine.jogger_entry(event_id, jogger_email)
+        entries = LeaderboardRepository._ranked_entries(
+            event_id, "JoggerEmail = %s", (jogger_email,)
+        )
+        return entries[0] if entries else None
+
+    @staticmethod
+    def get_entries_around(event_id, jogger_email, radius=5):
+        """Get a jogger's best entry with up to ``radius`` entries on each side."""
+        if LEADERBOARD_CONFIG["enabled"]:
+            return leaderboard_engine.around(event_id, jogger_email, radius)
+        entries = LeaderboardRepository._ranked_entries(
+            event_id, "JoggerEmail = %s", (jogger_email,)
+        )
+        if not entries:
+            return []
+        position = entries[0]["Position"]
+        return LeaderboardRepository._ranked_entries(
+            event_id,
+            "Position BETWEEN %s AND %s",
+            (position - radius, position + radius),
+        )
+
+    @staticmethod
+    def rebuild(event_id=None):
+        """Recompute leaderboard entries from the session tables.
+
+        Args:
+            event_id (int): Event to rebuild, or None to rebuild every event
+
+        Returns:
+            int: The number of leaderboard entries written
+        """
+        with unit_of_work():
+            where, params = (
+                ("WHERE es.EventID = %s", (event_id,)) if event_id else ("", ())
+            )
+            query = "DELETE FROM leaderboardentry" + (
+                " WHERE EventID = %s" if event_id else ""
+            )
+            BaseRepository.execute_query(query, params, commit=True)
+            query = f"""
+            INSERT INTO leaderboardentry
+                (EventID, SessionID, JoggerEmail, JoggerName, Distance, FinishTime)
+            {LeaderboardRepository.ENTRY_SOURCE}
+            {where}
+            """
+            BaseRepository.execute_query(query, params, commit=True)
+            on_commit(lambda: leaderboard_engine.invalidate(event_id))
+            query = "SELECT COUNT(*) AS Entries FROM leaderboardentry" + (
+                " WHERE EventID = %s" if event_id else ""
+            )
+            return BaseRepository.execute_query(query, params)[0]["Entries"]
+
+    @staticmethod
+    def check_consistency(event_id=None):
+        """Compare the materialized leaderboard against the leaderboard view.
+
+        Args:
+            event_id (int): Event to check, or None to check every event
+
+        Returns:
+            list: (EventID, JoggerName, FinishTime, Rank, difference) tuples, where
+                difference is positive for rows only in the view and negative
+                for rows only in the materialized table
+        """
+        where, params = ("WHERE EventID = %s", (event_id,)) if event_id else ("", ())
+        view_rows = BaseRepository.execute_query(
+            f"SELECT EventID, JoggerName, FinishTime, `Rank` FROM leaderboard {where}",
+            params,
+        )
+        stored_rows = BaseRepository.execute_query(
+            f"""
+            SELECT EventID, JoggerName, FinishTime,
+                   RANK() OVER (PARTITION BY EventID ORDER BY Distance DESC) AS `Rank`
+            FROM leaderboardentry {where}
+            """,
+            params,
+        )
+
+        def key(row):
+            return (row["EventID"], row["JoggerName"], row["FinishTime"], row["Rank"])
+
+        difference = Counter(map(key, view_rows))
+        difference.subtract(Counter(map(key, stored_rows)))
+        # FinishTime may be NULL, which does not compare with a number
+        return sorted(
+            ((*row, count) for row, count in difference.items() if count != 0),
+            key=lambda r: (r[0], r[1], r[2] is None, r[2] or 0, r[3]),
+        )
+
+
+leaderboard_engine = LeaderboardEngine(LeaderboardRepository._load_entries)
+route_catalogue = get_snapshot(
+    "route_catalogue", RouteRepository._load_routes, key="RouteID"
+)
+route_search = RouteSearch(route_catalogue.rows, lambda: route_catalogue.version)
@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import datetime
+
+# Keyset pagination configuration
+PAGINATION_CONFIG = {
+    "page_size": 20,  # Rows per page when the request does not ask for a size
+    "max_page_size": 100,  # Upper bound on any requested page size
+}
+
+
+class Page:
+    """One page of rows plus the cursor that continues after its last row.
+
+    Iterates and tests like the list of rows, so templates written for a
+    full result keep working.
+    """
+
+    __slots__ = ("items", "next_cursor")
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+
+def page_size(requested=None):
+    """Clamp a requested page size to 1..max_page_size."""
+    if not requested:
+        return PAGINATION_CONFIG["page_size"]
+    return max(1, min(int(requested), PAGINATION_CONFIG["max_page_size"]))
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of a page's last row as a URL-safe token."""
+    payload = json.dumps([_encode_value(value) for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, length):
+    """Decode a cursor token into ``length`` sort-key values.
+
+    Returns None for a missing token, so the first page is served, and raises
+    ValueError for a token that was not produced by encode_cursor().
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {token}") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError(f"Invalid page cursor: {token}")
+    return [_decode_value(value) for value in values]
+
+
+def make_page(rows, limit, key):
+    """Trim a result fetched with ``limit + 1`` rows into a Page.
+
+    Args:
+        rows (list): Rows in page order, at most one more than ``limit``
+        limit (int): The page size
+        key (callable): Returns the sort-key values of a row for its cursor
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return Page(rows, encode_cursor(key(rows[-1])))
+    return Page(rows)
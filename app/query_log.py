@@ -0,0 +1,207 @@
+import logging
+import os
+import random
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+logger = logging.getLogger("jogging.sql")
+
+# Query log configuration
+QUERY_LOG_CONFIG = {
+    "level": os.environ.get("QUERY_LOG_LEVEL", "off"),  # off, summary or full
+    "sample_rate": float(os.environ.get("QUERY_LOG_SAMPLE_RATE", "1.0")),
+}
+
+LEVELS = {"off": None, "summary": logging.INFO, "full": logging.DEBUG}
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query):
+    """Normalize a query so that statements differing only in values match."""
+    normalized = _STRING_LITERAL.sub("?", query)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = normalized.replace("%s", "?")
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def _literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return f"'{value}'"
+
+
+def interpolate(query, params):
+    """Render a query with its parameters inlined, for reading only."""
+    if not params:
+        return query
+    if isinstance(params, dict):
+        return _PLACEHOLDER.sub(
+            lambda m: _literal(params[m.group(1)]) if m.group(1) else m.group(0),
+            query,
+        )
+    values = iter(params)
+    return _PLACEHOLDER.sub(
+        lambda m: m.group(0) if m.group(1) else _literal(next(values, None)), query
+    )
+
+
+class QueryRecord:
+    """A logged query whose text is only built when a handler emits it."""
+
+    __slots__ = ("query", "params", "duration", "row_count", "full")
+
+    def __init__(self, query, params, duration, row_count, full):
+        self.query = query
+        self.params = params
+        self.duration = duration
+        self.row_count = row_count
+        self.full = full
+
+    @property
+    def fingerprint(self):
+        return fingerprint(self.query)
+
+    @property
+    def param_count(self):
+        return len(self.params) if self.params else 0
+
+    def as_dict(self):
+        record = {
+            "fingerprint": self.fingerprint,
+            "params": self.param_count,
+            "duration_ms": round(self.duration * 1000, 3),
+            "rows": self.row_count,
+        }
+        if self.full:
+            record["sql"] = _WHITESPACE.sub(
+                " ", interpolate(self.query, self.params)
+            ).strip()
+        return record
+
+    def __str__(self):
+        return " ".join(
+            f"{key}={value!r}" if isinstance(value, str) else f"{key}={value}"
+            for key, value in self.as_dict().items()
+        )
+
+
+class _State:
+    level = None
+    sample_rate = 1.0
+
+
+_state = _State()
+
+
+def configure_query_log(level=None, sample_rate=None):
+    """Set the query log level (off, summary, full) and sampling rate."""
+    level = QUERY_LOG_CONFIG["level"] if level is None else level
+    sample_rate = (
+        QUERY_LOG_CONFIG["sample_rate"] if sample_rate is None else sample_rate
+    )
+    if level not in LEVELS:
+        raise ValueError(f"Unknown query log level: {level}")
+
+    _state.level = LEVELS[level]
+    _state.sample_rate = sample_rate
+    if _state.level is not None:
+        logger.setLevel(_state.level)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+            logger.addHandler(handler)
+
+
+class QueryCapture:
+    """The queries run and connections borrowed while a capture_queries() block is active."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.records = []
+        self.checkouts = 0
+        self.checkout_wait = 0.0
+
+    @property
+    def count(self):
+        return len(self.records)
+
+    @property
+    def rows(self):
+        return sum(record.row_count or 0 for record in self.records)
+
+    @property
+    def duration(self):
+        return sum(record.duration for record in self.records)
+
+    def repeated(self, threshold=2):
+        """Return {fingerprint: count} for statements run ``threshold`` times or more."""
+        counts = {}
+        for record in self.records:
+            counts[record.fingerprint] = counts.get(record.fingerprint, 0) + 1
+        return {key: count for key, count in counts.items() if count >= threshold}
+
+
+_capture = ContextVar("query_capture", default=None)
+
+
+@contextmanager
+def capture_queries():
+    """Record every query run in this context, whatever the log level.
+
+    Worker threads started with run_in_db_thread() see the capture too.
+    Captures nest; an outer capture also sees the queries of inner ones.
+    """
+    capture = QueryCapture(_capture.get())
+    token = _capture.set(capture)
+    try:
+        yield capture
+    finally:
+        _capture.reset(token)
+
+
+def _sampled():
+    return _state.sample_rate >= 1 or random.random() < _state.sample_rate
+
+
+def should_log():
+    """Decide, before running a query, whether it will be logged."""
+    if _capture.get() is not None:
+        return True
+    return _state.level is not None and _sampled()
+
+
+def log_checkout(waited):
+    """Count a pool checkout against the active captures, if any."""
+    capture = _capture.get()
+    while capture is not None:
+        capture.checkouts += 1
+        capture.checkout_wait += waited
+        capture = capture.parent
+
+
+def log_query(query, params, duration, row_count):
+    """Emit a record for a query selected by should_log()."""
+    full = _state.level == logging.DEBUG
+    record = QueryRecord(query, params, duration, row_count, full)
+    capture = _capture.get()
+    if capture is not None:
+        while capture is not None:
+            capture.records.append(record)
+            capture = capture.parent
+        if _state.level is None or not _sampled():
+            return
+    logger.log(_state.level, "%s", record, extra={"query": record})
+
+
+configure_query_log()
@@ -0,0 +1,217 @@
+import bisect
+import math
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+# Route search configuration
+SEARCH_CONFIG = {
+    "fuzzy_threshold": 0.3,  # Trigram similarity a typo-tolerant match needs
+    "fuzzy_below": 100,  # Look for typos only when fewer names match directly
+}
+
+# Match tiers, best first
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+MATCH_TYPES = ("exact", "prefix", "word prefix", "substring", "fuzzy")
+
+
+def normalize(text):
+    """Lower-case ``text``, strip accents and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text, padded=True):
+    """Return the set of three-character substrings of a normalized text.
+
+    Padded trigrams mark the start and end of the text, as pg_trgm does, so
+    prefixes weigh more in similarity; unpadded ones are used to find
+    substrings.
+    """
+    if padded:
+        text = f"  {text} "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(a, b):
+    """Jaccard similarity of two trigram sets."""
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+
+class RouteSearchIndex:
+    """Trigram and sorted-name index over a fixed set of routes.
+
+    Prefix matches are found by bisecting the sorted names, substrings by
+    checking the names in the posting list of the query's rarest trigram,
+    and typo-tolerant matches by counting shared trigrams over the query's
+    posting lists, so no name outside them is ever looked at.
+    """
+
+    def __init__(self, routes):
+        self.routes = list(routes)
+        self._names = [normalize(route["RouteName"]) for route in self.routes]
+        self._by_name = sorted(range(len(self.routes)), key=self._names.__getitem__)
+        self._sorted_names = [self._names[i] for i in self._by_name]
+        self._by_distance = sorted(
+            (i for i, route in enumerate(self.routes) if route["Distance"] is not None),
+            key=lambda i: self.routes[i]["Distance"],
+        )
+        self._distances = [self.routes[i]["Distance"] for i in self._by_distance]
+        self._gram_counts = []
+        postings = defaultdict(list)
+        for position, name in enumerate(self._names):
+            grams = trigrams(name)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(position)
+        self._postings = dict(postings)
+
+    def __len__(self):
+        return len(self.routes)
+
+    def _prefixed(self, prefix):
+        start = bisect.bisect_left(self._sorted_names, prefix)
+        end = bisect.bisect_left(self._sorted_names, prefix + "\U0010ffff")
+        return self._by_name[start:end]
+
+    def _substrings(self, text):
+        grams = trigrams(text, padded=False)
+        if not grams:
+            return [i for i, name in enumerate(self._names) if text in name]
+        rarest = min(grams, key=lambda gram: len(self._postings.get(gram, ())))
+        return [i for i in self._postings.get(rarest, ()) if text in self._names[i]]
+
+    def _fuzzy(self, text, threshold):
+        if len(text) < 3:
+            return {}
+        grams = trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        needed = math.ceil(threshold * len(grams))
+        scores = {}
+        for i, count in shared.items():
+            if count < needed:
+                continue
+            score = count / (len(grams) + self._gram_counts[i] - count)
+            if score >= threshold:
+                scores[i] = score
+        return scores
+
+    def _in_ranges(self, route, distance, pace):
+        for value, (low, high) in (
+            (route["Distance"], distance),
+            (route["AvgPace"], pace),
+        ):
+            if low is None and high is None:
+                continue
+            if value is None:
+                return False
+            if (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+    def _distance_range(self, low, high):
+        start = 0 if low is None else bisect.bisect_left(self._distances, low)
+        end = (
+            len(self._distances)
+            if high is None
+            else bisect.bisect_right(self._distances, high)
+        )
+        return self._by_distance[start:end]
+
+    def search(self, text=None, distance=(None, None), pace=(None, None)):
+        """Return matching routes, best first, as (sort key, route) pairs.
+
+        Args:
+            text (str): Name to search for, or None to match every route
+            distance (tuple): (min, max) distance in km; None leaves a side open
+            pace (tuple): (min, max) average pace; None leaves a side open
+
+        The sort key is (tier, -similarity, normalized name, RouteID), where
+        tier is an index into MATCH_TYPES. Typo-tolerant matches are only
+        looked for when fewer than SEARCH_CONFIG["fuzzy_below"] names match
+        directly.
+        """
+        text = normalize(text)
+        matches = {}
+        if text:
+            for i in self._substrings(text):
+                name = self._names[i]
+                tier = SUBSTRING
+                if name == text:
+                    tier = EXACT
+                elif name.startswith(text):
+                    tier = PREFIX
+                elif f" {text}" in name:
+                    tier = WORD_PREFIX
+                matches[i] = (tier, 0)
+            for i in self._prefixed(text):
+                matches[i] = (EXACT if self._names[i] == text else PREFIX, 0)
+            if len(matches) < SEARCH_CONFIG["fuzzy_below"]:
+                scores = self._fuzzy(text, SEARCH_CONFIG["fuzzy_threshold"])
+                for i, score in scores.items():
+                    matches.setdefault(i, (FUZZY, -round(score, 4)))
+            positions = matches
+        elif distance != (None, None):
+            positions = self._distance_range(*distance)
+        else:
+            positions = range(len(self.routes))
+
+        results = []
+        for i in positions:
+            route = self.routes[i]
+            if not self._in_ranges(route, distance, pace):
+                continue
+            tier, score = matches.get(i, (EXACT, 0))
+            results.append(((tier, score, self._names[i], route["RouteID"]), route))
+        results.sort(key=lambda result: result[0])
+        return results
+
+
+def is_sort_key(values):
+    """Whether ``values``, e.g. from a page cursor, are typed like a sort key."""
+    tier, score, name, route_id = values
+    return (
+        isinstance(tier, int)
+        and isinstance(score, (int, float))
+        and isinstance(name, str)
+        and isinstance(route_id, int)
+    )
+
+
+class RouteSearch:
+    """Route search over the current route catalogue.
+
+    The index is rebuilt when ``version()`` moves or ``rows()`` returns
+    different rows, so reloading an unchanged catalogue keeps the index.
+    """
+
+    def __init__(self, rows, version=lambda: None):
+        self._rows = rows
+        self._version = version
+        self._lock = threading.Lock()
+        self._indexed_rows = None
+        self._indexed_version = None
+        self._index = None
+
+    def index(self):
+        """Return the index for the current catalogue rows."""
+        rows = self._rows()
+        version = self._version()
+        with self._lock:
+            if (
+                self._index is None
+                or version != self._indexed_version
+                or (rows is not self._indexed_rows and rows != self._indexed_rows)
+            ):
+                self._index = RouteSearchIndex(rows)
+                self._indexed_version = version
+            self._indexed_rows = rows
+            return self._index
+
+    def search(self, text=None, distance=(None, None), pace=(None, None)):
+        """Search the current catalogue; see RouteSearchIndex.search()."""
+        return self.index().search(text, distance, pace)
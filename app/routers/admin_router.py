@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Request, Form, Query, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 import os
 from typing import Optional
 from datetime import datetime
 
-from models.repositories import RouteRepository, JoggerRepository
+from cache import get_cache_stats
+from database import get_pool_stats
+from pagination import PAGINATION_CONFIG
+from models.async_repositories import RouteRepository, JoggerRepository
 
 router = APIRouter()
 
@@ -20,10 +23,10 @@ async def admin_dashboard(
     request: Request, email: str = Query(..., description="Admin email address")
 ):
     """Admin dashboard showing route management options."""
-    if not JoggerRepository.check_if_admin(email):
+    if not await JoggerRepository.check_if_admin(email):
         return RedirectResponse(url="/", status_code=303)
 
-    routes = RouteRepository.get_all_routes()
+    routes = await RouteRepository.get_all_routes()
 
     return templates.TemplateResponse(
         "admin/dashboard.html",
@@ -42,7 +45,7 @@ async def add_route_form(
 ):
     """Form to add a new route."""
 
-    if not JoggerRepository.check_if_admin(email):
+    if not await JoggerRepository.check_if_admin(email):
         return RedirectResponse(url="/", status_code=303)
 
     return templates.TemplateResponse(
@@ -61,10 +64,10 @@ async def add_route(
 ):
     """Handle add route form submission."""
 
-    if not JoggerRepository.check_if_admin(email):
+    if not await JoggerRepository.check_if_admin(email):
         return RedirectResponse(url="/", status_code=303)
 
-    route_id = RouteRepository.create_route(route_name, distance, avg_pace)
+    route_id = await RouteRepository.create_route(route_name, distance, avg_pace)
 
     return RedirectResponse(
         url=f"/admin/dashboard?email={email}&success=Route+added+successfully",
@@ -80,10 +83,10 @@ async def edit_route_form(
 ):
     """Form to edit an existing route."""
 
-    if not JoggerRepository.check_if_admin(email):
+    if not await JoggerRepository.check_if_admin(email):
         return RedirectResponse(url="/", status_code=303)
 
-    route = RouteRepository.get_route_by_id(route_id)
+    route = await RouteRepository.get_route_by_id(route_id)
     if not route:
         return RedirectResponse(
             url=f"/admin/dashboard?email={email}&error=Route+not+found", status_code=303
@@ -112,10 +115,10 @@ async def edit_route(
 ):
     """Handle edit route form submission."""
 
-    if not JoggerRepository.check_if_admin(email):
+    if not await JoggerRepository.check_if_admin(email):
         return RedirectResponse(url="/", status_code=303)
 
-    RouteRepository.update_route(route_id, route_name, distance, avg_pace)
+    await RouteRepository.update_route(route_id, route_name, distance, avg_pace)
 
     return RedirectResponse(
         url=f"/admin/dashboard?email={email}&success=Route+updated+successfully",
@@ -131,10 +134,10 @@ async def delete_route(
 ):
     """Delete a route."""
 
-    if not JoggerRepository.check_if_admin(email):
+    if not await JoggerRepository.check_if_admin(email):
         return RedirectResponse(url="/", status_code=303)
 
-    RouteRepository.delete_route(route_id)
+    await RouteRepository.delete_route(route_id)
 
     return RedirectResponse(
         url=f"/admin/dashboard?email={email}&success=Route+deleted+successfully",
@@ -147,18 +150,36 @@ async def search_routes(
     request: Request,
     email: str = Query(..., description="Admin email address"),
     query: str = Query(None, description="Search query"),
+    min_distance: Optional[float] = Query(None, ge=0),
+    max_distance: Optional[float] = Query(None, ge=0),
+    min_pace: Optional[float] = Query(None, ge=0),
+    max_pace: Optional[float] = Query(None, ge=0),
+    after: Optional[str] = None,
+    page_size: Optional[int] = Query(None, ge=1, le=PAGINATION_CONFIG["max_page_size"]),
 ):
-    """Search for routes."""
+    """Search routes by name, with optional distance and pace ranges."""
 
-    if not JoggerRepository.check_if_admin(email):
+    if not await JoggerRepository.check_if_admin(email):
         return RedirectResponse(url="/", status_code=303)
 
-    if not query:
+    filters = {
+        "min_distance": min_distance,
+        "max_distance": max_distance,
+        "min_pace": min_pace,
+        "max_pace": max_pace,
+    }
+    if not (query and query.strip()) and all(v is None for v in filters.values()):
         return RedirectResponse(url=f"/admin/dashboard?email={email}", status_code=303)
 
-    # TODO: Implement actual search logic
-    # For now, we'll just show all routes as a placeholder
-    routes = RouteRepository.get_all_routes()
+    try:
+        routes = await RouteRepository.search_routes(
+            query, **filters, cursor=after, limit=page_size
+        )
+    except ValueError:
+        return RedirectResponse(
+            url=f"/admin/dashboard?email={email}&error=Invalid+page+link",
+            status_code=303,
+        )
 
     return templates.TemplateResponse(
         "admin/dashboard.html",
@@ -168,5 +189,52 @@ async def search_routes(
             "routes": routes,
             "title": "Search Results",
             "query": query,
+            "filters": filters,
+            "page_size": page_size,
         },
     )
+
+
+@router.get("/db/pool")
+async def pool_stats(email: str = Query(..., description="Admin email address")):
+    """Connection pool usage counters for sizing the pool under load."""
+
+    if not await JoggerRepository.check_if_admin(email):
+        return RedirectResponse(url="/", status_code=303)
+
+    return JSONResponse(get_pool_stats())
+
+
+@router.get("/cache")
+async def cache_stats(email: str = Query(..., description="Admin email address")):
+    """Hit and miss counters for the read-through caches."""
+
+    if not await JoggerRepository.check_if_admin(email):
+        return RedirectResponse(url="/", status_code=303)
+
+    return JSONResponse(get_cache_stats())
+
+
+@router.get("/routes/catalogue")
+async def route_catalogue_stats(
+    email: str = Query(..., description="Admin email address")
+):
+    """Version and load counters of the in-memory route catalogue."""
+
+    if not await JoggerRepository.check_if_admin(email):
+        return RedirectResponse(url="/", status_code=303)
+
+    return JSONResponse(await RouteRepository.get_catalogue_stats())
+
+
+@router.post("/routes/catalogue/refresh")
+async def refresh_route_catalogue(
+    email: str = Query(..., description="Admin email address")
+):
+    """Reload the route catalogue, e.g. after editing routes outside the app."""
+
+    if not await JoggerRepository.check_if_admin(email):
+        return RedirectResponse(url="/", status_code=303)
+
+    version = await RouteRepository.refresh_catalogue()
+    return JSONResponse({"version": version})
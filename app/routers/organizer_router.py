@@ -1,19 +1,30 @@
 from fastapi import APIRouter, Request, Form, Query, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 import os
 from typing import Optional
 from datetime import datetime
 
-from models.repositories import (
+from database import UnitOfWork, get_unit_of_work, run_in_db_thread
+from export import FORMATS, check_export, export_filename, export_rows
+from pagination import PAGINATION_CONFIG
+from models.async_repositories import (
     JoggerRepository,
     EventRepository,
     RegistrationRepository,
     EventRepository,
+    RegistrationResult,
 )
 
 router = APIRouter()
 
+# Organizers may register joggers for past events, so PAST never comes back
+REGISTRATION_ERRORS = {
+    RegistrationResult.NOT_FOUND: "Event+not+found",
+    RegistrationResult.ALREADY_REGISTERED: "Jogger+already+registered",
+    RegistrationResult.FULL: "Event+is+full",
+}
+
 templates_path = os.path.join(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates"
 )
@@ -28,15 +39,10 @@ async def organizer_dashboard(
     error: Optional[str] = None,
 ):
     """Organizer dashboard showing events organized by this organizer."""
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
-    events = EventRepository.get_events_by_organizer(email)
-
-    for event in events:
-        event["CurrentParticipants"] = RegistrationRepository.count_registrations(
-            event["EventID"]
-        )
+    events = await EventRepository.get_organizer_event_summaries(email)
 
     current_date = datetime.now()
 
@@ -60,7 +66,7 @@ async def add_event_form(
 ):
     """Form to add a new event."""
 
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
     return templates.TemplateResponse(
@@ -79,15 +85,15 @@ async def add_event(
 ):
     """Handle add event form submission."""
 
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
-    event_id = EventRepository.create_event(event_name, event_date, max_participants)
+    event_id = await EventRepository.create_event(
+        event_name, event_date, max_participants
+    )
 
     if event_id:
-        BaseRepository = EventRepository.__mro__[1]  # Get parent class
-        query = "INSERT INTO event_em (OrganizerEmail, EventID) VALUES (%s, %s)"
-        BaseRepository.execute_query(query, (email, event_id), commit=True)
+        await EventRepository.assign_organizer(event_id, email)
 
         return RedirectResponse(
             url=f"/organizer/dashboard?email={email}&success=Event+added+successfully",
@@ -108,10 +114,10 @@ async def edit_event_form(
 ):
     """Form to edit an existing event."""
 
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
-    events = EventRepository.get_events_by_organizer(email)
+    events = await EventRepository.get_events_by_organizer(email)
     event = next((e for e in events if e["EventID"] == event_id), None)
 
     if not event:
@@ -143,10 +149,10 @@ async def edit_event(
 ):
     """Handle edit event form submission."""
 
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
-    events = EventRepository.get_events_by_organizer(email)
+    events = await EventRepository.get_events_by_organizer(email)
     event = next((e for e in events if e["EventID"] == event_id), None)
 
     if not event:
@@ -155,7 +161,9 @@ async def edit_event(
             status_code=303,
         )
 
-    EventRepository.update_event(event_id, event_name, event_date, max_participants)
+    await EventRepository.update_event(
+        event_id, event_name, event_date, max_participants
+    )
 
     return RedirectResponse(
         url=f"/organizer/dashboard?email={email}&success=Event+updated+successfully",
@@ -171,10 +179,10 @@ async def delete_event(
 ):
     """Delete an event."""
 
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
-    events = EventRepository.get_events_by_organizer(email)
+    events = await EventRepository.get_events_by_organizer(email)
     event = next((e for e in events if e["EventID"] == event_id), None)
 
     if not event:
@@ -183,7 +191,7 @@ async def delete_event(
             status_code=303,
         )
 
-    EventRepository.delete_event(event_id)
+    await EventRepository.delete_event(event_id)
 
     return RedirectResponse(
         url=f"/organizer/dashboard?email={email}&success=Event+deleted+successfully",
@@ -198,13 +206,15 @@ async def view_registrations(
     email: str = Query(..., description="Organizer email address"),
     success: Optional[str] = None,
     error: Optional[str] = None,
+    after: Optional[str] = None,
+    page_size: Optional[int] = Query(None, ge=1, le=PAGINATION_CONFIG["max_page_size"]),
 ):
-    """View and manage registrations for an event."""
+    """View and manage registrations for an event, one page at a time."""
 
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
-    events = EventRepository.get_events_by_organizer(email)
+    events = await EventRepository.get_events_by_organizer(email)
     event = next((e for e in events if e["EventID"] == event_id), None)
 
     if not event:
@@ -213,7 +223,15 @@ async def view_registrations(
             status_code=303,
         )
 
-    registrations = RegistrationRepository.get_event_registrations(event_id)
+    try:
+        registrations = await RegistrationRepository.get_event_registrations_page(
+            event_id, after, page_size
+        )
+    except ValueError:
+        return RedirectResponse(
+            url=f"/organizer/events/{event_id}/registrations?email={email}&error=Invalid+page+link",
+            status_code=303,
+        )
 
     return templates.TemplateResponse(
         "organizer/registrations.html",
@@ -222,6 +240,7 @@ async def view_registrations(
             "email": email,
             "event": event,
             "registrations": registrations,
+            "page_size": page_size,
             "title": f"Registrations for {event['EventName']}",
             "success": success,
             "error": error,
@@ -237,10 +256,10 @@ async def add_registration_form(
 ):
     """Form to add a registration to an event."""
 
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
-    events = EventRepository.get_events_by_organizer(email)
+    events = await EventRepository.get_events_by_organizer(email)
     event = next((e for e in events if e["EventID"] == event_id), None)
 
     if not event:
@@ -269,10 +288,10 @@ async def add_registration(
 ):
     """Handle add registration form submission."""
 
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
-    events = EventRepository.get_events_by_organizer(email)
+    events = await EventRepository.get_events_by_organizer(email)
     event = next((e for e in events if e["EventID"] == event_id), None)
 
     if not event:
@@ -281,28 +300,23 @@ async def add_registration(
             status_code=303,
         )
 
-    jogger = JoggerRepository.get_jogger_by_email(jogger_email)
+    jogger = await JoggerRepository.get_jogger_by_email(jogger_email)
     if not jogger:
         return RedirectResponse(
             url=f"/organizer/events/{event_id}/registrations/add?email={email}&error=Jogger+not+found",
             status_code=303,
         )
 
-    if RegistrationRepository.check_registration(event_id, jogger_email):
-        return RedirectResponse(
-            url=f"/organizer/events/{event_id}/registrations?email={email}&error=Jogger+already+registered",
-            status_code=303,
-        )
-
-    current_participants = RegistrationRepository.count_registrations(event_id)
-    if current_participants >= event["MaxParticipants"]:
+    result = await RegistrationRepository.reserve_seat(
+        event_id, jogger_email, allow_past=True
+    )
+    if result != RegistrationResult.REGISTERED:
+        error = REGISTRATION_ERRORS.get(result, "Could+not+add+registration")
         return RedirectResponse(
-            url=f"/organizer/events/{event_id}/registrations?email={email}&error=Event+is+full",
+            url=f"/organizer/events/{event_id}/registrations?email={email}&error={error}",
             status_code=303,
         )
 
-    RegistrationRepository.register_for_event(event_id, jogger_email)
-
     return RedirectResponse(
         url=f"/organizer/events/{event_id}/registrations?email={email}&success=Registration+added+successfully",
         status_code=303,
@@ -321,10 +335,10 @@ async def delete_registration(
 ):
     """Delete a registration from an event."""
 
-    if not JoggerRepository.check_if_organizer(email):
+    if not await JoggerRepository.check_if_organizer(email):
         return RedirectResponse(url="/", status_code=303)
 
-    events = EventRepository.get_events_by_organizer(email)
+    events = await EventRepository.get_events_by_organizer(email)
     event = next((e for e in events if e["EventID"] == event_id), None)
 
     if not event:
@@ -333,15 +347,63 @@ async def delete_registration(
             status_code=303,
         )
 
-    if not RegistrationRepository.check_registration(event_id, jogger_email):
+    if not await RegistrationRepository.check_registration(event_id, jogger_email):
         return RedirectResponse(
             url=f"/organizer/events/{event_id}/registrations?email={email}&error=Registration+not+found",
             status_code=303,
         )
 
-    RegistrationRepository.unregister_from_event(event_id, jogger_email)
+    await RegistrationRepository.unregister_from_event(event_id, jogger_email)
 
     return RedirectResponse(
         url=f"/organizer/events/{event_id}/registrations?email={email}&success=Registration+removed+successfully",
         status_code=303,
     )
+
+
+@router.get("/events/{event_id}/export/{dataset}")
+async def export_event(
+    event_id: int,
+    dataset: str,
+    email: str = Query(..., description="Organizer email address"),
+    format: str = Query("csv", description="csv, jsonl, parquet or arrow"),
+    unit: UnitOfWork = Depends(get_unit_of_work),
+):
+    """Download an event's registrations, sessions or reviews as a file."""
+
+    if not await JoggerRepository.check_if_organizer(email):
+        return RedirectResponse(url="/", status_code=303)
+
+    events = await EventRepository.get_events_by_organizer(email)
+    event = next((e for e in events if e["EventID"] == event_id), None)
+
+    if not event:
+        return RedirectResponse(
+            url=f"/organizer/dashboard?email={email}&error=Event+not+found+or+not+authorized",
+            status_code=303,
+        )
+
+    try:
+        check_export("event", dataset, format)
+    except ValueError:
+        return RedirectResponse(
+            url=f"/organizer/dashboard?email={email}&error=Unknown+export",
+            status_code=303,
+        )
+    except RuntimeError:
+        return RedirectResponse(
+            url=f"/organizer/dashboard?email={email}&error=Export+format+not+available",
+            status_code=303,
+        )
+
+    # The download reads on a connection of its own and can take a while, so
+    # the request's connection goes back to the pool before it starts
+    await run_in_db_thread(unit.commit)
+    await run_in_db_thread(unit.close)
+
+    filename = export_filename("event", event_id, dataset, format)
+    return StreamingResponse(
+        export_rows("event", event_id, dataset, format),
+        media_type=FORMATS[format][0],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,22 +1,34 @@
 from fastapi import APIRouter, Request, Form, Query, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 import os
 from typing import Optional
 from datetime import datetime
 
-from models.repositories import (
+from database import UnitOfWork, get_unit_of_work, run_in_db_thread
+from export import FORMATS, check_export, export_filename, export_rows
+from pagination import PAGINATION_CONFIG
+from models.async_repositories import (
     JoggerRepository,
     RouteRepository,
     EventRepository,
     RegistrationRepository,
+    WaitlistRepository,
     JoggingSessionRepository,
     ReviewRepository,
     LeaderboardRepository,
+    RegistrationResult,
 )
 
 router = APIRouter()
 
+REGISTRATION_ERRORS = {
+    RegistrationResult.NOT_FOUND: "Event+not+found",
+    RegistrationResult.ALREADY_REGISTERED: "Already+registered+for+this+event",
+    RegistrationResult.FULL: "Event+is+full",
+    RegistrationResult.PAST: "Cannot+register+for+past+events",
+}
+
 templates_path = os.path.join(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates"
 )
@@ -31,7 +43,7 @@ async def user_dashboard(
     error: Optional[str] = None,
 ):
     """User dashboard with options for events, routes, and sessions."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
@@ -56,30 +68,24 @@ async def list_events(
     error: Optional[str] = None,
 ):
     """List all available events with registration options."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    events = EventRepository.get_all_events()
+    events = await EventRepository.get_events_with_registration_status(email)
 
+    now = datetime.now()
     event_data = []
     for event in events:
-        is_registered = RegistrationRepository.check_registration(
-            event["EventID"], email
-        )
-        current_participants = RegistrationRepository.count_registrations(
-            event["EventID"]
-        )
-        is_full = current_participants >= event["MaxParticipants"]
-        is_past = event["EventDate"] < datetime.now()
-
+        current_participants = event["CurrentParticipants"]
         event_data.append(
             {
                 **event,
-                "is_registered": is_registered,
-                "is_full": is_full,
-                "is_past": is_past,
+                "is_registered": bool(event["IsRegistered"]),
+                "is_full": current_participants >= event["MaxParticipants"],
+                "is_past": event["EventDate"] < now,
                 "current_participants": current_participants,
+                "waitlist_position": event["WaitlistPosition"],
             }
         )
 
@@ -104,63 +110,96 @@ async def register_for_event(
     email: str = Query(..., description="User email address"),
 ):
     """Register for an event."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    event = EventRepository.get_event_by_id(event_id)
-    if not event:
+    result = await RegistrationRepository.reserve_seat(event_id, email)
+    if result != RegistrationResult.REGISTERED:
         return RedirectResponse(
-            url=f"/user/events?email={email}&error=Event+not+found", status_code=303
+            url=f"/user/events?email={email}&error={REGISTRATION_ERRORS[result]}",
+            status_code=303,
         )
 
-    if RegistrationRepository.check_registration(event_id, email):
+    return RedirectResponse(
+        url=f"/user/events?email={email}&success=Successfully+registered+for+event",
+        status_code=303,
+    )
+
+
+@router.get("/events/{event_id}/unregister", response_class=HTMLResponse)
+async def unregister_from_event(
+    request: Request,
+    event_id: int,
+    email: str = Query(..., description="User email address"),
+):
+    """Unregister from an event."""
+    user = await JoggerRepository.get_jogger_by_email(email)
+    if not user:
+        return RedirectResponse(url="/", status_code=303)
+
+    if not await RegistrationRepository.check_registration(event_id, email):
         return RedirectResponse(
-            url=f"/user/events?email={email}&error=Already+registered+for+this+event",
+            url=f"/user/events?email={email}&error=Not+registered+for+this+event",
             status_code=303,
         )
 
-    current_participants = RegistrationRepository.count_registrations(event_id)
-    if current_participants >= event["MaxParticipants"]:
+    await RegistrationRepository.unregister_from_event(event_id, email)
+
+    return RedirectResponse(
+        url=f"/user/events?email={email}&success=Successfully+unregistered+from+event",
+        status_code=303,
+    )
+
+
+@router.get("/events/{event_id}/waitlist/join", response_class=HTMLResponse)
+async def join_waitlist(
+    request: Request,
+    event_id: int,
+    email: str = Query(..., description="User email address"),
+):
+    """Join the waitlist of a full event, or register if a seat is free."""
+    user = await JoggerRepository.get_jogger_by_email(email)
+    if not user:
+        return RedirectResponse(url="/", status_code=303)
+
+    result = await WaitlistRepository.join_waitlist(event_id, email)
+    if result == RegistrationResult.REGISTERED:
         return RedirectResponse(
-            url=f"/user/events?email={email}&error=Event+is+full", status_code=303
+            url=f"/user/events?email={email}&success=Successfully+registered+for+event",
+            status_code=303,
         )
-
-    if event["EventDate"] < datetime.now():
+    if result != RegistrationResult.FULL:
         return RedirectResponse(
-            url=f"/user/events?email={email}&error=Cannot+register+for+past+events",
+            url=f"/user/events?email={email}&error={REGISTRATION_ERRORS[result]}",
             status_code=303,
         )
 
-    RegistrationRepository.register_for_event(event_id, email)
-
     return RedirectResponse(
-        url=f"/user/events?email={email}&success=Successfully+registered+for+event",
+        url=f"/user/events?email={email}&success=Added+to+the+waitlist",
         status_code=303,
     )
 
 
-@router.get("/events/{event_id}/unregister", response_class=HTMLResponse)
-async def unregister_from_event(
+@router.get("/events/{event_id}/waitlist/leave", response_class=HTMLResponse)
+async def leave_waitlist(
     request: Request,
     event_id: int,
     email: str = Query(..., description="User email address"),
 ):
-    """Unregister from an event."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    """Leave the waitlist of an event."""
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    if not RegistrationRepository.check_registration(event_id, email):
+    if not await WaitlistRepository.leave_waitlist(event_id, email):
         return RedirectResponse(
-            url=f"/user/events?email={email}&error=Not+registered+for+this+event",
+            url=f"/user/events?email={email}&error=Not+on+the+waitlist+for+this+event",
             status_code=303,
         )
 
-    RegistrationRepository.unregister_from_event(event_id, email)
-
     return RedirectResponse(
-        url=f"/user/events?email={email}&success=Successfully+unregistered+from+event",
+        url=f"/user/events?email={email}&success=Left+the+waitlist",
         status_code=303,
     )
 
@@ -172,29 +211,51 @@ async def event_details(
     email: str = Query(..., description="User email address"),
     success: Optional[str] = None,
     error: Optional[str] = None,
+    registrations_after: Optional[str] = None,
+    reviews_after: Optional[str] = None,
+    leaderboard_after: Optional[str] = None,
+    page_size: Optional[int] = Query(None, ge=1, le=PAGINATION_CONFIG["max_page_size"]),
 ):
-    """Show event details including participants, reviews, and leaderboard."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    """Show event details including participants, reviews, and leaderboard.
+
+    Participants, reviews and the leaderboard are each shown one page at a
+    time; the *_after parameters carry the cursor of the page to show.
+    """
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    event = EventRepository.get_event_by_id(event_id)
+    event = await EventRepository.get_event_by_id(event_id)
     if not event:
         return RedirectResponse(
             url=f"/user/events?email={email}&error=Event+not+found", status_code=303
         )
 
-    registrations = RegistrationRepository.get_event_registrations(event_id)
+    try:
+        registrations = await RegistrationRepository.get_event_registrations_page(
+            event_id, registrations_after, page_size
+        )
+        reviews = await ReviewRepository.get_event_reviews_page(
+            event_id, reviews_after, page_size
+        )
+        leaderboard = await LeaderboardRepository.get_leaderboard_page(
+            event_id, leaderboard_after, page_size
+        )
+    except ValueError:
+        return RedirectResponse(
+            url=f"/user/events/{event_id}/details?email={email}&error=Invalid+page+link",
+            status_code=303,
+        )
 
-    is_registered = RegistrationRepository.check_registration(event_id, email)
+    is_registered = await RegistrationRepository.check_registration(event_id, email)
 
-    reviews = ReviewRepository.get_event_reviews(event_id)
+    user_review = await ReviewRepository.get_event_review_by_jogger(event_id, email)
 
-    user_review = ReviewRepository.get_event_review_by_jogger(event_id, email)
+    my_entry = await LeaderboardRepository.get_jogger_rank(event_id, email)
 
-    leaderboard = LeaderboardRepository.get_leaderboard_for_event(event_id)
+    leaderboard_size = await LeaderboardRepository.count_entries(event_id)
 
-    avg_rating = ReviewRepository.get_event_average_rating(event_id)
+    avg_rating = await ReviewRepository.get_event_average_rating(event_id)
 
     return templates.TemplateResponse(
         "user/event_details.html",
@@ -208,6 +269,9 @@ async def event_details(
             "reviews": reviews,
             "user_review": user_review,
             "leaderboard": leaderboard,
+            "my_entry": my_entry,
+            "leaderboard_size": leaderboard_size,
+            "page_size": page_size,
             "is_past": event["EventDate"] < datetime.now(),
             "avg_rating": avg_rating,
             "title": f"Event Details: {event['EventName']}",
@@ -224,18 +288,18 @@ async def review_event_form(
     email: str = Query(..., description="User email address"),
 ):
     """Form to add or edit an event review."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    event = EventRepository.get_event_by_id(event_id)
+    event = await EventRepository.get_event_by_id(event_id)
     if not event:
         return RedirectResponse(
             url=f"/user/events?email={email}&error=Event+not+found", status_code=303
         )
 
     if (
-        not RegistrationRepository.check_registration(event_id, email)
+        not await RegistrationRepository.check_registration(event_id, email)
         or event["EventDate"] >= datetime.now()
     ):
         return RedirectResponse(
@@ -243,7 +307,7 @@ async def review_event_form(
             status_code=303,
         )
 
-    review = ReviewRepository.get_event_review_by_jogger(event_id, email)
+    review = await ReviewRepository.get_event_review_by_jogger(event_id, email)
     action = "edit" if review else "add"
 
     return templates.TemplateResponse(
@@ -278,9 +342,9 @@ async def submit_event_review(
         )
 
     if review_id:
-        ReviewRepository.update_event_review(review_id, rating, comment)
+        await ReviewRepository.update_event_review(review_id, rating, comment)
     else:
-        ReviewRepository.create_event_review(event_id, email, rating, comment)
+        await ReviewRepository.create_event_review(event_id, email, rating, comment)
 
     return RedirectResponse(
         url=f"/user/events/{event_id}/details?email={email}&success=Review+submitted+successfully",
@@ -298,7 +362,7 @@ async def delete_event_review(
     email: str = Query(..., description="User email address"),
 ):
     """Delete an event review."""
-    review = ReviewRepository.get_event_review_by_jogger(event_id, email)
+    review = await ReviewRepository.get_event_review_by_jogger(event_id, email)
 
     if not review or review["ReviewID"] != review_id:
         return RedirectResponse(
@@ -306,7 +370,7 @@ async def delete_event_review(
             status_code=303,
         )
 
-    ReviewRepository.delete_event_review(review_id)
+    await ReviewRepository.delete_event_review(review_id)
 
     return RedirectResponse(
         url=f"/user/events/{event_id}/details?email={email}&success=Review+deleted+successfully",
@@ -321,7 +385,7 @@ async def get_event_certificate(
     email: str = Query(..., description="User email address"),
 ):
     """Generate a certificate for a completed event."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
@@ -365,11 +429,11 @@ async def get_registration_certificate(
     email: str = Query(..., description="User email address"),
 ):
     """Generate a registration certificate for an event."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    registration = RegistrationRepository.get_registration(event_id, email)
+    registration = await RegistrationRepository.get_registration(event_id, email)
     if not registration:
         return RedirectResponse(
             url=f"/user/events/{event_id}/details?email={email}&error=Not+registered+for+this+event",
@@ -397,16 +461,15 @@ async def list_routes(
     error: Optional[str] = None,
 ):
     """List all available jogging routes."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    routes = RouteRepository.get_all_routes()
+    routes = await RouteRepository.get_routes_with_review_status(email)
 
-    route_data = []
-    for route in routes:
-        review = ReviewRepository.get_route_review_by_jogger(route["RouteID"], email)
-        route_data.append({**route, "has_review": bool(review)})
+    route_data = [
+        {**route, "has_review": route["JoggerReviewID"] is not None} for route in routes
+    ]
 
     return templates.TemplateResponse(
         "user/routes.html",
@@ -429,23 +492,33 @@ async def route_details(
     email: str = Query(..., description="User email address"),
     success: Optional[str] = None,
     error: Optional[str] = None,
+    reviews_after: Optional[str] = None,
+    page_size: Optional[int] = Query(None, ge=1, le=PAGINATION_CONFIG["max_page_size"]),
 ):
-    """Show route details including reviews."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    """Show route details including one page of reviews."""
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    route = RouteRepository.get_route_by_id(route_id)
+    route = await RouteRepository.get_route_by_id(route_id)
     if not route:
         return RedirectResponse(
             url=f"/user/routes?email={email}&error=Route+not+found", status_code=303
         )
 
-    reviews = ReviewRepository.get_route_reviews(route_id)
+    try:
+        reviews = await ReviewRepository.get_route_reviews_page(
+            route_id, reviews_after, page_size
+        )
+    except ValueError:
+        return RedirectResponse(
+            url=f"/user/routes/{route_id}/details?email={email}&error=Invalid+page+link",
+            status_code=303,
+        )
 
-    user_review = ReviewRepository.get_route_review_by_jogger(route_id, email)
+    user_review = await ReviewRepository.get_route_review_by_jogger(route_id, email)
 
-    avg_rating = ReviewRepository.get_route_average_rating(route_id)
+    avg_rating = await ReviewRepository.get_route_average_rating(route_id)
 
     return templates.TemplateResponse(
         "user/route_details.html",
@@ -455,6 +528,7 @@ async def route_details(
             "user": user,
             "route": route,
             "reviews": reviews,
+            "page_size": page_size,
             "user_review": user_review,
             "avg_rating": avg_rating,
             "title": f"Route Details: {route['RouteName']}",
@@ -471,17 +545,17 @@ async def review_route_form(
     email: str = Query(..., description="User email address"),
 ):
     """Form to add or edit a route review."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    route = RouteRepository.get_route_by_id(route_id)
+    route = await RouteRepository.get_route_by_id(route_id)
     if not route:
         return RedirectResponse(
             url=f"/user/routes?email={email}&error=Route+not+found", status_code=303
         )
 
-    review = ReviewRepository.get_route_review_by_jogger(route_id, email)
+    review = await ReviewRepository.get_route_review_by_jogger(route_id, email)
     action = "edit" if review else "add"
 
     return templates.TemplateResponse(
@@ -516,9 +590,9 @@ async def submit_route_review(
         )
 
     if review_id:
-        ReviewRepository.update_route_review(review_id, rating, comment)
+        await ReviewRepository.update_route_review(review_id, rating, comment)
     else:
-        ReviewRepository.create_route_review(route_id, email, rating, comment)
+        await ReviewRepository.create_route_review(route_id, email, rating, comment)
 
     return RedirectResponse(
         url=f"/user/routes/{route_id}/details?email={email}&success=Review+submitted+successfully",
@@ -536,7 +610,7 @@ async def delete_route_review(
     email: str = Query(..., description="User email address"),
 ):
     """Delete a route review."""
-    review = ReviewRepository.get_route_review_by_jogger(route_id, email)
+    review = await ReviewRepository.get_route_review_by_jogger(route_id, email)
 
     if not review or review["ReviewID"] != review_id:
         return RedirectResponse(
@@ -544,7 +618,7 @@ async def delete_route_review(
             status_code=303,
         )
 
-    ReviewRepository.delete_route_review(review_id)
+    await ReviewRepository.delete_route_review(review_id)
 
     return RedirectResponse(
         url=f"/user/routes/{route_id}/details?email={email}&success=Review+deleted+successfully",
@@ -560,11 +634,11 @@ async def list_sessions(
     error: Optional[str] = None,
 ):
     """List all jogging sessions for the user."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    sessions = JoggingSessionRepository.get_sessions_for_jogger(email)
+    sessions = await JoggingSessionRepository.get_sessions_for_jogger(email)
 
     return templates.TemplateResponse(
         "user/sessions.html",
@@ -587,15 +661,15 @@ async def add_session_form(
     event_id: Optional[int] = None,
 ):
     """Form to add a new jogging session."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    routes = RouteRepository.get_all_routes()
+    routes = await RouteRepository.get_all_routes()
 
     event = None
     if event_id:
-        event = EventRepository.get_event_by_id(event_id)
+        event = await EventRepository.get_event_by_id(event_id)
 
     return templates.TemplateResponse(
         "user/session_form.html",
@@ -621,6 +695,7 @@ async def add_session(
     distance: Optional[float] = Form(None),
     route_id: Optional[int] = Form(None),
     event_id: Optional[int] = Form(None),
+    unit: UnitOfWork = Depends(get_unit_of_work),
 ):
     # """Handle add session form submission."""
     # if end_dt <= start_dt:
@@ -629,7 +704,7 @@ async def add_session(
     #         status_code=303,
     #     )
 
-    session_id = JoggingSessionRepository.create_session(
+    session_id = await JoggingSessionRepository.create_session(
         start_dt, end_dt, distance, email, route_id
     )
 
@@ -641,13 +716,13 @@ async def add_session(
 
     if event_id:
         try:
-            JoggingSessionRepository.add_session_to_event(event_id, session_id)
+            await JoggingSessionRepository.add_session_to_event(event_id, session_id)
             return RedirectResponse(
                 url=f"/user/events/{event_id}/details?email={email}&success=Session+added+successfully",
                 status_code=303,
             )
         except Exception as e:
-            JoggingSessionRepository.delete_session(session_id)
+            await run_in_db_thread(unit.rollback)
             return RedirectResponse(
                 url=f"/user/sessions/add?email={email}&error=Error+associating+session+with+event:+{str(e)}",
                 status_code=303,
@@ -666,18 +741,18 @@ async def edit_session_form(
     email: str = Query(..., description="User email address"),
 ):
     """Form to edit an existing jogging session."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
 
-    session = JoggingSessionRepository.get_session_by_id(session_id)
+    session = await JoggingSessionRepository.get_session_by_id(session_id)
     if not session or session["JoggerEmail"] != email:
         return RedirectResponse(
             url=f"/user/sessions?email={email}&error=Session+not+found+or+not+authorized",
             status_code=303,
         )
 
-    routes = RouteRepository.get_all_routes()
+    routes = await RouteRepository.get_all_routes()
 
     return templates.TemplateResponse(
         "user/session_form.html",
@@ -704,7 +779,7 @@ async def edit_session(
     route_id: Optional[int] = Form(None),
 ):
     """Handle edit session form submission."""
-    session = JoggingSessionRepository.get_session_by_id(session_id)
+    session = await JoggingSessionRepository.get_session_by_id(session_id)
     if not session or session["JoggerEmail"] != email:
         return RedirectResponse(
             url=f"/user/sessions?email={email}&error=Session+not+found+or+not+authorized",
@@ -717,7 +792,7 @@ async def edit_session(
             status_code=303,
         )
 
-    JoggingSessionRepository.update_session(
+    await JoggingSessionRepository.update_session(
         session_id, start_dt, end_dt, distance, route_id
     )
 
@@ -734,14 +809,14 @@ async def delete_session(
     email: str = Query(..., description="User email address"),
 ):
     """Delete a jogging session."""
-    session = JoggingSessionRepository.get_session_by_id(session_id)
+    session = await JoggingSessionRepository.get_session_by_id(session_id)
     if not session or session["JoggerEmail"] != email:
         return RedirectResponse(
             url=f"/user/sessions?email={email}&error=Session+not+found+or+not+authorized",
             status_code=303,
         )
 
-    JoggingSessionRepository.delete_session(session_id)
+    await JoggingSessionRepository.delete_session(session_id)
 
     return RedirectResponse(
         url=f"/user/sessions?email={email}&success=Session+deleted+successfully",
@@ -756,10 +831,10 @@ async def get_session_report(
     email: str = Query(..., description="User email address"),
 ):
     """Generate a detailed report for a jogging session."""
-    user = JoggerRepository.get_jogger_by_email(email)
+    user = await JoggerRepository.get_jogger_by_email(email)
     if not user:
         return RedirectResponse(url="/", status_code=303)
-    session = JoggingSessionRepository.get_session_by_id(session_id)
+    session = await JoggingSessionRepository.get_session_by_id(session_id)
     if not session or session["JoggerEmail"] != email:
         return RedirectResponse(
             url=f"/user/sessions?email={email}&error=Session+not+found+or+not+authorized",
@@ -771,7 +846,7 @@ async def get_session_report(
     pace_diff = 0
     pace_diff_abs = 0
     if session["RouteID"]:
-        route = RouteRepository.get_route_by_id(session["RouteID"])
+        route = await RouteRepository.get_route_by_id(session["RouteID"])
         if route:
             route_name = route["RouteName"]
             if route.get("AvgPace"):
@@ -836,3 +911,40 @@ async def session_report_singular(
     return RedirectResponse(
         url=f"/user/sessions/{session_id}/report?email={email}", status_code=303
     )
+
+
+@router.get("/export/{dataset}")
+async def export_history(
+    dataset: str,
+    email: str = Query(..., description="User email address"),
+    format: str = Query("csv", description="csv, jsonl, parquet or arrow"),
+    unit: UnitOfWork = Depends(get_unit_of_work),
+):
+    """Download the user's sessions, registrations or reviews as a file."""
+    user = await JoggerRepository.get_jogger_by_email(email)
+    if not user:
+        return RedirectResponse(url="/", status_code=303)
+
+    try:
+        check_export("jogger", dataset, format)
+    except ValueError:
+        return RedirectResponse(
+            url=f"/user/dashboard?email={email}&error=Unknown+export", status_code=303
+        )
+    except RuntimeError:
+        return RedirectResponse(
+            url=f"/user/dashboard?email={email}&error=Export+format+not+available",
+            status_code=303,
+        )
+
+    # The download reads on a connection of its own and can take a while, so
+    # the request's connection goes back to the pool before it starts
+    await run_in_db_thread(unit.commit)
+    await run_in_db_thread(unit.close)
+
+    filename = export_filename("jogger", email, dataset, format)
+    return StreamingResponse(
+        export_rows("jogger", email, dataset, format),
+        media_type=FORMATS[format][0],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
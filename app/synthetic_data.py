@@ -0,0 +1,467 @@
+"""Deterministic synthetic data for load and scaling tests.
+
+SyntheticDataset builds a consistent set of joggers, routes, events,
+registrations, sessions and reviews for a target number of sessions, from a
+seed: the same seed and scale always give the same rows. Every other table
+is sized from the session count with SYNTHETIC_CONFIG, so one number scales
+the whole schema from 10k to 10M sessions.
+
+Sessions are streamed day by day in start order, so their IDs grow with
+time as they would with AUTO_INCREMENT, and memory does not grow with the
+session count beyond the few rows later tables are derived from. Rows can
+be written as CSV files in the data/ schema or loaded straight into an
+empty database.
+"""
+
+import csv
+import itertools
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from bulk_import import TABLES, load_rows
+
+# Synthetic data configuration
+SYNTHETIC_CONFIG = {
+    "start": datetime(2024, 6, 1),  # First day of logged sessions
+    "days": 365,  # Length of the logged period
+    "sessions_per_jogger": 20,  # Average sessions logged by each jogger
+    "joggers_per_route": 25,  # Catalogue size relative to the joggers
+    "sessions_per_event": 5000,  # Events held relative to the sessions
+    "upcoming_event_share": 0.1,  # Events after the logged period
+    "routes_per_admin": 500,
+    "events_per_organizer": 20,
+    "route_run_share": 0.7,  # Sessions run on a catalogued route
+    "untracked_distance_share": 0.01,  # Free runs logged without a distance
+    "finish_share": 0.8,  # Registered joggers who run the event
+    "route_review_share": 0.02,  # Route sessions followed by a review
+    "event_review_share": 0.25,  # Event finishers who review the event
+}
+
+FIRST_NAMES = [
+    "Andrii",
+    "Bohdan",
+    "Daryna",
+    "Iryna",
+    "Khrystyna",
+    "Maksym",
+    "Marta",
+    "Nadiia",
+    "Nataliia",
+    "Oksana",
+    "Oleh",
+    "Olena",
+    "Ostap",
+    "Roman",
+    "Solomiia",
+    "Taras",
+    "Yaryna",
+    "Yurii",
+]
+LAST_NAMES = [
+    "Bondar",
+    "Hryniv",
+    "Kovalenko",
+    "Kravets",
+    "Lysenko",
+    "Lyaskovska",
+    "Melnyk",
+    "Moroz",
+    "Savchuk",
+    "Shevchenko",
+    "Terlych",
+    "Tkachuk",
+    "Vovk",
+    "Zakharko",
+]
+PLACES = [
+    "Park",
+    "River",
+    "Castle",
+    "Forest",
+    "Lake",
+    "Stadium",
+    "Old Town",
+    "Hill",
+    "Campus",
+    "Harbour",
+]
+ROUTE_KINDS = ["Loop", "Trail", "Run", "Circuit", "Path", "Dash"]
+EVENT_KINDS = ["Spring Run", "Night Run", "Charity Run", "Cup", "Marathon"]
+EVENT_DISTANCES = [5.0, 10.0, 21.1, 42.2]
+EVENT_SIZES = [50, 100, 200, 500, 1000]
+# Start hours of training runs, repeated by how common they are
+RUN_HOURS = [6, 6, 6, 7, 7, 7, 12, 17, 17, 18, 18, 18, 19, 19]
+COMMENTS = {
+    1: ["Would not run it again.", "Badly organised."],
+    2: ["Too crowded.", "Poor surface in places."],
+    3: ["Fine for a quick run.", "Nothing special."],
+    4: ["Good but crowded in mornings.", "Nice views, a bit hilly."],
+    5: ["Perfect for training!", "Loved every kilometre."],
+}
+
+
+class SyntheticDataset:
+    """Seeded joggers, routes, events and their history at a chosen scale.
+
+    Args:
+        sessions (int): Sessions to generate, including event runs
+        seed: Seed for every random choice
+        config (dict): Overrides for SYNTHETIC_CONFIG
+    """
+
+    def __init__(self, sessions=10000, seed=1, config=None):
+        self.config = {**SYNTHETIC_CONFIG, **(config or {})}
+        self.seed = seed
+        self.sessions = sessions
+        joggers = max(10, sessions // self.config["sessions_per_jogger"])
+        self.counts = {
+            "jogger": joggers,
+            "joggingroute": max(5, joggers // self.config["joggers_per_route"]),
+            "joggingevent": max(2, sessions // self.config["sessions_per_event"]),
+        }
+        self.counts["appadmin"] = max(
+            1, self.counts["joggingroute"] // self.config["routes_per_admin"]
+        )
+        self.counts["eventorganizer"] = max(
+            1, self.counts["joggingevent"] // self.config["events_per_organizer"]
+        )
+        self._joggers = None
+        self._routes = None
+        self._events = None
+        self._event_sessions = None
+        self._route_runs = None
+
+    def _rng(self, name):
+        return random.Random(f"{self.seed}:{name}")
+
+    def _plan_joggers(self):
+        rng = self._rng("jogger")
+        joggers = []
+        for i in range(self.counts["jogger"]):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            joggers.append(
+                {
+                    "email": f"{first}.{last}{i + 1}@example.com".lower(),
+                    "name": f"{first} {last}",
+                    # Minutes per km, and how often they run relative to others
+                    "pace": min(10.0, max(3.3, rng.gauss(6.2, 0.9))),
+                    "activity": rng.lognormvariate(0, 0.8),
+                }
+            )
+        return joggers
+
+    def _plan_routes(self):
+        rng = self._rng("joggingroute")
+        # A few routes get most of the runs: popularity falls off with rank
+        ranks = list(range(1, self.counts["joggingroute"] + 1))
+        rng.shuffle(ranks)
+        routes = []
+        for i in range(self.counts["joggingroute"]):
+            distance = min(42.2, max(1.0, rng.lognormvariate(math.log(7), 0.5)))
+            routes.append(
+                {
+                    "id": i + 1,
+                    "name": f"{rng.choice(PLACES)} {rng.choice(ROUTE_KINDS)} {i + 1}",
+                    "distance": round(distance, 1),
+                    "pace": round(min(9.5, max(3.5, rng.gauss(6.0, 0.8))), 1),
+                    "quality": rng.uniform(2.5, 4.8),
+                    "popularity": ranks[i] ** -0.8,
+                    "admin": i % self.counts["appadmin"],
+                }
+            )
+        return routes
+
+    def _plan_events(self):
+        """Events, their registrants and the registrants who ran them."""
+        rng = self._rng("joggingevent")
+        start, days = self.config["start"], self.config["days"]
+        total = self.counts["joggingevent"]
+        upcoming = int(total * self.config["upcoming_event_share"])
+        events = []
+        for i in range(total):
+            if i < total - upcoming:
+                day = rng.randrange(days)
+            else:
+                day = days + rng.randrange(1, 90)
+            # Races are held on weekend mornings
+            date = start + timedelta(days=day)
+            date += timedelta(days=(5 - date.weekday()) % 7 + rng.choice([0, 1]))
+            date = date.replace(hour=rng.choice([8, 9, 10]))
+            size = rng.choice(EVENT_SIZES)
+            past = date < start + timedelta(days=days)
+            fill = rng.uniform(0.3, 1.0) if past else rng.uniform(0.1, 0.6)
+            registrants = rng.sample(
+                range(self.counts["jogger"]),
+                min(self.counts["jogger"], int(size * fill)),
+            )
+            events.append(
+                {
+                    "id": i + 1,
+                    "name": f"{rng.choice(PLACES)} {rng.choice(EVENT_KINDS)} {date.year}",
+                    "date": date,
+                    "distance": rng.choice(EVENT_DISTANCES),
+                    "size": size,
+                    "registrants": registrants,
+                    "finishers": (
+                        [
+                            j
+                            for j in registrants
+                            if rng.random() < self.config["finish_share"]
+                        ]
+                        if past
+                        else []
+                    ),
+                    "quality": rng.uniform(2.5, 4.8),
+                    "organizer": i % self.counts["eventorganizer"],
+                }
+            )
+        return events
+
+    @property
+    def joggers(self):
+        if self._joggers is None:
+            self._joggers = self._plan_joggers()
+        return self._joggers
+
+    @property
+    def routes(self):
+        if self._routes is None:
+            self._routes = self._plan_routes()
+        return self._routes
+
+    @property
+    def events(self):
+        if self._events is None:
+            self._events = self._plan_events()
+        return self._events
+
+    def _event_runs(self, rng):
+        """Sessions run at events, grouped by day of the logged period."""
+        by_day = defaultdict(list)
+        for event in self.events:
+            for j in event["finishers"]:
+                jogger = self.joggers[j]
+                start = event["date"] + timedelta(seconds=rng.randrange(0, 300))
+                # Race pace is a little quicker than training pace
+                pace = jogger["pace"] * rng.gauss(0.96, 0.04)
+                end = start + timedelta(seconds=round(event["distance"] * pace * 60))
+                day = (event["date"] - self.config["start"]).days
+                by_day[day].append(
+                    (start, end, event["distance"], jogger["email"], None, event["id"])
+                )
+        return by_day
+
+    def _free_run(self, rng, day, jogger, route):
+        start = day + timedelta(
+            hours=rng.choice(RUN_HOURS), seconds=rng.randrange(3600)
+        )
+        if route is not None:
+            distance = round(route["distance"] * rng.gauss(1, 0.02), 2)
+            pace = 0.7 * jogger["pace"] + 0.3 * route["pace"]
+        else:
+            distance = min(30.0, max(1.0, rng.lognormvariate(math.log(6), 0.45)))
+            distance = round(distance, 2)
+            pace = jogger["pace"]
+        end = start + timedelta(
+            seconds=round(distance * pace * rng.gauss(1, 0.06) * 60)
+        )
+        if route is None and rng.random() < self.config["untracked_distance_share"]:
+            distance = None
+        return (
+            start,
+            end,
+            distance,
+            jogger["email"],
+            route["id"] if route else None,
+            None,
+        )
+
+    def _sessions(self):
+        """Yield jogging rows in start order, recording event and route runs."""
+        rng = self._rng("jogging")
+        by_day = self._event_runs(rng)
+        days = self.config["days"]
+        free = max(0, self.sessions - sum(len(runs) for runs in by_day.values()))
+        # More people run at weekends; split ``free`` exactly across the days
+        weights = [
+            1.4 if (self.config["start"] + timedelta(days=d)).weekday() >= 5 else 1
+            for d in range(days)
+        ]
+        scale = free / sum(weights)
+        bounds = [round(total * scale) for total in itertools.accumulate(weights)]
+        jogger_weights = list(itertools.accumulate(j["activity"] for j in self.joggers))
+        route_weights = list(itertools.accumulate(r["popularity"] for r in self.routes))
+
+        self._event_sessions = []
+        self._route_runs = []
+        reviewed = set()
+        session_id = 0
+        for d, (low, high) in enumerate(zip([0] + bounds, bounds)):
+            day = self.config["start"] + timedelta(days=d)
+            runs = list(by_day.get(d, []))
+            joggers = rng.choices(
+                self.joggers, cum_weights=jogger_weights, k=high - low
+            )
+            routes = rng.choices(self.routes, cum_weights=route_weights, k=high - low)
+            for jogger, route in zip(joggers, routes):
+                if rng.random() >= self.config["route_run_share"]:
+                    route = None
+                runs.append(self._free_run(rng, day, jogger, route))
+            runs.sort(key=lambda run: (run[0], run[3]))
+            for start, end, distance, email, route_id, event_id in runs:
+                session_id += 1
+                if event_id is not None:
+                    self._event_sessions.append((event_id, session_id))
+                elif (
+                    route_id is not None
+                    and rng.random() < self.config["route_review_share"]
+                    and (route_id, email) not in reviewed
+                ):
+                    # A jogger reviews each route once, as the app allows
+                    reviewed.add((route_id, email))
+                    self._route_runs.append((route_id, email))
+                yield (
+                    session_id,
+                    start,
+                    end,
+                    distance,
+                    email,
+                    route_id,
+                )
+
+    def _require_sessions(self):
+        if self._event_sessions is None:
+            for _ in self._sessions():
+                pass
+
+    def _review(self, rng, review_id, quality, subject_id, email):
+        rating = min(5, max(1, round(rng.gauss(quality, 0.8))))
+        comment = rng.choice(COMMENTS[rating]) if rng.random() < 0.7 else None
+        return (review_id, rating, comment, subject_id, email)
+
+    def rows(self, table):
+        """Yield the rows of ``table`` as tuples in bulk_import.TABLES column order.
+
+        Sessions must be produced before eventsession and routereview, which
+        are derived from them; rows() runs through them first if they were not.
+        """
+        if table == "jogger":
+            for jogger in self.joggers:
+                yield (jogger["email"], jogger["name"])
+        elif table == "appadmin":
+            for i in range(self.counts["appadmin"]):
+                yield (f"admin{i + 1}@example.com",)
+        elif table == "eventorganizer":
+            for i in range(self.counts["eventorganizer"]):
+                yield (f"organizer{i + 1}@example.com", f"Running Club {i + 1}")
+        elif table == "joggingroute":
+            for route in self.routes:
+                yield (route["id"], route["name"], route["distance"], route["pace"])
+        elif table == "route_admin":
+            for route in self.routes:
+                yield (f"admin{route['admin'] + 1}@example.com", route["id"])
+        elif table == "joggingevent":
+            for event in self.events:
+                yield (event["id"], event["name"], event["date"], event["size"])
+        elif table == "event_em":
+            for event in self.events:
+                yield (f"organizer{event['organizer'] + 1}@example.com", event["id"])
+        elif table == "jogging":
+            yield from self._sessions()
+        elif table == "eventregistration":
+            rng = self._rng("eventregistration")
+            for event in self.events:
+                for j in event["registrants"]:
+                    before = timedelta(seconds=rng.randrange(3600, 60 * 86400))
+                    yield (
+                        event["id"],
+                        self.joggers[j]["email"],
+                        event["date"] - before,
+                    )
+        elif table == "eventsession":
+            self._require_sessions()
+            yield from self._event_sessions
+        elif table == "routereview":
+            self._require_sessions()
+            rng = self._rng("routereview")
+            for review_id, (route_id, email) in enumerate(self._route_runs, 1):
+                quality = self.routes[route_id - 1]["quality"]
+                yield self._review(rng, review_id, quality, route_id, email)
+        elif table == "eventreview":
+            rng = self._rng("eventreview")
+            review_id = 0
+            for event in self.events:
+                for j in event["finishers"]:
+                    if rng.random() < self.config["event_review_share"]:
+                        review_id += 1
+                        yield self._review(
+                            rng,
+                            review_id,
+                            event["quality"],
+                            event["id"],
+                            self.joggers[j]["email"],
+                        )
+        else:
+            raise ValueError(f"Unknown table: {table}")
+
+
+def write_csv(dataset, directory):
+    """Write every table of ``dataset`` to ``<table>.csv`` files, parents first.
+
+    Yields:
+        dict: The table, file, rows written and seconds taken, per table
+    """
+    os.makedirs(directory, exist_ok=True)
+    for table, _, fields in TABLES:
+        started = time.perf_counter()
+        path = os.path.join(directory, f"{table}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([column for column, _ in fields])
+            count = 0
+            for row in dataset.rows(table):
+                writer.writerow(row)
+                count += 1
+        yield {
+            "table": table,
+            "path": path,
+            "rows": count,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+
+# Tables filled by migrations and rebuilt from the generated rows
+DERIVED_TABLES = ["leaderboardentry", "ratingsummary", "eventwaitlist"]
+
+
+def clear_tables(connection):
+    """Delete every row of the app's tables, children first.
+
+    Only meant for scratch databases that are about to be regenerated.
+    """
+    cursor = connection.cursor()
+    try:
+        for table in DERIVED_TABLES + [table for table, _, _ in reversed(TABLES)]:
+            cursor.execute(f"DELETE FROM {table}")
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def load_mysql(dataset, connection, **options):
+    """Load every table of ``dataset`` into an empty database, parents first.
+
+    Args:
+        dataset (SyntheticDataset): The rows to load
+        connection: An open MySQL connection
+        **options: Passed on to bulk_import.load_rows()
+
+    Yields:
+        dict: The load report of each table
+    """
+    for table, _, fields in TABLES:
+        yield load_rows(connection, table, fields, dataset.rows(table), **options)
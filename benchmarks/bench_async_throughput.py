@@ -0,0 +1,66 @@
+"""Compare request throughput with blocking and offloaded database calls.
+
+Drives the app in-process through httpx's ASGI transport, so every request
+is served by one event loop just like a single uvicorn worker. Run it from
+the repository root against a populated database:
+
+    python benchmarks/bench_async_throughput.py --email roman.hryniv@example.com
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+import httpx
+
+import database
+from main import app
+
+
+async def run(path, requests, concurrency):
+    """Fire ``requests`` GETs at ``path`` with bounded concurrency."""
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def one():
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--email", required=True, help="Existing jogger email")
+    parser.add_argument("--path", default="/user/events?email={email}")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    path = args.path.format(email=args.email)
+    for enabled in (False, True):
+        database.ASYNC_DB_CONFIG["enabled"] = enabled
+        database.configure_pool()
+        elapsed = asyncio.run(run(path, args.requests, args.concurrency))
+        label = "offloaded" if enabled else "blocking"
+        print(
+            f"{label:>9}: {args.requests / elapsed:8.1f} req/s "
+            f"({elapsed:.2f}s for {args.requests} requests, "
+            f"concurrency {args.concurrency})"
+        )
+        print(f"           pool: {database.get_pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
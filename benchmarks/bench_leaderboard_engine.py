@@ -0,0 +1,94 @@
+"""Measure in-memory leaderboard queries for large events.
+
+Builds an EventLeaderboard with synthetic entries and times rank lookups,
+top-N reads, "around me" windows and session updates, next to ranking the
+same entries by sorting them on every lookup. Needs no database.
+
+    python benchmarks/bench_leaderboard_engine.py --participants 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+from leaderboard import EventLeaderboard
+
+
+def make_entries(count, rng):
+    return [
+        {
+            "EventID": 1,
+            "SessionID": i,
+            "JoggerEmail": f"jogger{i}@example.com",
+            "JoggerName": f"Jogger {i}",
+            "Distance": round(rng.uniform(1, 42), 1),
+            "FinishTime": rng.randrange(600, 18000),
+        }
+        for i in range(count)
+    ]
+
+
+def timed(label, operations, func):
+    """Run ``func`` ``operations`` times and print the mean latency."""
+    started = time.perf_counter()
+    for i in range(operations):
+        func(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed / operations * 1e6:>12.1f} us/op")
+
+
+def sorted_rank(entries, email):
+    """Rank a jogger the way a full scan does: sort everything, then search."""
+    ordered = sorted(entries, key=lambda e: -e["Distance"])
+    for position, entry in enumerate(ordered, 1):
+        if entry["JoggerEmail"] == email:
+            return position
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--participants", type=int, default=100000)
+    parser.add_argument("--operations", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    entries = make_entries(args.participants, rng)
+    emails = [entry["JoggerEmail"] for entry in entries]
+
+    started = time.perf_counter()
+    board = EventLeaderboard(1, entries)
+    print(f"{'build':<28} {time.perf_counter() - started:>12.3f} s")
+
+    timed(
+        "rank of jogger",
+        args.operations,
+        lambda i: board.jogger_entry(emails[rng.randrange(len(emails))]),
+    )
+    timed("top 10", args.operations, lambda i: board.top(10))
+    timed(
+        "around jogger (+/-5)",
+        args.operations,
+        lambda i: board.around(emails[rng.randrange(len(emails))], 5),
+    )
+
+    def update(i):
+        entry = dict(entries[rng.randrange(len(entries))])
+        entry["Distance"] = round(rng.uniform(1, 42), 1)
+        board.upsert(entry)
+
+    timed("session update", args.operations, update)
+    timed(
+        "rank by full sort (baseline)",
+        max(1, args.operations // 1000),
+        lambda i: sorted_rank(entries, emails[rng.randrange(len(emails))]),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Show that the organizer dashboard issues a fixed number of queries.
+
+Seeds a throwaway organizer with an increasing number of events, renders
+/organizer/dashboard for each size and reports the number of SQL
+statements and the render time. Needs a database with the app schema; the
+seeded rows are removed afterwards.
+
+    python benchmarks/bench_organizer_dashboard.py --sizes 10 100 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+from fastapi.testclient import TestClient
+
+from database import get_db_cursor
+from main import app
+from query_log import capture_queries
+
+ORGANIZER = "bench_organizer@example.com"
+
+
+def seed(count):
+    """Create ``count`` events owned by the benchmark organizer."""
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "INSERT IGNORE INTO eventorganizer (Email, Name) VALUES (%s, %s)",
+            (ORGANIZER, "Benchmark Organizer"),
+        )
+        for i in range(count):
+            cursor.execute(
+                "INSERT INTO joggingevent (EventName, EventDate, MaxParticipants) VALUES (%s, %s, %s)",
+                (f"Bench Event {i}", datetime.now() + timedelta(days=i), 100),
+            )
+            cursor.execute(
+                "INSERT INTO event_em (OrganizerEmail, EventID) VALUES (%s, %s)",
+                (ORGANIZER, cursor.lastrowid),
+            )
+
+
+def cleanup():
+    """Remove everything created by seed()."""
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "DELETE je FROM joggingevent je JOIN event_em em ON je.EventID = em.EventID "
+            "WHERE em.OrganizerEmail = %s",
+            (ORGANIZER,),
+        )
+        cursor.execute("DELETE FROM event_em WHERE OrganizerEmail = %s", (ORGANIZER,))
+        cursor.execute("DELETE FROM eventorganizer WHERE Email = %s", (ORGANIZER,))
+
+
+def count_queries(client):
+    """Render the dashboard once and return (queries, seconds)."""
+    with capture_queries() as captured:
+        started = time.perf_counter()
+        response = client.get(f"/organizer/dashboard?email={ORGANIZER}")
+        elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return captured.count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    seeded = 0
+    try:
+        for size in sorted(args.sizes):
+            seed(size - seeded)
+            seeded = size
+            queries, elapsed = count_queries(client)
+            print(f"{size:>6} events: {queries} queries, {elapsed * 1000:.1f} ms")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
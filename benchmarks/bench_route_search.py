@@ -0,0 +1,117 @@
+"""Measure route search over a large route catalogue.
+
+Builds a RouteSearchIndex over synthetic route names and times prefix,
+substring, typo-tolerant and range-filtered searches, next to a plain scan
+that checks every name. Needs no database.
+
+    python benchmarks/bench_route_search.py --routes 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+from route_search import RouteSearchIndex
+
+SYLLABLES = [
+    "ar",
+    "bel",
+    "cor",
+    "dun",
+    "el",
+    "fen",
+    "gar",
+    "hol",
+    "is",
+    "kel",
+    "lor",
+    "mar",
+    "nor",
+    "ost",
+    "pen",
+    "quin",
+    "ros",
+    "sel",
+    "tor",
+    "ul",
+    "val",
+    "wen",
+    "yar",
+    "zen",
+]
+KINDS = ["Loop", "Trail", "Run", "Dash", "Circuit", "Path", "Sprint", "Way"]
+
+
+def make_name(rng):
+    words = [
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+        for _ in range(rng.randint(1, 2))
+    ]
+    return " ".join(words + [rng.choice(KINDS)])
+
+
+def make_routes(count, rng):
+    return [
+        {
+            "RouteID": i,
+            "RouteName": make_name(rng),
+            "Distance": round(rng.uniform(1, 42), 1),
+            "AvgPace": round(rng.uniform(3, 9), 1),
+        }
+        for i in range(count)
+    ]
+
+
+def timed(label, operations, func):
+    """Run ``func`` ``operations`` times and print the mean latency."""
+    started = time.perf_counter()
+    for i in range(operations):
+        func(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed / operations * 1e3:>12.2f} ms/op")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes", type=int, default=100000)
+    parser.add_argument("--operations", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    routes = make_routes(args.routes, rng)
+
+    started = time.perf_counter()
+    index = RouteSearchIndex(routes)
+    print(f"{'build':<28} {time.perf_counter() - started:>12.3f} s")
+
+    names = [route["RouteName"] for route in routes]
+
+    def typo(name):
+        position = rng.randrange(len(name))
+        return name[:position] + name[position + 1 :]
+
+    timed("prefix", args.operations, lambda i: index.search(names[i][:6]))
+    timed("substring", args.operations, lambda i: index.search(names[i][3:9]))
+    timed("typo", args.operations, lambda i: index.search(typo(names[i])))
+    timed(
+        "name and ranges",
+        args.operations,
+        lambda i: index.search(names[i][:4], distance=(5, 10), pace=(4, 5)),
+    )
+    timed("ranges only", args.operations, lambda i: index.search(distance=(10, 11)))
+    timed(
+        "substring by scan (baseline)",
+        args.operations,
+        lambda i: [
+            r for r in routes if names[i][3:9].lower() in r["RouteName"].lower()
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
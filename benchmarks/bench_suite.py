@@ -0,0 +1,730 @@
+"""Benchmark every repository method and page against generated datasets.
+
+For each dataset size the suite times every public *Repository method and
+every GET page of the routers, recording p50/p95 latency, the number of
+queries and the rows they returned. Each call runs in a transaction that is
+rolled back, so write methods can be measured without changing the data,
+and caches are emptied before each call unless --warm is given.
+
+Results are written as JSON so that runs can be compared, and checked
+against benchmarks/budgets.json; the exit status is 1 when a budget is
+exceeded or a method or page has no benchmark. --load replaces the
+contents of the configured database with synthetic data of each size, so
+only use it on a scratch database.
+
+    python benchmarks/bench_suite.py --sizes 10000 100000 --load
+    python benchmarks/bench_suite.py --compare benchmarks/results/<earlier>.json
+    python benchmarks/bench_suite.py --load --update-budgets
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import math
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+import httpx
+import mysql.connector
+from fastapi.routing import APIRoute
+
+from cache import clear_caches
+from database import DB_CONFIG, unit_of_work
+from main import app
+from models import repositories
+from models.repositories import (
+    BaseRepository,
+    EventRepository,
+    JoggerRepository,
+    JoggingSessionRepository,
+    LeaderboardRepository,
+    RegistrationRepository,
+    ReviewRepository,
+    RouteRepository,
+    WaitlistRepository,
+)
+from query_log import capture_queries
+from routers import admin_router, organizer_router, user_router
+from synthetic_data import SyntheticDataset, clear_tables, load_mysql
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUDGETS = os.path.join(HERE, "budgets.json")
+RESULTS = os.path.join(HERE, "results")
+
+# Rows the cases run against, looked up in order; later queries may use
+# earlier values. Each query returns its value as ``value``.
+FIXTURES = {
+    "event": """
+        SELECT EventID AS value FROM eventsession
+        GROUP BY EventID ORDER BY COUNT(*) DESC, EventID LIMIT 1
+    """,
+    "jogger": """
+        SELECT jog.JoggerEmail AS value
+        FROM eventsession es JOIN jogging jog ON es.SessionID = jog.SessionID
+        WHERE es.EventID = %(event)s ORDER BY jog.SessionID LIMIT 1
+    """,
+    "session": """
+        SELECT es.SessionID AS value
+        FROM eventsession es JOIN jogging jog ON es.SessionID = jog.SessionID
+        WHERE es.EventID = %(event)s AND jog.JoggerEmail = %(jogger)s LIMIT 1
+    """,
+    "outsider": """
+        SELECT Email AS value FROM jogger WHERE Email NOT IN (
+            SELECT JoggerEmail FROM eventregistration WHERE EventID = %(event)s
+        ) ORDER BY Email LIMIT 1
+    """,
+    "route": """
+        SELECT RouteID AS value FROM routereview
+        GROUP BY RouteID ORDER BY COUNT(*) DESC, RouteID LIMIT 1
+    """,
+    "route_prefix": """
+        SELECT LEFT(RouteName, 4) AS value FROM joggingroute WHERE RouteID = %(route)s
+    """,
+    "route_review": """
+        SELECT MIN(ReviewID) AS value FROM routereview WHERE RouteID = %(route)s
+    """,
+    "event_review": """
+        SELECT MIN(ReviewID) AS value FROM eventreview WHERE EventID = %(event)s
+    """,
+    "organizer": """
+        SELECT OrganizerEmail AS value FROM event_em WHERE EventID = %(event)s LIMIT 1
+    """,
+    "admin": "SELECT MIN(AdminEmail) AS value FROM appadmin",
+}
+
+NEW_EVENT = ("Benchmark Event", datetime(2030, 6, 1, 9), 100)
+NEW_ROUTE = ("Benchmark Route", 5.0, 6.0)
+NEW_SESSION = (datetime(2025, 5, 1, 7), datetime(2025, 5, 1, 7, 30), 5.0)
+
+# One case per public repository method. Writes are rolled back afterwards;
+# deletes first create the row they delete.
+REPOSITORY_CASES = {
+    "JoggerRepository.get_jogger_by_email": lambda f: (
+        JoggerRepository.get_jogger_by_email(f.jogger)
+    ),
+    "JoggerRepository.create_jogger": lambda f: JoggerRepository.create_jogger(
+        "benchmark.jogger@example.com", "Benchmark Jogger"
+    ),
+    "JoggerRepository.update_jogger": lambda f: JoggerRepository.update_jogger(
+        f.jogger, "Benchmark Jogger"
+    ),
+    "JoggerRepository.check_if_admin": lambda f: JoggerRepository.check_if_admin(
+        f.admin
+    ),
+    "JoggerRepository.check_if_organizer": lambda f: (
+        JoggerRepository.check_if_organizer(f.organizer)
+    ),
+    "JoggerRepository.get_organizer_name": lambda f: (
+        JoggerRepository.get_organizer_name(f.organizer)
+    ),
+    "JoggerRepository.grant_admin": lambda f: JoggerRepository.grant_admin(f.outsider),
+    "JoggerRepository.revoke_admin": lambda f: (
+        JoggerRepository.grant_admin(f.outsider),
+        JoggerRepository.revoke_admin(f.outsider),
+    ),
+    "JoggerRepository.grant_organizer": lambda f: JoggerRepository.grant_organizer(
+        f.outsider, "Benchmark Club"
+    ),
+    "JoggerRepository.revoke_organizer": lambda f: (
+        JoggerRepository.grant_organizer(f.outsider, "Benchmark Club"),
+        JoggerRepository.revoke_organizer(f.outsider),
+    ),
+    "RouteRepository.get_all_routes": lambda f: RouteRepository.get_all_routes(),
+    "RouteRepository.search_routes": lambda f: RouteRepository.search_routes(
+        f.route_prefix, min_distance=3, max_distance=15
+    ),
+    "RouteRepository.get_catalogue_stats": lambda f: (
+        RouteRepository.get_catalogue_stats()
+    ),
+    "RouteRepository.refresh_catalogue": lambda f: RouteRepository.refresh_catalogue(),
+    "RouteRepository.get_routes_with_review_status": lambda f: (
+        RouteRepository.get_routes_with_review_status(f.jogger)
+    ),
+    "RouteRepository.get_route_by_id": lambda f: RouteRepository.get_route_by_id(
+        f.route
+    ),
+    "RouteRepository.create_route": lambda f: RouteRepository.create_route(*NEW_ROUTE),
+    "RouteRepository.update_route": lambda f: RouteRepository.update_route(
+        f.route, *NEW_ROUTE
+    ),
+    "RouteRepository.delete_route": lambda f: RouteRepository.delete_route(
+        RouteRepository.create_route(*NEW_ROUTE)
+    ),
+    "EventRepository.get_all_events": lambda f: EventRepository.get_all_events(),
+    "EventRepository.get_events_with_registration_status": lambda f: (
+        EventRepository.get_events_with_registration_status(f.jogger)
+    ),
+    "EventRepository.get_event_by_id": lambda f: EventRepository.get_event_by_id(
+        f.event
+    ),
+    "EventRepository.create_event": lambda f: EventRepository.create_event(*NEW_EVENT),
+    "EventRepository.update_event": lambda f: EventRepository.update_event(
+        f.event, *NEW_EVENT
+    ),
+    "EventRepository.delete_event": lambda f: EventRepository.delete_event(
+        EventRepository.create_event(*NEW_EVENT)
+    ),
+    "EventRepository.get_organizer_event_summaries": lambda f: (
+        EventRepository.get_organizer_event_summaries(f.organizer)
+    ),
+    "EventRepository.assign_organizer": lambda f: EventRepository.assign_organizer(
+        EventRepository.create_event(*NEW_EVENT), f.organizer
+    ),
+    "EventRepository.get_events_by_organizer": lambda f: (
+        EventRepository.get_events_by_organizer(f.organizer)
+    ),
+    "RegistrationRepository.get_event_registrations_page": lambda f: (
+        RegistrationRepository.get_event_registrations_page(f.event)
+    ),
+    "RegistrationRepository.reserve_seat": lambda f: (
+        RegistrationRepository.reserve_seat(f.event, f.outsider, allow_past=True)
+    ),
+    "RegistrationRepository.register_for_event": lambda f: (
+        RegistrationRepository.register_for_event(f.event, f.outsider)
+    ),
+    "RegistrationRepository.unregister_from_event": lambda f: (
+        RegistrationRepository.unregister_from_event(f.event, f.jogger)
+    ),
+    "RegistrationRepository.get_event_registrations": lambda f: (
+        RegistrationRepository.get_event_registrations(f.event)
+    ),
+    "RegistrationRepository.get_registered_events_for_jogger": lambda f: (
+        RegistrationRepository.get_registered_events_for_jogger(f.jogger)
+    ),
+    "RegistrationRepository.check_registration": lambda f: (
+        RegistrationRepository.check_registration(f.event, f.jogger)
+    ),
+    "RegistrationRepository.count_registrations": lambda f: (
+        RegistrationRepository.count_registrations(f.event)
+    ),
+    "RegistrationRepository.reconcile_participant_counts": lambda f: (
+        RegistrationRepository.reconcile_participant_counts()
+    ),
+    "RegistrationRepository.get_registration": lambda f: (
+        RegistrationRepository.get_registration(f.event, f.jogger)
+    ),
+    "WaitlistRepository.join_waitlist": lambda f: WaitlistRepository.join_waitlist(
+        f.event, f.outsider
+    ),
+    "WaitlistRepository.leave_waitlist": lambda f: WaitlistRepository.leave_waitlist(
+        f.event, f.outsider
+    ),
+    "WaitlistRepository.get_position": lambda f: WaitlistRepository.get_position(
+        f.event, f.outsider
+    ),
+    "WaitlistRepository.get_waitlist": lambda f: WaitlistRepository.get_waitlist(
+        f.event
+    ),
+    "WaitlistRepository.promote": lambda f: WaitlistRepository.promote(f.event),
+    "JoggingSessionRepository.get_sessions_for_jogger": lambda f: (
+        JoggingSessionRepository.get_sessions_for_jogger(f.jogger)
+    ),
+    "JoggingSessionRepository.get_session_by_id": lambda f: (
+        JoggingSessionRepository.get_session_by_id(f.session)
+    ),
+    "JoggingSessionRepository.create_session": lambda f: (
+        JoggingSessionRepository.create_session(*NEW_SESSION, f.jogger, f.route)
+    ),
+    "JoggingSessionRepository.update_session": lambda f: (
+        JoggingSessionRepository.update_session(f.session, *NEW_SESSION)
+    ),
+    "JoggingSessionRepository.delete_session": lambda f: (
+        JoggingSessionRepository.delete_session(
+            JoggingSessionRepository.create_session(*NEW_SESSION, f.jogger)
+        )
+    ),
+    "JoggingSessionRepository.add_session_to_event": lambda f: (
+        JoggingSessionRepository.add_session_to_event(
+            f.event, JoggingSessionRepository.create_session(*NEW_SESSION, f.jogger)
+        )
+    ),
+    "JoggingSessionRepository.remove_session_from_event": lambda f: (
+        JoggingSessionRepository.remove_session_from_event(f.event, f.session)
+    ),
+    "ReviewRepository.get_route_reviews_page": lambda f: (
+        ReviewRepository.get_route_reviews_page(f.route)
+    ),
+    "ReviewRepository.get_event_reviews_page": lambda f: (
+        ReviewRepository.get_event_reviews_page(f.event)
+    ),
+    "ReviewRepository.get_route_reviews": lambda f: (
+        ReviewRepository.get_route_reviews(f.route)
+    ),
+    "ReviewRepository.get_event_reviews": lambda f: (
+        ReviewRepository.get_event_reviews(f.event)
+    ),
+    "ReviewRepository.get_route_review_by_jogger": lambda f: (
+        ReviewRepository.get_route_review_by_jogger(f.route, f.jogger)
+    ),
+    "ReviewRepository.get_event_review_by_jogger": lambda f: (
+        ReviewRepository.get_event_review_by_jogger(f.event, f.jogger)
+    ),
+    "ReviewRepository.create_route_review": lambda f: (
+        ReviewRepository.create_route_review(f.route, f.outsider, 4, "Benchmark")
+    ),
+    "ReviewRepository.create_event_review": lambda f: (
+        ReviewRepository.create_event_review(f.event, f.outsider, 4, "Benchmark")
+    ),
+    "ReviewRepository.update_route_review": lambda f: (
+        ReviewRepository.update_route_review(f.route_review, 3, "Benchmark")
+    ),
+    "ReviewRepository.update_event_review": lambda f: (
+        ReviewRepository.update_event_review(f.event_review, 3, "Benchmark")
+    ),
+    "ReviewRepository.delete_route_review": lambda f: (
+        ReviewRepository.delete_route_review(f.route_review)
+    ),
+    "ReviewRepository.delete_event_review": lambda f: (
+        ReviewRepository.delete_event_review(f.event_review)
+    ),
+    "ReviewRepository.get_route_average_rating": lambda f: (
+        ReviewRepository.get_route_average_rating(f.route)
+    ),
+    "ReviewRepository.get_event_average_rating": lambda f: (
+        ReviewRepository.get_event_average_rating(f.event)
+    ),
+    "ReviewRepository.rebuild_rating_summaries": lambda f: (
+        ReviewRepository.rebuild_rating_summaries()
+    ),
+    "LeaderboardRepository.get_leaderboard_for_event": lambda f: (
+        LeaderboardRepository.get_leaderboard_for_event(f.event)
+    ),
+    "LeaderboardRepository.add_entry": lambda f: LeaderboardRepository.add_entry(
+        f.event, f.session
+    ),
+    "LeaderboardRepository.refresh_session": lambda f: (
+        LeaderboardRepository.refresh_session(f.session)
+    ),
+    "LeaderboardRepository.get_leaderboard_page": lambda f: (
+        LeaderboardRepository.get_leaderboard_page(f.event)
+    ),
+    "LeaderboardRepository.count_entries": lambda f: (
+        LeaderboardRepository.count_entries(f.event)
+    ),
+    "LeaderboardRepository.get_top_entries": lambda f: (
+        LeaderboardRepository.get_top_entries(f.event)
+    ),
+    "LeaderboardRepository.get_jogger_rank": lambda f: (
+        LeaderboardRepository.get_jogger_rank(f.event, f.jogger)
+    ),
+    "LeaderboardRepository.get_entries_around": lambda f: (
+        LeaderboardRepository.get_entries_around(f.event, f.jogger)
+    ),
+    "LeaderboardRepository.rebuild": lambda f: LeaderboardRepository.rebuild(f.event),
+    "LeaderboardRepository.check_consistency": lambda f: (
+        LeaderboardRepository.check_consistency(f.event)
+    ),
+}
+
+# One request per GET route, keyed by the route's path. Actions are measured
+# up to their redirect, with their writes rolled back.
+PAGES = {
+    "/admin/dashboard": "/admin/dashboard?email={admin}",
+    "/admin/routes/add": "/admin/routes/add?email={admin}",
+    "/admin/routes/{route_id}/edit": "/admin/routes/{route}/edit?email={admin}",
+    "/admin/routes/{route_id}/delete": "/admin/routes/{route}/delete?email={admin}",
+    "/admin/routes/search": "/admin/routes/search?email={admin}&query={route_prefix}",
+    "/admin/db/pool": "/admin/db/pool?email={admin}",
+    "/admin/cache": "/admin/cache?email={admin}",
+    "/admin/routes/catalogue": "/admin/routes/catalogue?email={admin}",
+    "/user/dashboard": "/user/dashboard?email={jogger}",
+    "/user/events": "/user/events?email={jogger}",
+    "/user/events/{event_id}/register": "/user/events/{event}/register?email={outsider}",
+    "/user/events/{event_id}/unregister": "/user/events/{event}/unregister?email={jogger}",
+    "/user/events/{event_id}/waitlist/join": (
+        "/user/events/{event}/waitlist/join?email={outsider}"
+    ),
+    "/user/events/{event_id}/waitlist/leave": (
+        "/user/events/{event}/waitlist/leave?email={outsider}"
+    ),
+    "/user/events/{event_id}/details": "/user/events/{event}/details?email={jogger}",
+    "/user/events/{event_id}/registration-certificate": (
+        "/user/events/{event}/registration-certificate?email={jogger}"
+    ),
+    "/user/events/{event_id}/review": "/user/events/{event}/review?email={jogger}",
+    "/user/events/{event_id}/reviews/{review_id}/delete": (
+        "/user/events/{event}/reviews/{event_review}/delete?email={jogger}"
+    ),
+    "/user/routes": "/user/routes?email={jogger}",
+    "/user/routes/{route_id}/details": "/user/routes/{route}/details?email={jogger}",
+    "/user/routes/{route_id}/review": "/user/routes/{route}/review?email={jogger}",
+    "/user/routes/{route_id}/reviews/{review_id}/delete": (
+        "/user/routes/{route}/reviews/{route_review}/delete?email={jogger}"
+    ),
+    "/user/sessions": "/user/sessions?email={jogger}",
+    "/user/sessions/add": "/user/sessions/add?email={jogger}",
+    "/user/sessions/{session_id}/edit": "/user/sessions/{session}/edit?email={jogger}",
+    "/user/sessions/{session_id}/delete": (
+        "/user/sessions/{session}/delete?email={jogger}"
+    ),
+    "/user/sessions/{session_id}/report": (
+        "/user/sessions/{session}/report?email={jogger}"
+    ),
+    "/user/session/{session_id}/report": "/user/session/{session}/report?email={jogger}",
+    "/user/export/{dataset}": "/user/export/sessions?email={jogger}",
+    "/organizer/dashboard": "/organizer/dashboard?email={organizer}",
+    "/organizer/events/add": "/organizer/events/add?email={organizer}",
+    "/organizer/events/{event_id}/edit": (
+        "/organizer/events/{event}/edit?email={organizer}"
+    ),
+    "/organizer/events/{event_id}/delete": (
+        "/organizer/events/{event}/delete?email={organizer}"
+    ),
+    "/organizer/events/{event_id}/registrations": (
+        "/organizer/events/{event}/registrations?email={organizer}"
+    ),
+    "/organizer/events/{event_id}/registrations/add": (
+        "/organizer/events/{event}/registrations/add?email={organizer}"
+    ),
+    "/organizer/events/{event_id}/registrations/{jogger_email}/delete": (
+        "/organizer/events/{event}/registrations/{jogger}/delete?email={organizer}"
+    ),
+    "/organizer/events/{event_id}/export/{dataset}": (
+        "/organizer/events/{event}/export/registrations?email={organizer}"
+    ),
+}
+
+# GET routes left out, with the reason
+SKIPPED_PAGES = {
+    "/user/events/{event_id}/certificate": "handler uses repositories that no longer exist",
+}
+
+
+class MissingFixture(Exception):
+    """The dataset has no row a case needs, e.g. no event reviews."""
+
+
+class _Discard(Exception):
+    """Raised to roll back the writes of a measured call."""
+
+
+class Fixtures(dict):
+    """Fixture values, read as attributes or format fields."""
+
+    def __getitem__(self, name):
+        value = self.get(name)
+        if value is None:
+            raise MissingFixture(name)
+        return value
+
+    __getattr__ = __getitem__
+
+
+def load_fixtures():
+    fixtures = Fixtures()
+    for name, query in FIXTURES.items():
+        needed = re.findall(r"%\((\w+)\)s", query)
+        if any(fixtures.get(key) is None for key in needed):
+            fixtures[name] = None
+            continue
+        rows = BaseRepository.execute_query(
+            query, {key: fixtures[key] for key in needed}
+        )
+        fixtures[name] = rows[0]["value"] if rows else None
+    return fixtures
+
+
+def uncovered():
+    """Return the public repository methods and GET routes without a benchmark."""
+    missing = []
+    for name, cls in vars(repositories).items():
+        if (
+            not inspect.isclass(cls)
+            or not name.endswith("Repository")
+            or cls is BaseRepository
+            or cls.__module__ != repositories.__name__
+        ):
+            continue
+        for method, value in vars(cls).items():
+            if method.startswith("_") or not isinstance(value, staticmethod):
+                continue
+            if f"{name}.{method}" not in REPOSITORY_CASES:
+                missing.append(f"{name}.{method}")
+    for prefix, module in (
+        ("/admin", admin_router),
+        ("/user", user_router),
+        ("/organizer", organizer_router),
+    ):
+        for route in module.router.routes:
+            if isinstance(route, APIRoute) and "GET" in route.methods:
+                path = prefix + route.path
+                if path not in PAGES and path not in SKIPPED_PAGES:
+                    missing.append(f"GET {path}")
+    return missing
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+async def measure(call, iterations, warm):
+    """Time ``call`` and count its queries over ``iterations`` runs."""
+    timings, db_times, queries, rows, statuses = [], [], [], [], set()
+    for i in range(iterations + 1):
+        if not warm:
+            clear_caches()
+        with capture_queries() as captured:
+            started = time.perf_counter()
+            status = await call()
+            elapsed = time.perf_counter() - started
+        if i == 0:
+            continue  # warm-up: first imports, template compilation
+        timings.append(elapsed * 1000)
+        db_times.append(captured.duration * 1000)
+        queries.append(captured.count)
+        rows.append(captured.rows)
+        if status is not None:
+            statuses.add(status)
+    result = {
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "db_p50_ms": round(percentile(db_times, 50), 3),
+        "queries": max(queries),
+        "rows": max(rows),
+    }
+    if statuses:
+        result["status"] = sorted(statuses)
+    return result
+
+
+def _repository_call(case, fixtures):
+    async def call():
+        try:
+            with unit_of_work():
+                case(fixtures)
+                raise _Discard
+        except _Discard:
+            pass
+
+    return call
+
+
+def _page_call(client, path):
+    async def call():
+        # The request joins this unit, so its writes are rolled back too
+        try:
+            with unit_of_work():
+                response = await client.get(path)
+                raise _Discard
+        except _Discard:
+            return response.status_code
+
+    return call
+
+
+async def run_cases(fixtures, iterations, warm, only=None):
+    """Measure every case, returning {"repositories": {...}, "pages": {...}}."""
+    results = {"repositories": {}, "pages": {}}
+    for name, case in REPOSITORY_CASES.items():
+        if only and only not in name:
+            continue
+        results["repositories"][name] = await _measured(
+            _repository_call(case, fixtures), iterations, warm
+        )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for name, template in PAGES.items():
+            if only and only not in name:
+                continue
+            try:
+                path = template.format_map(fixtures)
+            except MissingFixture as e:
+                results["pages"][name] = {"skipped": f"no {e}"}
+                continue
+            results["pages"][name] = await _measured(
+                _page_call(client, path), iterations, warm
+            )
+    return results
+
+
+async def _measured(call, iterations, warm):
+    try:
+        return await measure(call, iterations, warm)
+    except MissingFixture as e:
+        return {"skipped": f"no {e}"}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def load_dataset(sessions, seed, method):
+    """Replace the database contents with a synthetic dataset."""
+    connection = mysql.connector.connect(
+        **DB_CONFIG, allow_local_infile=method == "infile"
+    )
+    connection.autocommit = False
+    try:
+        clear_tables(connection)
+        for _ in load_mysql(
+            SyntheticDataset(sessions, seed), connection, method=method
+        ):
+            pass
+    finally:
+        connection.close()
+    RegistrationRepository.reconcile_participant_counts(repair=True)
+    LeaderboardRepository.rebuild()
+    ReviewRepository.rebuild_rating_summaries()
+    clear_caches()
+
+
+def _limit(budget, size):
+    """A budget value is a number, or a {size: number} map."""
+    if isinstance(budget, dict):
+        return budget.get(size)
+    return budget
+
+
+def check_budgets(results, budgets):
+    """Return a message for each measurement over its budget, or that failed."""
+    violations = []
+    for size, kinds in results["sizes"].items():
+        for kind, cases in kinds.items():
+            default = budgets.get("default", {}).get(kind, {})
+            for name, metrics in cases.items():
+                if "error" in metrics:
+                    violations.append(f"{name} @ {size}: {metrics['error']}")
+                    continue
+                if any(status >= 500 for status in metrics.get("status", [])):
+                    violations.append(f"{name} @ {size}: status {metrics['status']}")
+                limits = {**default, **budgets.get("cases", {}).get(name, {})}
+                for metric, budget in limits.items():
+                    limit = _limit(budget, size)
+                    if limit is not None and metric in metrics:
+                        if metrics[metric] > limit:
+                            violations.append(
+                                f"{name} @ {size}: {metric} {metrics[metric]} > {limit}"
+                            )
+    return violations
+
+
+def recorded_budgets(results, budgets, headroom):
+    """Budgets that pass ``results``: exact query counts, padded latencies."""
+    cases = {}
+    for size, kinds in results["sizes"].items():
+        for cases_of_kind in kinds.values():
+            for name, metrics in cases_of_kind.items():
+                if "queries" not in metrics:
+                    continue
+                entry = cases.setdefault(name, {"queries": 0, "p95_ms": {}})
+                entry["queries"] = max(entry["queries"], metrics["queries"])
+                entry["p95_ms"][size] = math.ceil(metrics["p95_ms"] * headroom + 1)
+    return {**budgets, "cases": dict(sorted(cases.items()))}
+
+
+def compare(results, earlier):
+    """Print the cases whose p95 moved by over 10% or whose query count changed."""
+    for size, kinds in results["sizes"].items():
+        for kind, cases in kinds.items():
+            before = earlier.get("sizes", {}).get(size, {}).get(kind, {})
+            for name, metrics in cases.items():
+                old = before.get(name)
+                if not old or "p95_ms" not in old or "p95_ms" not in metrics:
+                    continue
+                change = (metrics["p95_ms"] - old["p95_ms"]) / (old["p95_ms"] or 1)
+                if abs(change) > 0.1 or metrics["queries"] != old["queries"]:
+                    print(
+                        f"{name} @ {size}: p95 {old['p95_ms']} -> "
+                        f"{metrics['p95_ms']} ms ({change:+.0%}), "
+                        f"queries {old['queries']} -> {metrics['queries']}"
+                    )
+
+
+def print_results(size, results):
+    print(f"\n{size} sessions")
+    print(f"{'case':<72} {'p50 ms':>9} {'p95 ms':>9} {'queries':>7} {'rows':>8}")
+    for cases in results.values():
+        for name, metrics in cases.items():
+            if "p95_ms" not in metrics:
+                print(f"{name:<72} {metrics.get('skipped') or metrics.get('error')}")
+                continue
+            print(
+                f"{name:<72} {metrics['p50_ms']:>9.2f} {metrics['p95_ms']:>9.2f} "
+                f"{metrics['queries']:>7} {metrics['rows']:>8}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument(
+        "--load",
+        action="store_true",
+        help="Replace the database contents with a synthetic dataset of each size",
+    )
+    parser.add_argument("--seed", default="1")
+    parser.add_argument("--method", choices=["insert", "infile"], default="insert")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warm", action="store_true", help="Keep caches between runs")
+    parser.add_argument("--only", help="Only run cases whose name contains this")
+    parser.add_argument("--budgets", default=BUDGETS)
+    parser.add_argument("--output", help="Results file (default: results/<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare with")
+    parser.add_argument(
+        "--update-budgets",
+        action="store_true",
+        help="Rewrite the budgets so that this run passes, with latency headroom",
+    )
+    parser.add_argument("--headroom", type=float, default=1.5)
+    args = parser.parse_args()
+
+    missing = uncovered()
+    for name in missing:
+        print(f"No benchmark for {name}")
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "iterations": args.iterations,
+        "caches": "warm" if args.warm else "cold",
+        "sizes": {},
+    }
+    for size in args.sizes if args.load else ["current"]:
+        if args.load:
+            started = time.perf_counter()
+            load_dataset(size, args.seed, args.method)
+            print(f"Loaded {size} sessions in {time.perf_counter() - started:.1f} s")
+        fixtures = load_fixtures()
+        measured = asyncio.run(
+            run_cases(fixtures, args.iterations, args.warm, args.only)
+        )
+        results["sizes"][str(size)] = measured
+        print_results(size, measured)
+
+    output = args.output or os.path.join(
+        RESULTS, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    with open(args.budgets) as f:
+        budgets = json.load(f)
+    if args.update_budgets:
+        budgets = recorded_budgets(results, budgets, args.headroom)
+        with open(args.budgets, "w") as f:
+            json.dump(budgets, f, indent=2)
+            f.write("\n")
+        print(f"Budgets written to {args.budgets}")
+
+    violations = check_budgets(results, budgets)
+    for violation in violations:
+        print(f"Over budget: {violation}")
+    return 1 if violations or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
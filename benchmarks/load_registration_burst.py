@@ -0,0 +1,102 @@
+"""Fire concurrent registrations at one event and check nobody is overbooked.
+
+Creates a throwaway event with ``--capacity`` seats and ``--joggers`` joggers,
+has every jogger call RegistrationRepository.reserve_seat at the same time
+from ``--concurrency`` threads (each with its own pooled connection), then
+verifies the registrations table and the event counter against capacity.
+The seeded rows are removed afterwards.
+
+    python benchmarks/load_registration_burst.py --capacity 500 --joggers 2000
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+import database
+from database import get_db_cursor, unit_of_work
+from models.repositories import RegistrationRepository, RegistrationResult
+
+EMAIL = "bench_burst_{}@example.com"
+
+
+def seed(capacity, joggers):
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "INSERT INTO joggingevent (EventName, EventDate, MaxParticipants) VALUES (%s, %s, %s)",
+            ("Bench Burst Event", datetime.now() + timedelta(days=1), capacity),
+        )
+        event_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT IGNORE INTO jogger (Email, Name) VALUES (%s, %s)",
+            [(EMAIL.format(i), f"Burst Jogger {i}") for i in range(joggers)],
+        )
+    return event_id
+
+
+def cleanup(event_id):
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute("DELETE FROM eventregistration WHERE EventID = %s", (event_id,))
+        cursor.execute("DELETE FROM joggingevent WHERE EventID = %s", (event_id,))
+        cursor.execute("DELETE FROM jogger WHERE Email LIKE %s", (EMAIL.format("%"),))
+
+
+def register(event_id, email, start):
+    start.wait()
+    with unit_of_work():
+        return RegistrationRepository.reserve_seat(event_id, email)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--capacity", type=int, default=500)
+    parser.add_argument("--joggers", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    database.configure_pool(pool_size=args.concurrency, max_overflow=0)
+    event_id = seed(args.capacity, args.joggers)
+    try:
+        start = threading.Event()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = [
+                executor.submit(register, event_id, EMAIL.format(i), start)
+                for i in range(args.joggers)
+            ]
+            started = time.perf_counter()
+            start.set()
+            results = Counter(future.result() for future in futures)
+            elapsed = time.perf_counter() - started
+
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) AS count FROM eventregistration WHERE EventID = %s",
+                (event_id,),
+            )
+            rows = cursor.fetchone()["count"]
+        counter = RegistrationRepository.count_registrations(event_id)
+
+        print(f"{args.joggers} attempts in {elapsed:.2f}s")
+        print(f"{args.joggers / elapsed:.0f} registration attempts/sec")
+        print(f"results: {dict(results)}")
+        print(f"registrations: {rows}, counter: {counter}, capacity: {args.capacity}")
+        print(f"pool: {database.get_pool_stats()}")
+
+        expected = min(args.capacity, args.joggers)
+        assert results[RegistrationResult.REGISTERED] == expected, "wrong seat count"
+        assert rows == expected, "registrations table overbooked or short"
+        assert counter == rows, "participant counter drifted"
+        print("OK: no overbooking")
+    finally:
+        cleanup(event_id)
+
+
+if __name__ == "__main__":
+    main()
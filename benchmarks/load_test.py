@@ -0,0 +1,322 @@
+"""Drive the app with concurrent scripted user journeys and report per route.
+
+Each virtual user repeatedly picks a journey by weight and walks it like a
+browser would, without following redirects, so every request is timed on
+its own:
+
+    runner     login, dashboard, events, register for one, add a session
+    browser    login, events, event details, routes, route details
+    organizer  login as --organizer, dashboard, an event's registrations
+
+Users start evenly over --ramp seconds and stop after --duration seconds.
+The report gives throughput, error rate (responses of 400 and over, and
+failed connections) and a latency histogram per route; --json saves it.
+Virtual users log in as loadtest<n>@example.com, which creates them as
+joggers on first use, so run it against a staging database. Point it at a
+running server, or use --in-process to serve the app from this process:
+
+    python benchmarks/load_test.py --base-url http://localhost:8000 --users 50
+    python benchmarks/load_test.py --in-process --users 20 --duration 30 \\
+        --mix runner=3,browser=6,organizer=1 --organizer organizer.ucu@example.com
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+
+EMAIL = "loadtest{}@example.com"
+EVENT_LINK = re.compile(r"/user/events/(\d+)/(?:register|details)")
+ROUTE_LINK = re.compile(r"/user/routes/(\d+)/details")
+ORGANIZER_EVENT_LINK = re.compile(r"/organizer/events/(\d+)/registrations")
+NUMBER_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+# Latency histogram bucket upper bounds, in milliseconds
+BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, math.inf]
+
+
+class JourneyFailed(Exception):
+    """A request in a journey could not be made at all."""
+
+
+class Stats:
+    """Latencies and errors per route, keyed like ``GET /user/events/{id}``."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.statuses = defaultdict(Counter)
+        self.journeys = Counter()
+        self.failed_journeys = Counter()
+
+    def record(self, route, seconds, status):
+        self.latencies[route].append(seconds * 1000)
+        self.statuses[route][status] += 1
+        if status is None or status >= 400:
+            self.errors[route] += 1
+
+
+def route_key(method, path):
+    """Group requests by route: drop the query string and number IDs."""
+    return f"{method} {NUMBER_SEGMENT.sub('/{id}', path.split('?')[0])}"
+
+
+class User:
+    """One virtual user: an email, a client and the pause between steps."""
+
+    def __init__(self, client, email, stats, think, rng):
+        self.client = client
+        self.email = email
+        self.stats = stats
+        self.think = think
+        self.rng = rng
+
+    async def request(self, method, path, data=None):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, data=data)
+        except httpx.HTTPError as e:
+            self.stats.record(
+                route_key(method, path), time.perf_counter() - started, None
+            )
+            raise JourneyFailed(f"{method} {path}: {e}") from e
+        self.stats.record(
+            route_key(method, path), time.perf_counter() - started, response.status_code
+        )
+        if self.think:
+            await asyncio.sleep(self.rng.uniform(0, self.think))
+        return response
+
+    async def get(self, path):
+        return await self.request("GET", path)
+
+    async def post(self, path, data):
+        return await self.request("POST", path, data)
+
+    def pick(self, pattern, response):
+        """Return a random ID linked from ``response``, or None."""
+        found = pattern.findall(response.text)
+        return self.rng.choice(found) if found else None
+
+
+async def runner(user, organizer):
+    """Log in, browse events, register for one and log a session."""
+    email = user.email
+    await user.post("/login", {"email": email, "role": "user"})
+    await user.get(f"/user/dashboard?email={email}")
+    events = await user.get(f"/user/events?email={email}")
+    event_id = user.pick(EVENT_LINK, events)
+    if event_id:
+        await user.get(f"/user/events/{event_id}/register?email={email}")
+    await user.get(f"/user/sessions/add?email={email}")
+    start = datetime.now().replace(microsecond=0) - timedelta(hours=1)
+    distance = round(user.rng.uniform(3, 15), 2)
+    await user.post(
+        "/user/sessions/add",
+        {
+            "email": email,
+            "start_dt": start.isoformat(),
+            "end_dt": (start + timedelta(minutes=distance * 6)).isoformat(),
+            "distance": str(distance),
+        },
+    )
+
+
+async def browser(user, organizer):
+    """Log in and read event and route pages."""
+    email = user.email
+    await user.post("/login", {"email": email, "role": "user"})
+    events = await user.get(f"/user/events?email={email}")
+    event_id = user.pick(EVENT_LINK, events)
+    if event_id:
+        await user.get(f"/user/events/{event_id}/details?email={email}")
+    routes = await user.get(f"/user/routes?email={email}")
+    route_id = user.pick(ROUTE_LINK, routes)
+    if route_id:
+        await user.get(f"/user/routes/{route_id}/details?email={email}")
+
+
+async def organizer_journey(user, organizer):
+    """Log in as the organizer and review an event's registrations."""
+    await user.post("/login", {"email": organizer, "role": "organizer"})
+    dashboard = await user.get(f"/organizer/dashboard?email={organizer}")
+    event_id = user.pick(ORGANIZER_EVENT_LINK, dashboard)
+    if event_id:
+        await user.get(f"/organizer/events/{event_id}/registrations?email={organizer}")
+
+
+JOURNEYS = {"runner": runner, "browser": browser, "organizer": organizer_journey}
+
+
+async def virtual_user(client, number, mix, args, stats, deadline):
+    rng = random.Random(f"{args.seed}:{number}")
+    await asyncio.sleep(args.ramp * number / args.users)
+    user = User(client, EMAIL.format(number), stats, args.think, rng)
+    names, weights = zip(*mix.items())
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        stats.journeys[name] += 1
+        try:
+            await JOURNEYS[name](user, args.organizer)
+        except JourneyFailed:
+            stats.failed_journeys[name] += 1
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def histogram(latencies):
+    counts = Counter(
+        next(bound for bound in BUCKETS if latency <= bound) for latency in latencies
+    )
+    return {
+        ("inf" if bound == math.inf else str(bound)): counts[bound] for bound in BUCKETS
+    }
+
+
+def report(stats, elapsed):
+    """Summarize ``stats`` over a run of ``elapsed`` seconds."""
+    routes = {}
+    for route in sorted(stats.latencies):
+        latencies = stats.latencies[route]
+        routes[route] = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / elapsed, 2),
+            "errors": stats.errors[route],
+            "error_rate": round(stats.errors[route] / len(latencies), 4),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2),
+            "statuses": {
+                str(status): count for status, count in stats.statuses[route].items()
+            },
+            "histogram_ms": histogram(latencies),
+        }
+    requests = sum(route["requests"] for route in routes.values())
+    errors = sum(route["errors"] for route in routes.values())
+    return {
+        "seconds": round(elapsed, 2),
+        "requests": requests,
+        "rps": round(requests / elapsed, 2) if elapsed else 0,
+        "error_rate": round(errors / requests, 4) if requests else 0,
+        "journeys": dict(stats.journeys),
+        "failed_journeys": dict(stats.failed_journeys),
+        "routes": routes,
+    }
+
+
+def print_report(summary):
+    print(
+        f"{summary['requests']} requests in {summary['seconds']} s: "
+        f"{summary['rps']} req/s, {summary['error_rate']:.2%} errors"
+    )
+    print(f"journeys: {summary['journeys']}, failed: {summary['failed_journeys']}")
+    print(
+        f"\n{'route':<52} {'req':>7} {'req/s':>8} {'err%':>6} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    )
+    for route, row in summary["routes"].items():
+        print(
+            f"{route:<52} {row['requests']:>7} {row['rps']:>8.1f} "
+            f"{row['error_rate']:>6.1%} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+        )
+    print("\nlatency histogram (requests per bucket, upper bound in ms)")
+    print(f"{'route':<52} " + " ".join(f"{b:>6}" for b in histogram([])))
+    for route, row in summary["routes"].items():
+        counts = " ".join(f"{count:>6}" for count in row["histogram_ms"].values())
+        print(f"{route:<52} {counts}")
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in JOURNEYS:
+            raise argparse.ArgumentTypeError(f"unknown journey: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def make_client(args):
+    if args.in_process:
+        sys.path.append(
+            os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+        )
+        from main import app
+
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        return httpx.AsyncClient(transport=transport, base_url="http://load-test")
+    limits = httpx.Limits(
+        max_connections=args.users, max_keepalive_connections=args.users
+    )
+    return httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    )
+
+
+async def run(args):
+    mix = dict(args.mix)
+    if not args.organizer:
+        mix.pop("organizer", None)
+    stats = Stats()
+    async with make_client(args) as client:
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(
+                virtual_user(client, number, mix, args, stats, deadline)
+                for number in range(args.users)
+            )
+        )
+        elapsed = time.monotonic() - started
+    return report(stats, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--in-process", action="store_true", help="Serve the app in this process"
+    )
+    parser.add_argument("--users", type=int, default=20, help="Concurrent users")
+    parser.add_argument("--ramp", type=float, default=10, help="Seconds to start all")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    parser.add_argument(
+        "--think", type=float, default=0, help="Max random pause between steps (s)"
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=parse_mix("runner=3,browser=6,organizer=1"),
+        help="Journey weights, e.g. runner=3,browser=6,organizer=1",
+    )
+    parser.add_argument("--organizer", help="Organizer email for organizer journeys")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", default="1")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary["error_rate"] > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from test_connection_pool import FakeConnection
+import database
+from cache import clear_caches
+from database import unit_of_work
+from models import async_repositories, repositories
+
+
+class AsyncRepositoriesTest(unittest.TestCase):
+    """Test cases for the awaitable repository layer."""
+
+    def setUp(self):
+        """Point the process-wide pool at fake connections."""
+        self.opened = []
+
+        def connect(**connect_args):
+            connection = FakeConnection()
+            self.opened.append(connection)
+            return connection
+
+        database.configure_pool(connect=connect)
+        clear_caches()
+
+    def tearDown(self):
+        database.ASYNC_DB_CONFIG["enabled"] = True
+        database.ASYNC_DB_CONFIG["max_workers"] = None
+        database.configure_pool()
+
+    def test_every_public_method_is_mirrored(self):
+        """Test that each repository method has an awaitable twin."""
+        mirrored = async_repositories.EventRepository
+        self.assertIs(mirrored.sync, repositories.EventRepository)
+        for name in ("get_all_events", "get_event_by_id", "execute_query"):
+            self.assertTrue(asyncio.iscoroutinefunction(getattr(mirrored, name)))
+
+    def test_query_runs_off_the_event_loop(self):
+        """Test that queries are executed in a worker thread."""
+        threads = []
+        original = FakeConnection.cursor
+
+        def cursor(connection, dictionary=False):
+            threads.append(threading.current_thread())
+            return original(connection, dictionary)
+
+        FakeConnection.cursor = cursor
+        try:
+            result = asyncio.run(
+                async_repositories.JoggerRepository.check_if_admin("a@example.com")
+            )
+        finally:
+            FakeConnection.cursor = original
+
+        self.assertFalse(result)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_disabled_config_runs_inline(self):
+        """Test that the blocking path is used when offloading is disabled."""
+        database.ASYNC_DB_CONFIG["enabled"] = False
+
+        asyncio.run(async_repositories.RouteRepository.get_all_routes())
+
+        self.assertEqual(self.opened[0].statements, ["SELECT * FROM joggingroute"])
+
+    def test_calls_join_the_callers_unit_of_work(self):
+        """Test that offloaded calls reuse the unit of work of the caller."""
+
+        async def handler():
+            await async_repositories.EventRepository.get_all_events()
+            await async_repositories.RouteRepository.get_routes_with_review_status(
+                "runner@example.com"
+            )
+
+        with unit_of_work():
+            asyncio.run(handler())
+
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(len(self.opened[0].statements), 2)
+
+    def test_waiting_for_the_pool_does_not_block_connection_holders(self):
+        """Test that a request waiting for a connection leaves query slots free."""
+        database.configure_pool(
+            connect=lambda **_: FakeConnection(),
+            pool_size=1,
+            max_overflow=0,
+            checkout_timeout=2,
+        )
+        database.ASYNC_DB_CONFIG["max_workers"] = 1
+
+        async def request(started):
+            with unit_of_work():
+                await async_repositories.EventRepository.execute_query("SELECT 1")
+                started.set()
+                await asyncio.sleep(0.05)
+                await async_repositories.EventRepository.execute_query("SELECT 2")
+
+        async def main():
+            first, second = asyncio.Event(), asyncio.Event()
+            holder = asyncio.create_task(request(first))
+            await first.wait()
+            await asyncio.wait_for(asyncio.gather(holder, request(second)), timeout=1)
+
+        asyncio.run(main())
+
+        self.assertEqual(database.get_pool_stats()["timeouts"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
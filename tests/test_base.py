@@ -6,7 +6,8 @@ import mysql.connector
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
 
-from database import get_db_connection, get_db_cursor, DB_CONFIG
+from cache import clear_caches
+from database import get_db_connection, get_db_cursor, unit_of_work, DB_CONFIG
 from models.repositories import (
     JoggerRepository,
     RouteRepository,
@@ -32,6 +33,8 @@ class BaseJoggingTest(unittest.TestCase):
         self.test_organizer_name = "Test Organizer"
         self.test_admin_email = "test_admin@example.com"
 
+        # Cached rows from earlier tests were rolled back with their connection
+        clear_caches()
         self._clean_test_data()
         self._create_test_data()
 
@@ -112,6 +115,10 @@ class BaseJoggingTest(unittest.TestCase):
                 (self.test_admin_email,),
             )
 
+    def _repository_scope(self):
+        """Run repository calls on the test connection so they are rolled back."""
+        return unit_of_work(connection=self.connection)
+
     def _check_table_state(self, table_name, where_clause=None, params=None):
         """Get the current state of a table with optional filtering."""
         query = f"SELECT * FROM {table_name}"
@@ -0,0 +1,153 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from test_connection_pool import FakeConnection, FakeCursor
+from bulk_import import import_directory, import_table
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+
+
+class RecordingCursor(FakeCursor):
+    """Cursor that also records the rows of each executemany() batch."""
+
+    def executemany(self, query, rows):
+        self.connection.statements.append(query)
+        self.connection.batches.append(list(rows))
+
+    def execute(self, query, params=()):
+        super().execute(query, params)
+        if "LOAD DATA" in query:
+            with open(params[0], encoding="utf-8") as f:
+                self.connection.spooled.append(f.read())
+
+
+class RecordingConnection(FakeConnection):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.spooled = []
+
+    def cursor(self, dictionary=False):
+        return RecordingCursor(self)
+
+
+class BulkImportTest(unittest.TestCase):
+    """Test cases for the CSV bulk importer."""
+
+    def setUp(self):
+        self.connection = RecordingConnection()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, table, rows):
+        path = os.path.join(self.directory.name, f"{table}.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+        return path
+
+    def test_seed_files_load_in_dependency_order(self):
+        """Test that every seed file validates and parents are loaded first."""
+        reports = list(import_directory(self.connection, DATA_DIR))
+
+        tables = [report["table"] for report in reports]
+        self.assertLess(tables.index("jogger"), tables.index("jogging"))
+        self.assertLess(tables.index("joggingroute"), tables.index("routereview"))
+        self.assertLess(tables.index("joggingevent"), tables.index("eventsession"))
+        self.assertEqual([r["rejected"] for r in reports if r["rejected"]], [])
+        for report in reports:
+            with open(report["path"], encoding="utf-8-sig") as f:
+                data_lines = sum(1 for line in f if line.strip()) - 1
+            self.assertEqual(report["loaded"], data_lines, report["table"])
+
+    def test_misspelt_route_id_header_is_accepted(self):
+        """Test that the RoyteID header of joggingroute.csv maps to RouteID."""
+        path = os.path.join(DATA_DIR, "joggingroute.csv")
+
+        import_table(self.connection, "joggingroute", path)
+
+        self.assertIn(
+            "(RouteID, RouteName, Distance, AvgPace)", self.connection.statements[0]
+        )
+        self.assertEqual(self.connection.batches[0][0], (1, "Park 5K", 5.0, 5.5))
+
+    def test_invalid_rows_are_rejected_and_batches_committed(self):
+        """Test that bad rows are reported by line while good rows are batched."""
+        path = self._write(
+            "routereview",
+            [
+                [" ReviewID", "Rating", "Comment", "RouteID", "JoggerEmail", "Extra"],
+                ["1", "5", "Great", "1", "a@example.com", "x"],
+                ["2", "7", "Too high", "1", "b@example.com", ""],
+                ["3", "4", "", "2", "not-an-email", ""],
+                ["", "", "", "", "", ""],
+                ["4", "3", "Fine", "2", "c@example.com", ""],
+                ["5", "2", 'Said "meh"', "3", "d@example.com", ""],
+            ],
+        )
+
+        report = import_table(self.connection, "routereview", path, batch_size=2)
+
+        self.assertEqual((report["loaded"], report["rejected"]), (3, 2))
+        self.assertTrue(report["errors"][0].startswith("line 3: rating"))
+        self.assertTrue(report["errors"][1].startswith("line 4: jogger_email"))
+        self.assertEqual([len(batch) for batch in self.connection.batches], [2, 1])
+        self.assertEqual(self.connection.commits, 2)
+        self.assertEqual(
+            self.connection.batches[1][0], (5, 2, 'Said "meh"', 3, "d@example.com")
+        )
+
+    def test_missing_required_column_is_an_error(self):
+        """Test that a file without a required column is refused up front."""
+        path = self._write("jogger", [["Email"], ["a@example.com"]])
+
+        with self.assertRaises(ValueError):
+            import_table(self.connection, "jogger", path)
+        self.assertEqual(self.connection.statements, [])
+
+    def test_optional_columns_missing_from_file_use_defaults(self):
+        """Test that absent optional columns are left out of the INSERT."""
+        path = self._write(
+            "eventregistration",
+            [["EventID", "JoggerEmail"], ["1", "a@example.com"]],
+        )
+
+        import_table(self.connection, "eventregistration", path)
+
+        self.assertIn("(EventID, JoggerEmail)", self.connection.statements[0])
+
+    def test_infile_spools_validated_rows(self):
+        """Test the LOAD DATA path quotes strings and writes NULLs bare."""
+        path = self._write(
+            "jogging",
+            [
+                ["SessionID", "StartDT", "EndDT", "Distance", "JoggerEmail", "RouteID"],
+                [
+                    "1",
+                    "2025-03-10 07:30:00",
+                    "2025-03-10 08:15:00",
+                    "",
+                    "a@example.com",
+                    "",
+                ],
+                ["2", "bad date", "2025-03-10 08:15:00", "5", "a@example.com", "1"],
+            ],
+        )
+
+        report = import_table(self.connection, "jogging", path, method="infile")
+
+        self.assertEqual((report["loaded"], report["rejected"]), (1, 1))
+        self.assertEqual(
+            self.connection.spooled[0],
+            '1,"2025-03-10 07:30:00","2025-03-10 08:15:00",NULL,"a@example.com",NULL\n',
+        )
+        self.assertEqual(self.connection.commits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
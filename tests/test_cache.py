@@ -0,0 +1,428 @@
+import threading
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from test_connection_pool import FakeConnection
+import database
+from cache import (
+    MISSING,
+    SharedCache,
+    TTLCache,
+    VersionedSnapshot,
+    clear_caches,
+    configure_caches,
+)
+from database import unit_of_work
+from models.repositories import (
+    BaseRepository,
+    EventRepository,
+    JoggerRepository,
+    ReviewRepository,
+    RouteRepository,
+    jogger_cache,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTest(unittest.TestCase):
+    """Test cases for the in-process TTL cache."""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that reading an entry protects it from eviction."""
+        cache = TTLCache("test", maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries older than the TTL count as misses."""
+        clock = FakeClock()
+        cache = TTLCache("test", ttl=10, clock=clock)
+        cache.set("a", None)
+
+        clock.now = 9
+        self.assertIsNone(cache.get("a"))
+        clock.now = 11
+        self.assertIs(cache.get("a"), MISSING)
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["expirations"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_get_or_load_remembers_empty_results(self):
+        """Test that a lookup that found nothing is not repeated."""
+        cache = TTLCache("test")
+        loads = []
+
+        for _ in range(3):
+            cache.get_or_load("missing", lambda: loads.append(1))
+
+        self.assertEqual(len(loads), 1)
+
+    def test_load_racing_a_delete_is_not_stored(self):
+        """Test that a value read before an invalidation is not cached after it."""
+        cache = TTLCache("test")
+
+        def load():
+            cache.delete("key")
+            return "stale"
+
+        self.assertEqual(cache.get_or_load("key", load), "stale")
+        self.assertIs(cache.get("key"), MISSING)
+
+
+class VersionedSnapshotTest(unittest.TestCase):
+    """Test cases for versioned in-memory table snapshots."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.table = [{"RouteID": 1}]
+        self.loads = 0
+
+        def load():
+            self.loads += 1
+            return list(self.table)
+
+        self.snapshot = VersionedSnapshot("test", load, max_age=30, clock=self.clock)
+
+    def test_rows_are_loaded_once_per_version(self):
+        """Test that reads are served from memory until the version moves."""
+        self.snapshot.rows()
+        self.snapshot.rows()
+        self.table.append({"RouteID": 2})
+
+        self.assertEqual(self.snapshot.bump(), 1)
+        self.assertEqual(len(self.snapshot.rows()), 2)
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(self.snapshot.stats()["hits"], 1)
+
+    def test_rows_older_than_max_age_are_reloaded(self):
+        """Test that a snapshot is reloaded even without a bump after max_age."""
+        self.snapshot.rows()
+        self.clock.now = 31
+
+        self.snapshot.rows()
+
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(self.snapshot.version, 0)
+
+    def test_load_racing_a_bump_is_not_kept(self):
+        """Test that rows read before a bump are not served as the new version."""
+
+        def load():
+            self.loads += 1
+            if self.loads == 1:
+                self.snapshot.bump()
+            return list(self.table)
+
+        self.snapshot._load = load
+        self.snapshot.rows()
+        self.snapshot.rows()
+
+        self.assertEqual(self.loads, 2)
+
+    def test_refresh_loads_immediately(self):
+        """Test that a forced refresh bumps the version and reloads."""
+        self.snapshot.rows()
+
+        version = self.snapshot.refresh()
+
+        self.assertEqual(version, 1)
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(self.snapshot.stats()["size"], 1)
+
+    def test_rows_are_read_only_and_found_by_key(self):
+        """Test that rows are shared without copies and indexed by their key."""
+        self.table.append({"RouteID": 2})
+        snapshot = VersionedSnapshot("test", lambda: list(self.table), key="RouteID")
+
+        self.assertEqual(snapshot.get(2), {"RouteID": 2})
+        self.assertIsNone(snapshot.get(3))
+        with self.assertRaises(TypeError):
+            snapshot.rows()[0]["RouteID"] = 3
+
+    def test_bumps_reach_other_workers_through_the_shared_backend(self):
+        """Test that a bump by one worker is seen by the next read of another."""
+        configure_caches("shared", client=FakeSharedStore())
+        try:
+            other = VersionedSnapshot("test", list, max_age=30, clock=self.clock)
+            self.snapshot.rows()
+            other.bump()
+            self.snapshot.rows()
+        finally:
+            configure_caches("local")
+
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(self.snapshot.version, 1)
+
+    def test_shared_version_replaces_the_age_limit(self):
+        """Test that rows are kept past max_age while the version is shared."""
+        store = FakeSharedStore()
+        configure_caches("shared", client=store)
+        try:
+            self.snapshot.rows()
+            self.clock.now = 31
+            self.snapshot.rows()
+            self.assertEqual(self.loads, 1)
+
+            store.down = True
+            self.snapshot.rows()
+        finally:
+            configure_caches("local")
+
+        self.assertEqual(self.loads, 2)
+
+
+class FakeSharedStore:
+    """In-process stand-in for a Redis-compatible server."""
+
+    def __init__(self):
+        self.values = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("cache server unavailable")
+
+    def get(self, key):
+        self._check()
+        return self.values.get(key)
+
+    def mget(self, keys):
+        self._check()
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self._check()
+        self.values[key] = value
+
+    def delete(self, *keys):
+        self._check()
+        for key in keys:
+            self.values.pop(key, None)
+
+    def incr(self, key):
+        self._check()
+        self.values[key] = int(self.values.get(key) or 0) + 1
+        return self.values[key]
+
+    def expire(self, key, seconds):
+        self._check()
+
+
+class SharedCacheTest(unittest.TestCase):
+    """Test cases for the cache shared between workers."""
+
+    def setUp(self):
+        self.store = FakeSharedStore()
+        self.worker_a = SharedCache("test", self.store, prefix="t")
+        self.worker_b = SharedCache("test", self.store, prefix="t")
+
+    def test_values_are_shared_between_workers(self):
+        """Test that a value loaded by one worker is a hit for another."""
+        self.worker_a.get_or_load("route", lambda: {"RouteID": 1})
+
+        self.assertEqual(self.worker_b.get("route"), {"RouteID": 1})
+        self.assertEqual(self.worker_b.stats()["hits"], 1)
+
+    def test_invalidation_reaches_every_worker(self):
+        """Test that deletes and clears by one worker are seen by the others."""
+        self.worker_a.set("a", 1)
+        self.worker_a.set("b", 2)
+
+        self.worker_b.delete("a")
+        self.assertIs(self.worker_a.get("a"), MISSING)
+
+        self.worker_b.clear()
+        self.assertIs(self.worker_a.get("b"), MISSING)
+
+    def test_load_racing_a_clear_is_not_stored_as_current(self):
+        """Test that a value read before an invalidation is treated as stale."""
+
+        def load():
+            self.worker_b.clear()
+            return "stale"
+
+        self.assertEqual(self.worker_a.get_or_load("key", load), "stale")
+        self.assertIs(self.worker_a.get("key"), MISSING)
+
+    def test_load_racing_a_delete_is_not_stored_as_current(self):
+        """Test that another worker's delete during a load outdates the value."""
+
+        def load():
+            self.worker_b.delete("key")
+            return "stale"
+
+        self.assertEqual(self.worker_a.get_or_load("key", load), "stale")
+        self.assertIs(self.worker_a.get("key"), MISSING)
+        self.assertEqual(self.worker_a.get_or_load("key", lambda: "fresh"), "fresh")
+        self.assertEqual(self.worker_b.get("key"), "fresh")
+
+    def test_server_errors_fall_back_to_loading(self):
+        """Test that an unreachable server degrades to uncached reads."""
+        self.store.down = True
+
+        value = self.worker_a.get_or_load("key", lambda: "from database")
+        self.worker_a.delete("key")
+
+        self.assertEqual(value, "from database")
+        self.assertEqual(self.worker_a.stats()["errors"], 2)
+
+    def test_repository_caches_switch_to_shared_backend(self):
+        """Test that configure_caches moves existing caches onto the shared store."""
+        configure_caches("shared", client=self.store)
+        try:
+            jogger_cache.set(("admin", "boss@example.com"), True)
+            self.assertEqual(jogger_cache.stats()["backend"], "shared")
+            self.assertTrue(
+                any(key.startswith("jogging:jogger:") for key in self.store.values)
+            )
+        finally:
+            configure_caches("local")
+
+
+class JoggerCacheTest(unittest.TestCase):
+    """Test cases for cached jogger lookups and role checks."""
+
+    def setUp(self):
+        """Point the process-wide pool at fake connections."""
+        self.opened = []
+
+        def connect(**connect_args):
+            connection = FakeConnection()
+            self.opened.append(connection)
+            return connection
+
+        database.configure_pool(connect=connect)
+        clear_caches()
+
+    def tearDown(self):
+        database.configure_pool()
+        clear_caches()
+
+    def _statements(self):
+        return [s for c in self.opened for s in c.statements if "SELECT" in s]
+
+    def test_repeated_role_checks_hit_the_cache(self):
+        """Test that lookups after the first are served from memory."""
+        for _ in range(3):
+            JoggerRepository.get_jogger_by_email("runner@example.com")
+            JoggerRepository.check_if_admin("runner@example.com")
+            JoggerRepository.check_if_organizer("runner@example.com")
+
+        self.assertEqual(len(self._statements()), 3)
+        self.assertEqual(jogger_cache.stats()["hits"], 6)
+
+    def test_writes_invalidate_cached_records(self):
+        """Test that creating a jogger forgets the cached empty lookup."""
+        JoggerRepository.get_jogger_by_email("runner@example.com")
+
+        with unit_of_work():
+            JoggerRepository.create_jogger("runner@example.com", "Runner")
+            JoggerRepository.get_jogger_by_email("runner@example.com")
+        JoggerRepository.grant_organizer("runner@example.com", "Runner")
+        JoggerRepository.get_jogger_by_email("runner@example.com")
+
+        lookups = [s for s in self._statements() if "FROM jogger" in s]
+        self.assertEqual(len(lookups), 3)
+
+    def test_reads_after_a_write_are_not_cached(self):
+        """Test that a lookup that may see uncommitted writes is not shared."""
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                JoggerRepository.create_jogger("runner@example.com", "Runner")
+                JoggerRepository.get_jogger_by_email("runner@example.com")
+                raise RuntimeError("rolled back")
+        JoggerRepository.get_jogger_by_email("runner@example.com")
+
+        lookups = [s for s in self._statements() if "FROM jogger" in s]
+        self.assertEqual(len(lookups), 2)
+
+    def test_route_pages_read_the_catalogue(self):
+        """Test that route lookups share one load until a route is written."""
+        RouteRepository.get_all_routes()
+        RouteRepository.get_route_by_id(1)
+        version = RouteRepository.get_catalogue_stats()["version"]
+
+        RouteRepository.update_route(1, "Riverside", 5.0)
+        RouteRepository.get_all_routes()
+
+        lookups = [s for s in self._statements() if "FROM joggingroute" in s]
+        self.assertEqual(len(lookups), 2)
+        self.assertGreater(RouteRepository.get_catalogue_stats()["version"], version)
+
+    def test_catalogue_is_loaded_outside_the_unit_of_work(self):
+        """Test that the shared catalogue never reads a unit's open transaction."""
+        with unit_of_work() as unit:
+            BaseRepository.execute_query("SELECT 1")
+            RouteRepository.get_all_routes()
+            statements = unit.connection.statements
+
+        self.assertEqual(statements, ["SELECT 1"])
+        self.assertEqual(len(self.opened), 2)
+
+    def test_misses_are_not_loaded_from_an_old_snapshot(self):
+        """Test that a unit that has already read loads misses elsewhere."""
+
+        def other_request():
+            JoggerRepository.update_jogger("runner@example.com", "Renamed")
+
+        with unit_of_work() as unit:
+            # The unit's snapshot starts here, before the other request commits
+            BaseRepository.execute_query("SELECT 1")
+            thread = threading.Thread(target=other_request)
+            thread.start()
+            thread.join()
+            JoggerRepository.get_jogger_by_email("runner@example.com")
+            statements = unit.connection.statements
+
+        self.assertEqual(statements, ["SELECT 1"])
+        self.assertIn(
+            "SELECT * FROM jogger WHERE Email = %s", self.opened[1].statements
+        )
+
+    def test_shared_misses_are_loaded_outside_the_unit_of_work(self):
+        """Test that event and rating values published to every worker are fresh."""
+        configure_caches("shared", client=FakeSharedStore())
+        try:
+            with unit_of_work() as unit:
+                BaseRepository.execute_query("SELECT 1")
+                EventRepository.get_event_by_id(1)
+                ReviewRepository.get_route_average_rating(1)
+                statements = unit.connection.statements
+        finally:
+            configure_caches("local")
+
+        self.assertEqual(statements, ["SELECT 1"])
+        self.assertEqual(len(self._statements()), 3)
+
+    def test_rolled_back_route_writes_move_the_catalogue_on(self):
+        """Test that rows loaded during a rolled back write are not kept."""
+        version = RouteRepository.get_catalogue_stats()["version"]
+
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                RouteRepository.update_route(1, "Riverside", 5.0)
+                raise RuntimeError("rolled back")
+
+        self.assertEqual(RouteRepository.get_catalogue_stats()["version"], version + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+import unittest
+import threading
+import time
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+from mysql.connector.errors import PoolError
+from database import ConnectionPool
+
+
+class FakeCursor:
+    """Cursor that records statements on its connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        self.connection.statements.append(query)
+        self.connection.in_transaction = True
+        self.rowcount = 1
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return {"id": 1}
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Minimal stand-in for a MySQL connection."""
+
+    def __init__(self):
+        self.connected = True
+        self.in_transaction = False
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.pings = 0
+
+    def is_connected(self):
+        self.pings += 1
+        return self.connected
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.in_transaction = False
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.connected = False
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    """Test cases for the connection pool."""
+
+    def _pool(self, **kwargs):
+        self.opened = []
+
+        def connect(**connect_args):
+            connection = FakeConnection()
+            self.opened.append(connection)
+            return connection
+
+        options = {"pool_size": 2, "max_overflow": 1, "checkout_timeout": 0.2}
+        options.update(kwargs)
+        return ConnectionPool({}, connect=connect, **options)
+
+    def test_connection_is_reused(self):
+        """Test that a returned connection is handed out again."""
+        pool = self._pool()
+
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_overflow_connections_are_closed_on_return(self):
+        """Test that connections beyond pool_size are not kept idle."""
+        pool = self._pool()
+
+        connections = [pool.acquire() for _ in range(3)]
+        for connection in connections:
+            pool.release(connection)
+
+        stats = pool.stats()
+        self.assertEqual(stats["idle"], 2)
+        self.assertEqual(stats["open"], 2)
+        self.assertEqual(stats["in_use"], 0)
+        self.assertFalse(connections[-1].connected)
+
+    def test_checkout_times_out_when_exhausted(self):
+        """Test that waiting for a connection gives up after checkout_timeout."""
+        pool = self._pool()
+        held = [pool.acquire() for _ in range(3)]
+
+        with self.assertRaises(PoolError):
+            pool.acquire()
+
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        for connection in held:
+            pool.release(connection)
+
+    def test_waiter_gets_released_connection(self):
+        """Test that a blocked checkout is served once a connection is returned."""
+        pool = self._pool(checkout_timeout=2)
+        held = [pool.acquire() for _ in range(3)]
+
+        releaser = threading.Timer(0.05, pool.release, args=(held[0],))
+        releaser.start()
+        connection = pool.acquire()
+        releaser.join()
+
+        self.assertIs(connection, held[0])
+        self.assertGreater(pool.stats()["max_wait_ms"], 0)
+
+    def test_dead_connection_is_replaced_on_checkout(self):
+        """Test that pre_ping replaces connections that dropped while idle."""
+        pool = self._pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.connected = False
+
+        replacement = pool.acquire()
+
+        self.assertIsNot(replacement, connection)
+        self.assertEqual(pool.stats()["open"], 1)
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+    def test_idle_timeout_recycles_connection(self):
+        """Test that connections idle for too long are closed on checkout."""
+        pool = self._pool(idle_timeout=0.01)
+        connection = pool.acquire()
+        pool.release(connection)
+        time.sleep(0.02)
+
+        replacement = pool.acquire()
+
+        self.assertIsNot(replacement, connection)
+        self.assertFalse(connection.connected)
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        """Test that a connection is returned to the pool in a clean state."""
+        pool = self._pool()
+        connection = pool.acquire()
+        connection.in_transaction = True
+
+        pool.release(connection)
+
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertEqual(pool.stats()["checkouts"], 1)
+
+    def test_release_does_not_ping(self):
+        """Test that only checkouts check the connection is alive."""
+        pool = self._pool()
+        connection = pool.acquire()
+        pings = connection.pings
+
+        pool.release(connection)
+
+        self.assertEqual(connection.pings, pings)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_discarded_connection_is_closed(self):
+        """Test that a connection released with discard=True is not reused."""
+        pool = self._pool()
+        connection = pool.acquire()
+
+        pool.release(connection, discard=True)
+
+        self.assertFalse(connection.connected)
+        self.assertEqual(pool.stats()["open"], 0)
+        self.assertIsNot(pool.acquire(), connection)
+
+    def test_connection_released_after_close_is_closed(self):
+        """Test that a connection borrowed when the pool closed does not leak."""
+        pool = self._pool()
+        connection = pool.acquire()
+
+        pool.close()
+        pool.release(connection)
+
+        self.assertFalse(connection.connected)
+        self.assertEqual(pool.stats()["idle"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,7 +7,12 @@ sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 from test_base import BaseJoggingTest
 from database import get_db_cursor
 
-from models.repositories import EventRepository, RegistrationRepository
+from models.repositories import (
+    EventRepository,
+    RegistrationRepository,
+    RegistrationResult,
+    WaitlistRepository,
+)
 
 
 class EventOperationsTest(BaseJoggingTest):
@@ -169,6 +174,234 @@ class EventOperationsTest(BaseJoggingTest):
             len(after_registrations), 0, "Should not be registered after unregistration"
         )
 
+    def test_events_with_registration_status(self):
+        """Test listing events with participant counts and registration flags."""
+        event_date = datetime.now() + timedelta(days=10)
+        event_ids = []
+
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            for i in range(3):
+                cursor.execute(
+                    "INSERT INTO joggingevent (EventName, EventDate, MaxParticipants) VALUES (%s, %s, %s)",
+                    (f"Test Event Listing {i}", event_date, 10),
+                )
+                event_ids.append(cursor.lastrowid)
+
+            cursor.execute(
+                "INSERT INTO jogger (Email, Name) VALUES (%s, %s)",
+                ("test_other_jogger@example.com", "Other Jogger"),
+            )
+
+        with self._repository_scope():
+            for email in (self.test_jogger_email, "test_other_jogger@example.com"):
+                RegistrationRepository.register_for_event(event_ids[0], email)
+            RegistrationRepository.register_for_event(
+                event_ids[1], "test_other_jogger@example.com"
+            )
+            events = EventRepository.get_events_with_registration_status(
+                self.test_jogger_email
+            )
+
+        listed = {e["EventID"]: e for e in events if e["EventID"] in event_ids}
+        self.assertEqual(len(listed), 3)
+        self.assertEqual(listed[event_ids[0]]["CurrentParticipants"], 2)
+        self.assertEqual(listed[event_ids[1]]["CurrentParticipants"], 1)
+        self.assertEqual(listed[event_ids[2]]["CurrentParticipants"], 0)
+        self.assertTrue(listed[event_ids[0]]["IsRegistered"])
+        self.assertFalse(listed[event_ids[1]]["IsRegistered"])
+        self.assertFalse(listed[event_ids[2]]["IsRegistered"])
+
+    def test_organizer_event_summaries(self):
+        """Test the organizer dashboard counts and ratings for each event."""
+        event_ids = [
+            self._create_future_event(f"Test Event Summary {i}") for i in range(3)
+        ]
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            for event_id in event_ids[:2]:
+                cursor.execute(
+                    "INSERT INTO event_em (OrganizerEmail, EventID) VALUES (%s, %s)",
+                    (self.test_organizer_email, event_id),
+                )
+            cursor.execute(
+                "INSERT INTO jogger (Email, Name) VALUES (%s, %s)",
+                ("test_other_jogger@example.com", "Other Jogger"),
+            )
+
+        with self._repository_scope():
+            for email in (self.test_jogger_email, "test_other_jogger@example.com"):
+                RegistrationRepository.register_for_event(event_ids[0], email)
+            with get_db_cursor(commit=False, connection=self.connection) as cursor:
+                for email, rating in (
+                    (self.test_jogger_email, 4),
+                    ("test_other_jogger@example.com", 5),
+                ):
+                    cursor.execute(
+                        "INSERT INTO eventreview (EventID, JoggerEmail, Rating, Comment) VALUES (%s, %s, %s, %s)",
+                        (event_ids[0], email, rating, "Test review"),
+                    )
+            summaries = EventRepository.get_organizer_event_summaries(
+                self.test_organizer_email
+            )
+
+        listed = {e["EventID"]: e for e in summaries}
+        self.assertEqual(set(listed), set(event_ids[:2]))
+        self.assertEqual(listed[event_ids[0]]["CurrentParticipants"], 2)
+        self.assertEqual(listed[event_ids[0]]["ReviewCount"], 2)
+        self.assertEqual(float(listed[event_ids[0]]["AverageRating"]), 4.5)
+        self.assertEqual(listed[event_ids[1]]["CurrentParticipants"], 0)
+        self.assertEqual(listed[event_ids[1]]["ReviewCount"], 0)
+        self.assertIsNone(listed[event_ids[1]]["AverageRating"])
+
+    def _create_future_event(self, name, max_participants=10):
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            cursor.execute(
+                "INSERT INTO joggingevent (EventName, EventDate, MaxParticipants) VALUES (%s, %s, %s)",
+                (name, datetime.now() + timedelta(days=5), max_participants),
+            )
+            return cursor.lastrowid
+
+    def test_registrations_are_paged_in_registration_order(self):
+        """Test that registration pages cover every row once, oldest first."""
+        event_id = self._create_future_event("Test Event Pages")
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            for i in range(5):
+                email = f"test_pager{i}@example.com"
+                cursor.execute(
+                    "INSERT INTO jogger (Email, Name) VALUES (%s, %s)",
+                    (email, f"Pager {i}"),
+                )
+                cursor.execute(
+                    "INSERT INTO eventregistration (EventID, JoggerEmail, TimeStamp) VALUES (%s, %s, %s)",
+                    (event_id, email, datetime(2024, 1, 1) + timedelta(minutes=i // 2)),
+                )
+
+        with self._repository_scope():
+            first = RegistrationRepository.get_event_registrations_page(
+                event_id, None, 3
+            )
+            second = RegistrationRepository.get_event_registrations_page(
+                event_id, first.next_cursor, 3
+            )
+
+        emails = [row["JoggerEmail"] for row in list(first) + list(second)]
+        self.assertEqual(emails, [f"test_pager{i}@example.com" for i in range(5)])
+        self.assertIsNotNone(first.next_cursor)
+        self.assertIsNone(second.next_cursor)
+
+    def test_participant_counter_follows_registrations(self):
+        """Test that registering and unregistering maintain the event counter."""
+        event_id = self._create_future_event("Test Event Counter")
+
+        with self._repository_scope():
+            RegistrationRepository.register_for_event(event_id, self.test_jogger_email)
+            after_register = RegistrationRepository.count_registrations(event_id)
+            RegistrationRepository.unregister_from_event(
+                event_id, self.test_jogger_email
+            )
+            after_unregister = RegistrationRepository.count_registrations(event_id)
+            RegistrationRepository.unregister_from_event(
+                event_id, self.test_jogger_email
+            )
+            after_repeat = RegistrationRepository.count_registrations(event_id)
+
+        self.assertEqual(after_register, 1)
+        self.assertEqual(after_unregister, 0)
+        self.assertEqual(after_repeat, 0, "Counter should not go below zero")
+
+    def test_reconcile_participant_counts(self):
+        """Test detecting and repairing counters that drifted from the rows."""
+        event_id = self._create_future_event("Test Event Drift")
+
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            cursor.execute(
+                "INSERT INTO eventregistration (EventID, JoggerEmail) VALUES (%s, %s)",
+                (event_id, self.test_jogger_email),
+            )
+
+        with self._repository_scope():
+            drift = RegistrationRepository.reconcile_participant_counts(repair=True)
+            remaining = RegistrationRepository.reconcile_participant_counts()
+            repaired = RegistrationRepository.count_registrations(event_id)
+
+        drifted = [row for row in drift if row["EventID"] == event_id]
+        self.assertEqual(len(drifted), 1)
+        self.assertEqual(drifted[0]["CurrentParticipants"], 0)
+        self.assertEqual(drifted[0]["ActualParticipants"], 1)
+        self.assertEqual(remaining, [])
+        self.assertEqual(repaired, 1)
+
+    def test_reserve_seat_outcomes(self):
+        """Test the result reported for each registration attempt."""
+        event_id = self._create_future_event("Test Event Seats", max_participants=1)
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            cursor.execute(
+                "INSERT INTO jogger (Email, Name) VALUES (%s, %s)",
+                ("test_jogger_late@example.com", "Late Jogger"),
+            )
+            cursor.execute(
+                "INSERT INTO joggingevent (EventName, EventDate, MaxParticipants) VALUES (%s, %s, %s)",
+                ("Test Event Past Seats", datetime.now() - timedelta(days=1), 10),
+            )
+            past_event_id = cursor.lastrowid
+
+        with self._repository_scope():
+            first = RegistrationRepository.reserve_seat(
+                event_id, self.test_jogger_email
+            )
+            repeat = RegistrationRepository.reserve_seat(
+                event_id, self.test_jogger_email
+            )
+            full = RegistrationRepository.reserve_seat(
+                event_id, "test_jogger_late@example.com"
+            )
+            past = RegistrationRepository.reserve_seat(
+                past_event_id, self.test_jogger_email
+            )
+            missing = RegistrationRepository.reserve_seat(-1, self.test_jogger_email)
+            participants = RegistrationRepository.count_registrations(event_id)
+
+        self.assertEqual(first, RegistrationResult.REGISTERED)
+        self.assertEqual(repeat, RegistrationResult.ALREADY_REGISTERED)
+        self.assertEqual(full, RegistrationResult.FULL)
+        self.assertEqual(past, RegistrationResult.PAST)
+        self.assertEqual(missing, RegistrationResult.NOT_FOUND)
+        self.assertEqual(participants, 1, "Rejected attempts must not take seats")
+
+    def test_waitlist_promotion(self):
+        """Test that freed seats go to waitlisted joggers in join order."""
+        event_id = self._create_future_event("Test Event Waitlist", max_participants=1)
+        queued = [f"test_jogger_queue{i}@example.com" for i in range(2)]
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            for email in queued:
+                cursor.execute(
+                    "INSERT INTO jogger (Email, Name) VALUES (%s, %s)",
+                    (email, "Queued Jogger"),
+                )
+
+        with self._repository_scope():
+            first = WaitlistRepository.join_waitlist(event_id, self.test_jogger_email)
+            joined = [WaitlistRepository.join_waitlist(event_id, e) for e in queued]
+            positions = [WaitlistRepository.get_position(event_id, e) for e in queued]
+
+            RegistrationRepository.unregister_from_event(
+                event_id, self.test_jogger_email
+            )
+            promoted = RegistrationRepository.check_registration(event_id, queued[0])
+            still_waiting = WaitlistRepository.get_position(event_id, queued[1])
+            participants = RegistrationRepository.count_registrations(event_id)
+            listed = {
+                e["EventID"]: e
+                for e in EventRepository.get_events_with_registration_status(queued[1])
+            }
+
+        self.assertEqual(first, RegistrationResult.REGISTERED)
+        self.assertEqual(joined, [RegistrationResult.FULL, RegistrationResult.FULL])
+        self.assertEqual(positions, [1, 2])
+        self.assertTrue(promoted, "Head of the waitlist should take the freed seat")
+        self.assertEqual(still_waiting, 1)
+        self.assertEqual(participants, 1)
+        self.assertEqual(listed[event_id]["WaitlistPosition"], 1)
+
 
 if __name__ == "__main__":
     unittest.main()
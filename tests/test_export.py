@@ -0,0 +1,186 @@
+import asyncio
+import io
+import json
+import unittest
+import sys
+import os
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from test_connection_pool import FakeConnection, FakeCursor
+
+import httpx
+from fastapi import FastAPI
+
+import database
+from cache import clear_caches
+from export import export_filename, export_rows
+from routers import user_router
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def _session(session_id, distance=5.0, route_name="Park 5K"):
+    return {
+        "SessionID": session_id,
+        "StartDT": datetime(2025, 3, 10, 7, 30),
+        "EndDT": datetime(2025, 3, 10, 8, 15),
+        "Distance": distance,
+        "RouteID": 1 if route_name else None,
+        "RouteName": route_name,
+    }
+
+
+class StreamingCursor(FakeCursor):
+    """Cursor that hands out its connection's rows through fetchmany()."""
+
+    def fetchmany(self, size):
+        self.connection.fetches += 1
+        rows = self.connection.rows[:size]
+        del self.connection.rows[:size]
+        return rows
+
+    def fetchall(self):
+        return list(self.connection.lookup)
+
+
+class StreamingConnection(FakeConnection):
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = list(rows)
+        self.lookup = []
+        self.fetches = 0
+        self.buffered = None
+
+    def cursor(self, dictionary=False, buffered=None):
+        self.buffered = buffered
+        return StreamingCursor(self)
+
+
+class ExportTest(unittest.TestCase):
+    """Test cases for streaming exports."""
+
+    def setUp(self):
+        self.rows = [_session(i) for i in range(1, 6)]
+        self.rows[2] = _session(3, None, None)
+        self.opened = []
+
+        def connect(**connect_args):
+            connection = StreamingConnection(self.rows)
+            self.opened.append(connection)
+            return connection
+
+        database.configure_pool(connect=connect)
+        clear_caches()
+
+    def tearDown(self):
+        database.configure_pool()
+        clear_caches()
+
+    def _export(self, fmt, chunk_size=2):
+        return list(
+            export_rows("jogger", "runner@example.com", "sessions", fmt, chunk_size)
+        )
+
+    def test_csv_is_written_chunk_by_chunk(self):
+        """Test that rows are fetched unbuffered and written as they arrive."""
+        pieces = self._export("csv")
+
+        lines = b"".join(pieces).decode().splitlines()
+        self.assertEqual(lines[0], "SessionID,StartDT,EndDT,Distance,RouteID,RouteName")
+        self.assertEqual(
+            lines[1], "1,2025-03-10 07:30:00,2025-03-10 08:15:00,5.0,1,Park 5K"
+        )
+        self.assertEqual(lines[3], "3,2025-03-10 07:30:00,2025-03-10 08:15:00,,,")
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(len(pieces), 3)
+        self.assertIs(self.opened[0].buffered, False)
+        self.assertEqual(self.opened[0].fetches, 4)
+
+    def test_jsonl_writes_one_object_per_row(self):
+        """Test JSON Lines output, with nulls and ISO timestamps."""
+        lines = b"".join(self._export("jsonl")).decode().splitlines()
+
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[2])["Distance"], None)
+        self.assertEqual(json.loads(lines[0])["StartDT"], "2025-03-10 07:30:00")
+
+    def test_closing_early_drops_the_connection(self):
+        """Test that an abandoned stream does not return unread rows to the pool."""
+        stream = export_rows("jogger", "runner@example.com", "sessions", "csv", 1)
+        next(stream)
+        stream.close()
+
+        self.assertFalse(self.opened[0].connected)
+        self.assertEqual(database.get_pool_stats()["in_use"], 0)
+
+    def test_download_gives_the_request_connection_back_first(self):
+        """Test that a download does not hold the request's connection as well."""
+        app = FastAPI()
+        app.add_middleware(database.UnitOfWorkMiddleware)
+        app.include_router(user_router.router, prefix="/user")
+
+        def connect(**connect_args):
+            connection = StreamingConnection(self.rows)
+            # Answers the handler's jogger lookup
+            connection.lookup = [{"Email": "runner@example.com", "Name": "Runner"}]
+            self.opened.append(connection)
+            return connection
+
+        database.configure_pool(connect=connect)
+
+        async def get():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                return await client.get(
+                    "/user/export/sessions", params={"email": "runner@example.com"}
+                )
+
+        response = asyncio.run(get())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.text.splitlines()), 6)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(database.get_pool_stats()["in_use"], 0)
+
+    def test_unknown_exports_are_refused(self):
+        """Test that datasets and formats are checked before any query runs."""
+        with self.assertRaises(ValueError):
+            next(export_rows("jogger", "a@example.com", "leaderboard"))
+        with self.assertRaises(ValueError):
+            next(export_rows("jogger", "a@example.com", "sessions", "xml"))
+        self.assertEqual(self.opened, [])
+
+    def test_filename_is_safe(self):
+        """Test that owner IDs cannot inject paths into the download name."""
+        self.assertEqual(
+            export_filename("jogger", "a/b@example.com", "sessions", "parquet"),
+            "jogger-a_b_example.com-sessions.parquet",
+        )
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_columnar_formats_round_trip(self):
+        """Test that Parquet and Arrow streams read back as the same rows."""
+        table = pyarrow.parquet.read_table(
+            io.BytesIO(b"".join(self._export("parquet")))
+        )
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column("Distance").to_pylist()[2], None)
+
+        database.configure_pool(connect=lambda **_: StreamingConnection(self.rows))
+        reader = pyarrow.ipc.open_stream(b"".join(self._export("arrow")))
+        table = reader.read_all()
+        self.assertEqual(table.column("SessionID").to_pylist(), [1, 2, 3, 4, 5])
+        self.assertEqual(
+            table.column("StartDT").to_pylist()[0], datetime(2025, 3, 10, 7, 30)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from test_connection_pool import FakeConnection
+from test_query_log import ListHandler
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.templating import Jinja2Templates
+
+import database
+import instrumentation
+from instrumentation import (
+    INSTRUMENTATION_CONFIG,
+    RequestInstrumentationMiddleware,
+    instrument_templates,
+)
+from models.repositories import BaseRepository
+
+
+class InstrumentationTest(unittest.TestCase):
+    """Test cases for per-request query instrumentation."""
+
+    def setUp(self):
+        self.opened = []
+
+        def connect(**connect_args):
+            connection = FakeConnection()
+            self.opened.append(connection)
+            return connection
+
+        database.configure_pool(connect=connect)
+        self.directory = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.directory.name, "page.html"), "w") as f:
+            f.write("<p>{{ count }}</p>")
+        templates = Jinja2Templates(directory=self.directory.name)
+        instrument_templates()
+
+        app = FastAPI()
+        app.add_middleware(database.UnitOfWorkMiddleware)
+        app.add_middleware(RequestInstrumentationMiddleware)
+
+        @app.get("/routes")
+        def routes(request: Request):
+            for route_id in range(8):
+                BaseRepository.execute_query(
+                    "SELECT * FROM joggingroute WHERE RouteID = %s", (route_id,)
+                )
+            return templates.TemplateResponse(request, "page.html", {"count": 8})
+
+        self.app = app
+        self.handler = ListHandler()
+        instrumentation.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        instrumentation.logger.removeHandler(self.handler)
+        instrumentation.configure_access_log(False)
+        instrumentation.logger.setLevel(logging.NOTSET)
+        self.directory.cleanup()
+        database.configure_pool()
+
+    def _get(self, path):
+        async def get():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                return await client.get(path)
+
+        return asyncio.run(get())
+
+    def test_server_timing_header(self):
+        """Test that queries, checkouts and template renders are reported."""
+        response = self._get("/routes")
+
+        timing = response.headers["server-timing"]
+        self.assertIn('desc="8 queries"', timing)
+        self.assertIn('desc="1 checkouts"', timing)
+        self.assertIn('desc="1 templates"', timing)
+        self.assertIn("total;dur=", timing)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_repeated_statements_are_flagged(self):
+        """Test that a statement run past the threshold is logged as N+1."""
+        response = self._get("/routes")
+
+        self.assertIn(
+            'n1;desc="1 repeated statements"', response.headers["server-timing"]
+        )
+        warnings = [r for r in self.handler.records if r.levelno == logging.WARNING]
+        self.assertEqual(len(warnings), 1)
+        self.assertEqual(list(warnings[0].request["n_plus_one"].values()), [8])
+
+        INSTRUMENTATION_CONFIG["n_plus_one_threshold"] = 10
+        try:
+            response = self._get("/routes")
+        finally:
+            INSTRUMENTATION_CONFIG["n_plus_one_threshold"] = 5
+        self.assertNotIn("n1;", response.headers["server-timing"])
+
+    def test_access_log_record(self):
+        """Test the structured access log line written once per request."""
+        instrumentation.configure_access_log(True)
+
+        self._get("/routes")
+
+        records = [r for r in self.handler.records if r.levelno == logging.INFO]
+        self.assertEqual(len(records), 1)
+        request = records[0].request
+        self.assertEqual(request["method"], "GET")
+        self.assertEqual(request["path"], "/routes")
+        self.assertEqual(request["status"], 200)
+        self.assertEqual(request["queries"], 8)
+        self.assertEqual(request["checkouts"], 1)
+        self.assertEqual(request["templates"], 1)
+
+    def test_disabled(self):
+        """Test that nothing is measured when instrumentation is off."""
+        INSTRUMENTATION_CONFIG["enabled"] = False
+        try:
+            response = self._get("/routes")
+        finally:
+            INSTRUMENTATION_CONFIG["enabled"] = True
+
+        self.assertNotIn("server-timing", response.headers)
+        self.assertEqual(self.handler.records, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
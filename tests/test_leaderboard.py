@@ -6,6 +6,8 @@ import os
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 from test_base import BaseJoggingTest
 from database import get_db_cursor
+from leaderboard import LEADERBOARD_CONFIG
+from models.repositories import JoggingSessionRepository, LeaderboardRepository
 
 
 class LeaderboardTest(BaseJoggingTest):
@@ -288,6 +290,172 @@ class LeaderboardTest(BaseJoggingTest):
             f"Top performer should have participated in all {len(event_ids)} events",
         )
 
+    def _add_event_sessions(self):
+        """Record one session per test jogger through the repository."""
+        session_ids = []
+        with self._repository_scope():
+            for i, jogger in enumerate(self.test_joggers):
+                start_dt = self.event_date + timedelta(hours=1)
+                end_dt = start_dt + timedelta(minutes=30 + i * 10)
+                session_id = JoggingSessionRepository.create_session(
+                    start_dt, end_dt, 5.0 - (i * 0.5), jogger["email"]
+                )
+                JoggingSessionRepository.add_session_to_event(self.event_id, session_id)
+                session_ids.append(session_id)
+        return session_ids
+
+    def test_materialized_leaderboard_follows_session_writes(self):
+        """Test that session writes keep the materialized leaderboard current."""
+        session_ids = self._add_event_sessions()
+
+        with self._repository_scope():
+            leaderboard = LeaderboardRepository.get_leaderboard_for_event(self.event_id)
+        self.assertEqual([entry["Rank"] for entry in leaderboard], [1, 2, 3, 4, 5])
+        self.assertEqual(leaderboard[0]["JoggerEmail"], self.test_joggers[0]["email"])
+
+        start_dt = self.event_date + timedelta(hours=1)
+        with self._repository_scope():
+            JoggingSessionRepository.update_session(
+                session_ids[4], start_dt, start_dt + timedelta(minutes=20), 9.0
+            )
+            JoggingSessionRepository.remove_session_from_event(
+                self.event_id, session_ids[1]
+            )
+            JoggingSessionRepository.delete_session(session_ids[2])
+            leaderboard = LeaderboardRepository.get_leaderboard_for_event(self.event_id)
+
+        self.assertEqual(
+            [entry["JoggerEmail"] for entry in leaderboard],
+            [self.test_joggers[i]["email"] for i in (4, 0, 3)],
+        )
+        self.assertEqual(leaderboard[0]["FinishTime"], 20 * 60)
+
+        with self._repository_scope():
+            differences = LeaderboardRepository.check_consistency(self.event_id)
+        self.assertEqual(
+            differences, [], "Materialized leaderboard should match the view"
+        )
+
+    def test_rank_queries_follow_session_writes(self):
+        """Test rank, top and around-me lookups after a session is updated."""
+        session_ids = self._add_event_sessions()
+        last = self.test_joggers[4]["email"]
+
+        with self._repository_scope():
+            self.assertEqual(
+                LeaderboardRepository.get_jogger_rank(self.event_id, last)["Rank"], 5
+            )
+
+        start_dt = self.event_date + timedelta(hours=1)
+        with self._repository_scope():
+            JoggingSessionRepository.update_session(
+                session_ids[4], start_dt, start_dt + timedelta(minutes=20), 9.0
+            )
+
+        with self._repository_scope():
+            entry = LeaderboardRepository.get_jogger_rank(self.event_id, last)
+            top = LeaderboardRepository.get_top_entries(self.event_id, 2)
+            around = LeaderboardRepository.get_entries_around(
+                self.event_id, self.test_joggers[2]["email"], 1
+            )
+
+        self.assertEqual(entry["Rank"], 1)
+        self.assertEqual(
+            [e["JoggerEmail"] for e in top], [last, self.test_joggers[0]["email"]]
+        )
+        self.assertEqual([e["Rank"] for e in around], [3, 4, 5])
+
+    def test_leaderboard_rebuild_repairs_drift(self):
+        """Test that a rebuild restores entries written around the repository."""
+        self._add_event_sessions()
+
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            cursor.execute(
+                "DELETE FROM leaderboardentry WHERE EventID = %s", (self.event_id,)
+            )
+
+        with self._repository_scope():
+            self.assertEqual(
+                len(LeaderboardRepository.check_consistency(self.event_id)), 5
+            )
+            entries = LeaderboardRepository.rebuild(self.event_id)
+            differences = LeaderboardRepository.check_consistency(self.event_id)
+
+        self.assertEqual(entries, 5)
+        self.assertEqual(differences, [])
+
+    def test_consistency_check_reports_entries_without_finish_time(self):
+        """Test that differing rows with and without a finish time are reported."""
+        jogger = self.test_joggers[0]
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            for session_id, finish_time in ((1, 300), (2, None)):
+                cursor.execute(
+                    "INSERT INTO leaderboardentry (EventID, SessionID, JoggerEmail, "
+                    "JoggerName, Distance, FinishTime) VALUES (%s, %s, %s, %s, %s, %s)",
+                    (
+                        self.event_id,
+                        session_id,
+                        jogger["email"],
+                        jogger["name"],
+                        10.0,
+                        finish_time,
+                    ),
+                )
+
+        with self._repository_scope():
+            differences = LeaderboardRepository.check_consistency(self.event_id)
+
+        self.assertEqual(
+            differences,
+            [
+                (self.event_id, jogger["name"], None, 1, -1),
+                (self.event_id, jogger["name"], 300, 1, -1),
+            ],
+        )
+
+    def test_pages_order_entries_without_distance_or_time(self):
+        """Test that paging visits entries with NULL values once, in engine order."""
+        entries = [
+            (1, 10.0, 300),
+            (2, 10.0, None),
+            (3, None, 200),
+            (4, None, None),
+            (5, 5.0, 100),
+            (6, 10.0, 300),
+        ]
+        jogger = self.test_joggers[0]
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            for session_id, distance, finish_time in entries:
+                cursor.execute(
+                    "INSERT INTO leaderboardentry (EventID, SessionID, JoggerEmail, JoggerName, Distance, FinishTime) VALUES (%s, %s, %s, %s, %s, %s)",
+                    (
+                        self.event_id,
+                        session_id,
+                        jogger["email"],
+                        jogger["name"],
+                        distance,
+                        finish_time,
+                    ),
+                )
+
+        original = LEADERBOARD_CONFIG["enabled"]
+        try:
+            for enabled in (False, True):
+                LEADERBOARD_CONFIG["enabled"] = enabled
+                seen, cursor = [], None
+                with self._repository_scope():
+                    while True:
+                        page = LeaderboardRepository.get_leaderboard_page(
+                            self.event_id, cursor, 2
+                        )
+                        seen.extend(entry["SessionID"] for entry in page)
+                        cursor = page.next_cursor
+                        if cursor is None:
+                            break
+                self.assertEqual(seen, [2, 1, 6, 5, 4, 3], f"enabled={enabled}")
+        finally:
+            LEADERBOARD_CONFIG["enabled"] = original
+
 
 if __name__ == "__main__":
     unittest.main()
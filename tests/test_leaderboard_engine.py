@@ -0,0 +1,199 @@
+import unittest
+import random
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+from leaderboard import EventLeaderboard, IndexableSkipList, LeaderboardEngine
+
+
+def _entry(session_id, distance, finish_time=1800, email=None, event_id=1):
+    return {
+        "EventID": event_id,
+        "SessionID": session_id,
+        "JoggerEmail": email or f"jogger{session_id}@example.com",
+        "JoggerName": f"Jogger {session_id}",
+        "Distance": distance,
+        "FinishTime": finish_time,
+    }
+
+
+class IndexableSkipListTest(unittest.TestCase):
+    """Test cases for the indexable skip list."""
+
+    def test_matches_sorted_list_under_random_operations(self):
+        """Test positions and slices against a plain sorted list."""
+        rng = random.Random(7)
+        skiplist = IndexableSkipList(seed=3)
+        expected = []
+
+        for _ in range(2000):
+            if expected and rng.random() < 0.4:
+                key = rng.choice(expected)
+                expected.remove(key)
+                self.assertEqual(skiplist.remove(key), -key)
+            else:
+                key = rng.randrange(10000)
+                if key in expected:
+                    continue
+                expected.append(key)
+                expected.sort()
+                skiplist.insert(key, -key)
+
+        self.assertEqual(len(skiplist), len(expected))
+        self.assertEqual([key for key, _ in skiplist], expected)
+        for probe in (0, 17, 5000, 9999, 10000):
+            self.assertEqual(
+                skiplist.count_less(probe), sum(key < probe for key in expected)
+            )
+        self.assertEqual([key for key, _ in skiplist.slice(10, 5)], expected[10:15])
+        self.assertEqual(skiplist.slice(len(expected), 5), [])
+
+    def test_bulk_build_supports_later_updates(self):
+        """Test that a list built from sorted items behaves like an inserted one."""
+        expected = list(range(0, 1000, 3))
+        skiplist = IndexableSkipList.from_sorted(((key, None) for key in expected), 5)
+
+        for key in (1, 500, 2000):
+            skiplist.insert(key)
+            expected.append(key)
+        for key in (0, 999, 501):
+            skiplist.remove(key)
+            expected.remove(key)
+        expected.sort()
+
+        self.assertEqual([key for key, _ in skiplist], expected)
+        self.assertEqual(skiplist.count_less(500), expected.index(500))
+        self.assertEqual(skiplist.slice(100, 3), [(k, None) for k in expected[100:103]])
+
+    def test_duplicate_and_missing_keys_are_rejected(self):
+        """Test that keys stay unique and removing unknown keys fails."""
+        skiplist = IndexableSkipList()
+        skiplist.insert(1)
+
+        with self.assertRaises(KeyError):
+            skiplist.insert(1)
+        with self.assertRaises(KeyError):
+            skiplist.remove(2)
+
+
+class EventLeaderboardTest(unittest.TestCase):
+    """Test cases for in-memory event leaderboards."""
+
+    def test_ties_share_a_rank(self):
+        """Test that ranks follow RANK() semantics over distance."""
+        board = EventLeaderboard(
+            1,
+            [
+                _entry(1, 10.0, 3000),
+                _entry(2, 12.0),
+                _entry(3, 10.0, 2800),
+                _entry(4, 8.0),
+                _entry(5, None),
+            ],
+        )
+
+        ranks = [(entry["SessionID"], entry["Rank"]) for entry in board.top()]
+        self.assertEqual(ranks, [(2, 1), (3, 2), (1, 2), (4, 4), (5, 5)])
+        self.assertEqual(board.page(2, 2)[0]["Rank"], 2)
+        self.assertEqual(board.jogger_entry("jogger1@example.com")["Rank"], 2)
+
+    def test_jogger_rank_uses_best_session(self):
+        """Test that a jogger with several sessions is ranked by the best one."""
+        email = "runner@example.com"
+        board = EventLeaderboard(
+            1,
+            [
+                _entry(1, 5.0, email=email),
+                _entry(2, 9.0),
+                _entry(3, 7.0, email=email),
+            ],
+        )
+
+        self.assertEqual(board.jogger_entry(email)["SessionID"], 3)
+        self.assertEqual(board.jogger_entry(email)["Rank"], 2)
+        self.assertIsNone(board.jogger_entry("nobody@example.com"))
+
+    def test_entries_around_jogger(self):
+        """Test that neighbours are returned on both sides, clipped at the top."""
+        board = EventLeaderboard(1, [_entry(i, 100.0 - i) for i in range(1, 21)])
+
+        around = board.around("jogger10@example.com", 2)
+        self.assertEqual([entry["Rank"] for entry in around], [8, 9, 10, 11, 12])
+
+        around = board.around("jogger1@example.com", 2)
+        self.assertEqual([entry["Rank"] for entry in around], [1, 2, 3])
+
+    def test_page_after_continues_from_cursor_entry(self):
+        """Test keyset pages, including a cursor whose entry has since left."""
+        board = EventLeaderboard(1, [_entry(i, 50.0 - i // 2) for i in range(1, 11)])
+
+        first = board.page_after(None, 3)
+        second = board.page_after(first[-1], 3)
+        board.discard(second[-1]["SessionID"])
+        third = board.page_after(second[-1], 3)
+
+        self.assertEqual([e["SessionID"] for e in first], [1, 2, 3])
+        self.assertEqual([e["SessionID"] for e in second], [4, 5, 6])
+        self.assertEqual([e["Rank"] for e in second], [4, 4, 6])
+        self.assertEqual([e["SessionID"] for e in third], [7, 8, 9])
+
+    def test_upsert_moves_updated_session(self):
+        """Test that updating a session's distance re-ranks it."""
+        board = EventLeaderboard(1, [_entry(1, 5.0), _entry(2, 6.0)])
+
+        board.upsert(_entry(1, 7.0))
+        board.discard(2)
+        board.discard(99)
+
+        self.assertEqual(len(board), 1)
+        self.assertEqual(board.top(1)[0]["Distance"], 7.0)
+
+
+class LeaderboardEngineTest(unittest.TestCase):
+    """Test cases for the process-wide leaderboard engine."""
+
+    def setUp(self):
+        self.rows = {1: [_entry(1, 5.0), _entry(2, 6.0)]}
+        self.loads = []
+
+        def load(event_id):
+            self.loads.append(event_id)
+            return list(self.rows.get(event_id, []))
+
+        self.engine = LeaderboardEngine(load, max_age=0)
+
+    def test_events_are_loaded_once(self):
+        """Test that an event is loaded on first use and then kept in memory."""
+        self.engine.top(1, 10)
+        self.engine.jogger_entry(1, "jogger1@example.com")
+
+        self.assertEqual(self.loads, [1])
+
+    def test_writes_update_loaded_events_only(self):
+        """Test that committed writes are applied to events already in memory."""
+        self.engine.top(1, 10)
+
+        self.engine.upsert([_entry(3, 9.0), _entry(4, 1.0, event_id=2)])
+        self.engine.remove(1, 2)
+
+        self.assertEqual([e["SessionID"] for e in self.engine.top(1)], [3, 1])
+        self.assertEqual(self.engine.size(2), 0)
+
+        self.engine.remove_session(3)
+        self.assertEqual(self.engine.size(1), 1)
+
+    def test_invalidate_reloads(self):
+        """Test that an invalidated event is read again on next use."""
+        self.engine.top(1, 10)
+        self.rows[1].append(_entry(5, 20.0))
+
+        self.engine.invalidate(1)
+
+        self.assertEqual(self.engine.top(1, 1)[0]["SessionID"], 5)
+        self.assertEqual(self.loads, [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from test_connection_pool import FakeConnection
+
+import httpx
+from fastapi import APIRouter, FastAPI
+
+import database
+import metrics
+from metrics import Counter, Histogram, MetricsMiddleware, render
+from models.repositories import BaseRepository
+
+
+class ReportRepository(BaseRepository):
+    @staticmethod
+    def count_sessions(email):
+        return BaseRepository.execute_query(
+            "SELECT COUNT(*) FROM jogging WHERE Email = %s", (email,)
+        )
+
+
+class MetricsTest(unittest.TestCase):
+    """Test cases for the Prometheus metrics."""
+
+    def setUp(self):
+        database.configure_pool(connect=lambda **_: FakeConnection())
+        router = APIRouter()
+
+        @router.get("/events/{event_id}/report")
+        def report(event_id: int):
+            ReportRepository.count_sessions("runner@example.com")
+            return {"event": event_id}
+
+        app = FastAPI()
+        app.include_router(router, prefix="/user")
+        app.add_middleware(MetricsMiddleware)
+        self.app = app
+
+    def tearDown(self):
+        database.configure_pool()
+
+    def _get(self, *paths):
+        async def get():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                for path in paths:
+                    await client.get(path)
+
+        asyncio.run(get())
+
+    def test_counter_sums_every_thread(self):
+        """Test that values recorded without locks in many threads add up."""
+        counter = Counter("test_total", "Test counter.", ("kind",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc("a")
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc("b", amount=2)
+
+        self.assertEqual(counter.collect(), {("a",): 8000, ("b",): 2})
+
+    def test_values_of_finished_threads_are_folded_once(self):
+        """Test that exited threads' maps are merged and then let go."""
+        histogram = Histogram("test_seconds", "Test histogram.", ("route",), (1,))
+
+        def work():
+            histogram.observe(0.5, "/a")
+
+        for _ in range(3):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+
+        first = histogram.collect()
+        self.assertEqual(histogram._shards._shards, [])
+        self.assertEqual(histogram.collect(), first)
+        self.assertEqual(first, {("/a",): [3, 0, 1.5, 3]})
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test le buckets, sum and count in the exposition format."""
+        histogram = Histogram("test_seconds", "Test histogram.", ("route",), (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, "/a")
+
+        lines = [metrics._line(*sample) for sample in histogram.samples()]
+
+        self.assertEqual(
+            lines,
+            [
+                'test_seconds_bucket{route="/a",le="0.1"} 2',
+                'test_seconds_bucket{route="/a",le="1"} 3',
+                'test_seconds_bucket{route="/a",le="+Inf"} 4',
+                'test_seconds_sum{route="/a"} 3.65',
+                'test_seconds_count{route="/a"} 4',
+            ],
+        )
+
+    def test_requests_are_labelled_by_route_template(self):
+        """Test that IDs and unknown paths do not create new series."""
+        before = metrics.requests_total.collect()
+
+        self._get("/user/events/1/report", "/user/events/2/report", "/nope/42")
+
+        after = metrics.requests_total.collect()
+        key = ("GET", "/user/events/{event_id}/report", "200")
+        self.assertEqual(after[key] - before.get(key, 0), 2)
+        unmatched = ("GET", "unmatched", "404")
+        self.assertEqual(after[unmatched] - before.get(unmatched, 0), 1)
+        self.assertEqual(metrics.requests_in_flight.collect().get((), 0), 0)
+
+    def test_queries_are_labelled_by_repository_method(self):
+        """Test that query latency is recorded against the calling method."""
+        self._get("/user/events/1/report")
+
+        methods = {labels[0] for labels in metrics.query_seconds.collect()}
+        self.assertIn("ReportRepository.count_sessions", methods)
+
+    def test_render_includes_pool_and_cache_metrics(self):
+        """Test the scrape output, including values read at scrape time."""
+        self._get("/user/events/1/report")
+
+        text = render()
+
+        self.assertIn("# TYPE jogging_http_request_duration_seconds histogram", text)
+        self.assertIn(
+            'jogging_http_request_duration_seconds_count{method="GET",'
+            'route="/user/events/{event_id}/report"}',
+            text,
+        )
+        self.assertIn('jogging_db_pool_connections{state="in_use"} 0', text)
+        self.assertIn("jogging_db_pool_checkouts_total 1", text)
+        self.assertIn('jogging_cache_hit_ratio{cache="jogger"}', text)
+        self.assertTrue(text.endswith("\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from datetime import datetime
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+from pagination import (
+    PAGINATION_CONFIG,
+    decode_cursor,
+    encode_cursor,
+    make_page,
+    page_size,
+)
+
+
+class PaginationTest(unittest.TestCase):
+    """Test cases for keyset pagination helpers."""
+
+    def test_cursor_round_trip(self):
+        """Test that cursors survive encoding, including datetimes."""
+        values = [datetime(2024, 5, 1, 7, 30), "runner@example.com", 4.5, None]
+
+        token = encode_cursor(values)
+
+        self.assertNotIn("=", token)
+        self.assertEqual(decode_cursor(token, 4), values)
+        self.assertIsNone(decode_cursor(None, 4))
+
+    def test_invalid_cursor_is_rejected(self):
+        """Test that tampered or mismatched cursors raise ValueError."""
+        with self.assertRaises(ValueError):
+            decode_cursor("not a cursor", 1)
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor([1, 2]), 1)
+
+    def test_page_size_is_bounded(self):
+        """Test that requested page sizes are clamped."""
+        self.assertEqual(page_size(None), PAGINATION_CONFIG["page_size"])
+        self.assertEqual(page_size(0), PAGINATION_CONFIG["page_size"])
+        self.assertEqual(page_size(10**6), PAGINATION_CONFIG["max_page_size"])
+        self.assertEqual(page_size(-5), 1)
+
+    def test_make_page_trims_lookahead_row(self):
+        """Test that the extra row fetched becomes the next cursor, not output."""
+        rows = [{"ReviewID": i} for i in (9, 7, 4)]
+
+        page = make_page(rows, 2, lambda row: (row["ReviewID"],))
+        last = make_page(rows[:2], 2, lambda row: (row["ReviewID"],))
+
+        self.assertEqual(list(page), rows[:2])
+        self.assertEqual(decode_cursor(page.next_cursor, 1), [7])
+        self.assertIsNone(last.next_cursor)
+        self.assertTrue(page)
+        self.assertFalse(make_page([], 2, lambda row: ()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import logging
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+import query_log
+from query_log import configure_query_log, fingerprint, interpolate
+
+
+class ListHandler(logging.Handler):
+    """Handler that keeps emitted records."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class QueryLogTest(unittest.TestCase):
+    """Test cases for structured query logging."""
+
+    def setUp(self):
+        self.handler = ListHandler()
+        query_log.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        query_log.logger.removeHandler(self.handler)
+        configure_query_log("off")
+
+    def test_fingerprint_ignores_values(self):
+        """Test that queries differing only in literals share a fingerprint."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM jogger  WHERE Email = 'a@example.com'"),
+            fingerprint("SELECT * FROM jogger WHERE Email = %s"),
+        )
+        self.assertEqual(
+            fingerprint("SELECT * FROM joggingevent WHERE EventID IN (%s, %s, %s)"),
+            "SELECT * FROM joggingevent WHERE EventID IN (...)",
+        )
+
+    def test_interpolate_inlines_parameters(self):
+        """Test rendering a query with its positional and named parameters."""
+        self.assertEqual(
+            interpolate("UPDATE jogger SET Name = %s WHERE Age = %s", ("Ann", 3)),
+            "UPDATE jogger SET Name = 'Ann' WHERE Age = 3",
+        )
+        self.assertEqual(
+            interpolate("SELECT %(a)s, %(b)s", {"a": None, "b": 1.5}),
+            "SELECT NULL, 1.5",
+        )
+
+    def test_off_by_default(self):
+        """Test that nothing is logged when the level is off."""
+        configure_query_log("off")
+        self.assertFalse(query_log.should_log())
+
+    def test_summary_record_fields(self):
+        """Test the fields emitted at summary level."""
+        configure_query_log("summary")
+        self.assertTrue(query_log.should_log())
+
+        query_log.log_query("SELECT * FROM jogger WHERE Email = %s", ("x",), 0.002, 1)
+
+        record = self.handler.records[0].query.as_dict()
+        self.assertEqual(record["params"], 1)
+        self.assertEqual(record["rows"], 1)
+        self.assertEqual(record["duration_ms"], 2.0)
+        self.assertNotIn("sql", record)
+
+    def test_full_level_includes_statement(self):
+        """Test that the full level renders the statement with its values."""
+        configure_query_log("full")
+
+        query_log.log_query("SELECT * FROM jogger WHERE Email = %s", ("x",), 0.001, 0)
+
+        message = self.handler.records[0].getMessage()
+        self.assertIn("sql=\"SELECT * FROM jogger WHERE Email = 'x'\"", message)
+
+    def test_sampling(self):
+        """Test that a zero sample rate skips every query."""
+        configure_query_log("summary", sample_rate=0)
+        self.assertFalse(any(query_log.should_log() for _ in range(100)))
+
+    def test_capture_records_queries_while_logging_is_off(self):
+        """Test that captures see every query and nest."""
+        configure_query_log("off")
+        with query_log.capture_queries() as outer:
+            self.assertTrue(query_log.should_log())
+            query_log.log_query("SELECT * FROM jogger WHERE Email = %s", ("a",), 0.5, 1)
+            with query_log.capture_queries() as inner:
+                query_log.log_query(
+                    "SELECT * FROM jogger WHERE Email = %s", ("b",), 0.25, 2
+                )
+
+        self.assertFalse(query_log.should_log())
+        self.assertEqual((inner.count, inner.rows), (1, 2))
+        self.assertEqual((outer.count, outer.rows, outer.duration), (2, 3, 0.75))
+        self.assertEqual(outer.repeated(), {"SELECT * FROM jogger WHERE Email = ?": 2})
+        self.assertEqual(self.handler.records, [])
+
+    def test_unknown_level_is_rejected(self):
+        """Test that configuration errors are reported."""
+        with self.assertRaises(ValueError):
+            configure_query_log("verbose")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,8 @@ sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 from test_base import BaseJoggingTest
 from database import get_db_cursor
 
+from models.repositories import ReviewRepository, RouteRepository
+
 
 class ReviewOperationsTest(BaseJoggingTest):
     """Test cases for review operations."""
@@ -307,6 +309,104 @@ class ReviewOperationsTest(BaseJoggingTest):
         self.assertAlmostEqual(float(route_avg["average"]), 4.2, places=1)
         self.assertAlmostEqual(float(event_avg["average"]), 4.4, places=1)
 
+    def test_routes_with_review_status(self):
+        """Test listing routes with rating stats and the jogger's review flag."""
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            cursor.execute(
+                "INSERT INTO joggingroute (RouteName, Distance, AvgPace) VALUES (%s, %s, %s)",
+                ("Test Route Unreviewed", 2.0, 6.0),
+            )
+            unreviewed_route_id = cursor.lastrowid
+            cursor.execute(
+                "INSERT INTO jogger (Email, Name) VALUES (%s, %s)",
+                ("test_jogger_other@example.com", "Other Jogger"),
+            )
+            for email, rating in (
+                (self.test_jogger_email, 5),
+                ("test_jogger_other@example.com", 2),
+            ):
+                cursor.execute(
+                    "INSERT INTO routereview (RouteID, JoggerEmail, Rating) VALUES (%s, %s, %s)",
+                    (self.route_id, email, rating),
+                )
+
+        with self._repository_scope():
+            routes = RouteRepository.get_routes_with_review_status(
+                self.test_jogger_email
+            )
+
+        listed = {route["RouteID"]: route for route in routes}
+        reviewed = listed[self.route_id]
+        unreviewed = listed[unreviewed_route_id]
+        self.assertIsNotNone(reviewed["JoggerReviewID"])
+        self.assertEqual(reviewed["ReviewCount"], 2)
+        self.assertAlmostEqual(float(reviewed["AverageRating"]), 3.5, places=1)
+        self.assertIsNone(unreviewed["JoggerReviewID"])
+        self.assertEqual(unreviewed["ReviewCount"], 0)
+        self.assertIsNone(unreviewed["AverageRating"])
+
+    def test_route_reviews_are_paged_newest_first(self):
+        """Test walking a route's reviews page by page with keyset cursors."""
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            for i in range(5):
+                cursor.execute(
+                    "INSERT INTO jogger (Email, Name) VALUES (%s, %s)",
+                    (f"test_reviewer{i}@example.com", f"Reviewer {i}"),
+                )
+                cursor.execute(
+                    "INSERT INTO routereview (RouteID, JoggerEmail, Rating) VALUES (%s, %s, %s)",
+                    (self.route_id, f"test_reviewer{i}@example.com", i % 5 + 1),
+                )
+
+        pages = []
+        cursor = None
+        with self._repository_scope():
+            while True:
+                page = ReviewRepository.get_route_reviews_page(self.route_id, cursor, 2)
+                pages.append([review["ReviewID"] for review in page])
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            everything = ReviewRepository.get_route_reviews(self.route_id)
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(
+            [review_id for page in pages for review_id in page],
+            [review["ReviewID"] for review in everything],
+        )
+
+    def test_rating_summary_follows_review_writes(self):
+        """Test that review writes keep the rating summary and histogram current."""
+        with get_db_cursor(commit=False, connection=self.connection) as cursor:
+            cursor.execute(
+                "INSERT INTO jogger (Email, Name) VALUES (%s, %s)",
+                ("test_reviewer_other@example.com", "Other Reviewer"),
+            )
+
+        with self._repository_scope():
+            ReviewRepository.create_route_review(
+                self.route_id, self.test_jogger_email, 2
+            )
+            ReviewRepository.create_route_review(
+                self.route_id, "test_reviewer_other@example.com", 5
+            )
+            review = ReviewRepository.get_route_review_by_jogger(
+                self.route_id, self.test_jogger_email
+            )
+            ReviewRepository.update_route_review(review["ReviewID"], 4)
+            summary = ReviewRepository.get_route_average_rating(self.route_id)
+
+            ReviewRepository.delete_route_review(review["ReviewID"])
+            after_delete = ReviewRepository.get_route_average_rating(self.route_id)
+
+            ReviewRepository.rebuild_rating_summaries("route")
+            rebuilt = ReviewRepository.get_route_average_rating(self.route_id)
+
+        self.assertEqual((summary["average"], summary["count"]), (4.5, 2))
+        self.assertEqual(summary["histogram"], {1: 0, 2: 0, 3: 0, 4: 1, 5: 1})
+        self.assertEqual((after_delete["average"], after_delete["count"]), (5.0, 1))
+        self.assertEqual(rebuilt, after_delete)
+
 
 if __name__ == "__main__":
     unittest.main()
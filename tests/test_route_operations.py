@@ -8,6 +8,7 @@ from test_base import BaseJoggingTest
 from database import get_db_cursor
 
 from models.repositories import RouteRepository
+from pagination import encode_cursor
 
 
 class RouteOperationsTest(BaseJoggingTest):
@@ -107,6 +108,47 @@ class RouteOperationsTest(BaseJoggingTest):
         self.assertEqual(len(before_state), 1, "Route should exist before deletion")
         self.assertEqual(len(after_state), 0, "Route should not exist after deletion")
 
+    def test_search_routes_pages_ranked_matches(self):
+        """Test searching routes by name and distance across pages."""
+        with self._repository_scope():
+            for name, distance in (
+                ("Test Route Harbour", 4.0),
+                ("Test Route Harbour Hills", 9.0),
+                ("Test Route Old Harbour", 5.0),
+                ("Test Route Meadow", 5.0),
+            ):
+                RouteRepository.create_route(name, distance, 6.0)
+
+            pages = []
+            cursor = None
+            while True:
+                page = RouteRepository.search_routes(
+                    "test route harbor", cursor=cursor, limit=2
+                )
+                pages.append([route["RouteName"] for route in page])
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            near = RouteRepository.search_routes(
+                "Test Route", min_distance=4.5, max_distance=6
+            )
+
+        names = [name for page in pages for name in page]
+        self.assertEqual(names[0], "Test Route Harbour")
+        self.assertNotIn("Test Route Meadow", names[:3])
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(
+            sorted(route["RouteName"] for route in near),
+            ["Test Route Meadow", "Test Route Old Harbour"],
+        )
+
+    def test_search_routes_rejects_forged_cursor(self):
+        """Test that a cursor with the wrong value types is an invalid cursor."""
+        cursor = encode_cursor(["x", 0, "a", 1])
+        with self._repository_scope():
+            with self.assertRaises(ValueError):
+                RouteRepository.search_routes("test route", cursor=cursor)
+
 
 if __name__ == "__main__":
     unittest.main()
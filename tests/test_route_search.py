@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
+
+from route_search import RouteSearch, RouteSearchIndex, is_sort_key
+
+
+def _route(route_id, name, distance=5.0, pace=6.0):
+    return {
+        "RouteID": route_id,
+        "RouteName": name,
+        "Distance": distance,
+        "AvgPace": pace,
+    }
+
+
+ROUTES = [
+    _route(1, "Park Loop", 3.0, 5.5),
+    _route(2, "Parkway Hills", 8.0, 7.0),
+    _route(3, "Central Park Trail", 6.0, 6.5),
+    _route(4, "Riverside", 10.0, None),
+    _route(5, "Lakeside Park", 4.5, 6.0),
+    _route(6, "Old Town Sprint", 1.5, 4.0),
+]
+
+
+class RouteSearchIndexTest(unittest.TestCase):
+    """Test cases for the route name index."""
+
+    def setUp(self):
+        self.index = RouteSearchIndex(ROUTES)
+
+    def _ids(self, *args, **kwargs):
+        return [route["RouteID"] for _, route in self.index.search(*args, **kwargs)]
+
+    def test_matches_are_ranked_by_kind(self):
+        """Test that prefix matches come before word prefixes and substrings."""
+        self.assertEqual(self._ids("park"), [1, 2, 3, 5])
+        self.assertEqual(self._ids("park loop"), [1])
+        self.assertEqual(self._ids("ark"), [3, 5, 1, 2])
+
+    def test_typos_match_by_similarity(self):
+        """Test that misspelt names are still found."""
+        self.assertEqual(self._ids("Rivreside")[:1], [4])
+        self.assertEqual(self._ids("centrl park")[:1], [3])
+        self.assertEqual(self._ids("zzzz"), [])
+
+    def test_search_ignores_case_and_accents(self):
+        """Test that names are compared after normalization."""
+        self.assertEqual(self._ids("  RIVERSÍDE "), [4])
+
+    def test_distance_and_pace_filters(self):
+        """Test range filters alone and combined with a name."""
+        self.assertEqual(self._ids(distance=(4, 8)), [3, 5, 2])
+        self.assertEqual(self._ids("park", distance=(None, 5)), [1, 5])
+        self.assertEqual(self._ids(pace=(5, 6)), [5, 1])
+        self.assertEqual(self._ids(distance=(9, None), pace=(0, 10)), [])
+
+    def test_forged_cursor_keys_are_rejected(self):
+        """Test that only values typed like a search sort key are accepted."""
+        self.assertTrue(is_sort_key(self.index.search("park")[0][0]))
+        self.assertTrue(is_sort_key([4, -0.5, "park", 1]))
+        self.assertFalse(is_sort_key(["x", 0, "a", 1]))
+        self.assertFalse(is_sort_key([0, 0, "a", "1"]))
+
+
+class RouteSearchTest(unittest.TestCase):
+    """Test cases for search over the route catalogue."""
+
+    def test_index_follows_catalogue_rows(self):
+        """Test that the index is rebuilt only when the rows change."""
+        rows = tuple(ROUTES)
+        search = RouteSearch(lambda: rows)
+
+        first = search.index()
+        self.assertIs(search.index(), first)
+
+        rows = rows + (_route(7, "Parkside Dash"),)
+        self.assertIsNot(search.index(), first)
+        self.assertEqual(search.search("parks")[0][1]["RouteID"], 7)
+
+    def test_index_survives_reloads_of_the_same_version(self):
+        """Test that reloading unchanged rows keeps the index until a bump."""
+        version = 0
+        search = RouteSearch(
+            lambda: tuple(dict(route) for route in ROUTES), lambda: version
+        )
+
+        first = search.index()
+        self.assertIs(search.index(), first)
+
+        version = 1
+        self.assertIsNot(search.index(), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import sys
+import tempfile
+import unittest
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from test_bulk_import import RecordingConnection
+from bulk_import import TABLES, import_directory
+from synthetic_data import SyntheticDataset, clear_tables, load_mysql, write_csv
+
+
+def _tables(dataset):
+    return {table: list(dataset.rows(table)) for table, _, _ in TABLES}
+
+
+class SyntheticDataTest(unittest.TestCase):
+    """Test cases for the synthetic data generator."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tables = _tables(SyntheticDataset(sessions=5000, seed=7))
+
+    def test_same_seed_gives_same_rows(self):
+        """Test that generation is deterministic and the seed changes it."""
+        self.assertEqual(_tables(SyntheticDataset(sessions=5000, seed=7)), self.tables)
+        other = list(SyntheticDataset(sessions=5000, seed=8).rows("jogging"))
+        self.assertNotEqual(other, self.tables["jogging"])
+
+    def test_scale_follows_session_count(self):
+        """Test the exact session count and the tables sized from it."""
+        self.assertEqual(len(self.tables["jogging"]), 5000)
+        self.assertEqual(len(self.tables["jogger"]), 250)
+        large = SyntheticDataset(sessions=1000000)
+        self.assertEqual(large.counts["jogger"], 50000)
+        self.assertEqual(large.counts["joggingevent"], 200)
+
+    def test_references_are_consistent(self):
+        """Test that every foreign key and business rule holds."""
+        tables = self.tables
+        emails = {row[0] for row in tables["jogger"]}
+        routes = {row[0] for row in tables["joggingroute"]}
+        events = {row[0]: row for row in tables["joggingevent"]}
+        sessions = {row[0]: row for row in tables["jogging"]}
+        registered = {(row[0], row[1]) for row in tables["eventregistration"]}
+
+        self.assertEqual(len(emails), len(tables["jogger"]))
+        self.assertEqual(list(sessions), list(range(1, len(sessions) + 1)))
+        starts = [row[1] for row in tables["jogging"]]
+        self.assertEqual(starts, sorted(starts))
+        for session_id, start, end, distance, email, route_id in sessions.values():
+            self.assertLess(start, end)
+            self.assertIn(email, emails)
+            self.assertTrue(route_id is None or route_id in routes)
+            self.assertTrue(distance is None or distance > 0)
+        self.assertEqual(len(registered), len(tables["eventregistration"]))
+        counts = Counter(event_id for event_id, _ in registered)
+        for event_id, count in counts.items():
+            self.assertLessEqual(count, events[event_id][3])
+        for event_id, session_id in tables["eventsession"]:
+            session = sessions[session_id]
+            self.assertIn((event_id, session[4]), registered)
+            self.assertEqual(session[1].date(), events[event_id][2].date())
+        for _, rating, _, route_id, email in tables["routereview"]:
+            self.assertIn(route_id, routes)
+            self.assertIn(rating, range(1, 6))
+        route_reviews = [(row[3], row[4]) for row in tables["routereview"]]
+        self.assertEqual(len(route_reviews), len(set(route_reviews)))
+        for _, _, _, event_id, email in tables["eventreview"]:
+            self.assertIn((event_id, email), registered)
+
+    def test_csv_output_passes_import_validation(self):
+        """Test that written CSV files load through the importer unchanged."""
+        with tempfile.TemporaryDirectory() as directory:
+            written = list(write_csv(SyntheticDataset(sessions=1000), directory))
+            imported = list(import_directory(RecordingConnection(), directory))
+
+        self.assertEqual(
+            [report["rows"] for report in written],
+            [report["loaded"] for report in imported],
+        )
+        self.assertEqual(sum(report["rejected"] for report in imported), 0)
+
+    def test_load_mysql_batches_every_table(self):
+        """Test that direct loading inserts each table in parent-first order."""
+        connection = RecordingConnection()
+
+        reports = list(load_mysql(SyntheticDataset(sessions=1000), connection))
+
+        self.assertEqual(
+            [report["table"] for report in reports], [t for t, _, _ in TABLES]
+        )
+        self.assertEqual(
+            sum(len(batch) for batch in connection.batches),
+            sum(report["loaded"] for report in reports),
+        )
+        self.assertTrue(connection.statements[0].startswith("INSERT INTO jogger "))
+
+    def test_clear_tables_deletes_children_first(self):
+        """Test that rows are deleted in an order the foreign keys allow."""
+        connection = RecordingConnection()
+
+        clear_tables(connection)
+
+        tables = [statement.split()[-1] for statement in connection.statements]
+        self.assertLess(tables.index("leaderboardentry"), tables.index("jogging"))
+        self.assertLess(tables.index("eventsession"), tables.index("jogging"))
+        self.assertLess(tables.index("jogging"), tables.index("jogger"))
+        self.assertEqual(connection.commits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
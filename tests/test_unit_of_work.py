@@ -0,0 +1,168 @@
+import asyncio
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from test_connection_pool import FakeConnection
+import database
+from database import get_db_cursor, unit_of_work, current_unit_of_work, on_commit
+from database import UnitOfWorkMiddleware
+from mysql.connector import Error
+
+
+class UnitOfWorkTest(unittest.TestCase):
+    """Test cases for sharing one connection across repository calls."""
+
+    def setUp(self):
+        """Point the process-wide pool at fake connections."""
+        self.opened = []
+
+        def connect(**connect_args):
+            connection = FakeConnection()
+            self.opened.append(connection)
+            return connection
+
+        self.pool = database.configure_pool(connect=connect)
+
+    def tearDown(self):
+        database.configure_pool()
+
+    def test_queries_share_one_connection(self):
+        """Test that every cursor in a unit uses the same connection."""
+        with unit_of_work():
+            with get_db_cursor() as cursor:
+                cursor.execute("SELECT 1")
+            with get_db_cursor(commit=True) as cursor:
+                cursor.execute("INSERT INTO jogger VALUES (1)")
+            with get_db_cursor(commit=True) as cursor:
+                cursor.execute("INSERT INTO jogger VALUES (2)")
+
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(len(self.opened[0].statements), 3)
+        self.assertEqual(self.opened[0].commits, 1)
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+
+    def test_failure_rolls_back_all_writes(self):
+        """Test that an exception discards every write made in the unit."""
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                with get_db_cursor(commit=True) as cursor:
+                    cursor.execute("INSERT INTO jogging VALUES (1)")
+                raise RuntimeError("event insert failed")
+
+        self.assertEqual(self.opened[0].commits, 0)
+        self.assertEqual(self.opened[0].rollbacks, 1)
+        self.assertIsNone(current_unit_of_work())
+
+    def test_nested_units_join_the_outer_unit(self):
+        """Test that only the outermost unit commits."""
+        with unit_of_work() as outer:
+            with unit_of_work() as inner:
+                self.assertIs(inner, outer)
+                with get_db_cursor(commit=True) as cursor:
+                    cursor.execute("DELETE FROM jogging")
+            self.assertEqual(self.opened[0].commits, 0)
+
+        self.assertEqual(self.opened[0].commits, 1)
+
+    def test_unused_unit_borrows_nothing(self):
+        """Test that a unit without queries never checks out a connection."""
+        with unit_of_work() as unit:
+            self.assertFalse(unit.active)
+
+        self.assertEqual(self.pool.stats()["checkouts"], 0)
+
+    def test_bound_connection_is_left_to_its_owner(self):
+        """Test that a caller-supplied connection is not committed or closed."""
+        connection = FakeConnection()
+
+        with unit_of_work(connection=connection):
+            with get_db_cursor(commit=True) as cursor:
+                cursor.execute("INSERT INTO jogger VALUES (1)")
+
+        self.assertEqual(connection.commits, 0)
+        self.assertTrue(connection.connected)
+        self.assertEqual(self.opened, [])
+
+    def test_after_commit_callbacks_run_only_on_commit(self):
+        """Test that commit callbacks wait for the commit and are dropped on rollback."""
+        calls = []
+
+        with unit_of_work():
+            with get_db_cursor(commit=True) as cursor:
+                cursor.execute("INSERT INTO jogging VALUES (1)")
+            on_commit(lambda: calls.append(self.opened[0].commits))
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [1])
+
+        with self.assertRaises(RuntimeError):
+            with unit_of_work():
+                on_commit(lambda: calls.append("rolled back"))
+                raise RuntimeError("session insert failed")
+        self.assertEqual(calls, [1])
+
+        on_commit(lambda: calls.append("immediate"))
+        self.assertEqual(calls, [1, "immediate"])
+
+    def _request(self, handler):
+        """Run ``handler`` as an ASGI app behind the middleware.
+
+        Returns the messages sent, each with the commits made before it.
+        """
+        sent = []
+
+        async def app(scope, receive, send):
+            await handler()
+            await send({"type": "http.response.start", "status": 303, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            commits = self.opened[0].commits if self.opened else 0
+            sent.append((message, commits))
+
+        scope = {"type": "http", "method": "POST", "path": "/login"}
+        asyncio.run(UnitOfWorkMiddleware(app)(scope, receive, send))
+        return sent
+
+    def test_middleware_commits_before_the_response_starts(self):
+        """Test that a redirect is only sent once its writes are committed."""
+
+        async def handler():
+            with get_db_cursor(commit=True) as cursor:
+                cursor.execute("INSERT INTO jogger VALUES (1)")
+
+        sent = self._request(handler)
+
+        start, commits = sent[0]
+        self.assertEqual(start["status"], 303)
+        self.assertEqual(commits, 1)
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+        self.assertIsNone(current_unit_of_work())
+
+    def test_failed_commit_becomes_server_error(self):
+        """Test that a commit failure replaces the handler's response."""
+
+        def fail():
+            raise Error("Deadlock found when trying to get lock")
+
+        async def handler():
+            with get_db_cursor(commit=True) as cursor:
+                cursor.execute("INSERT INTO jogger VALUES (1)")
+            self.opened[0].commit = fail
+
+        sent = self._request(handler)
+
+        self.assertEqual(
+            [message["type"] for message, _ in sent],
+            ["http.response.start", "http.response.body"],
+        )
+        self.assertEqual(sent[0][0]["status"], 500)
+        self.assertEqual(self.opened[0].rollbacks, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()